@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Lightweight Article Representations
+Prefers a site's RSS/Atom entry, JSON-LD articleBody or AMP page over
+the full HTML, learning per domain which is the smallest with full text
+"""
+
+import html
+import json
+import re
+import threading
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from content_extractor import extract_article
+from disk_cache import DiskCache
+from url_canonicalizer import canonicalize_url, resolve_canonical
+
+FEED_CACHE_DIR = "cache/feeds"
+
+# Only probe AMP for pages heavier than this
+HEAVY_PAGE_BYTES = 400_000
+# A lighter copy must carry at least this share of the page's text
+FULL_TEXT_RATIO = 0.8
+
+LINK_TAG = re.compile(r'<link\b[^>]*>', re.I)
+ATTRIBUTE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+JSON_LD = re.compile(r'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.I | re.S)
+FEED_TYPES = ('application/rss+xml', 'application/atom+xml')
+
+RSS_CONTENT = '{http://purl.org/rss/1.0/modules/content/}encoded'
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+def head_of(markup):
+    end = markup.lower().find('</head>')
+    return markup if end < 0 else markup[:end]
+
+
+def head_links(markup, base_url=""):
+    """AMP, feed and canonical URLs declared by <link> tags in the page head"""
+    found = {'amp': None, 'feeds': [], 'canonical': None}
+    for tag in LINK_TAG.findall(head_of(markup)):
+        attrs = {name.lower(): next(v for v in values if v is not None)
+                 for name, *values in ATTRIBUTE.findall(tag)}
+        rel = attrs.get('rel', '').lower().split()
+        href = attrs.get('href')
+        if not href:
+            continue
+        href = urljoin(base_url, html.unescape(href))
+        if 'amphtml' in rel:
+            found['amp'] = found['amp'] or href
+        elif 'canonical' in rel:
+            found['canonical'] = found['canonical'] or href
+        elif 'alternate' in rel and attrs.get('type', '').lower() in FEED_TYPES:
+            found['feeds'].append(href)
+    return found
+
+
+def html_to_text(markup):
+    return BeautifulSoup(markup, 'html.parser').get_text(' ', strip=True)
+
+
+def jsonld_article(markup):
+    """{'title', 'content', 'url'} from a JSON-LD Article with articleBody, or None"""
+    for block in JSON_LD.findall(markup):
+        try:
+            data = json.loads(block.strip(), strict=False)
+        except ValueError:
+            continue
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict):
+                continue
+            stack.extend(node.get('@graph', []))
+            types = node.get('@type', [])
+            types = types if isinstance(types, list) else [types]
+            is_article = any(str(t).endswith(('Article', 'BlogPosting')) for t in types)
+            body = node.get('articleBody')
+            if is_article and isinstance(body, str) and body.strip():
+                return {'title': html.unescape(str(node.get('headline', ''))),
+                        'content': html_to_text(body) if '<' in body else html.unescape(body),
+                        'url': node.get('url') if isinstance(node.get('url'), str) else None}
+    return None
+
+
+def parse_feed(xml_text):
+    """Map canonical item URL -> {'title', 'content'} for an RSS or Atom feed"""
+    try:
+        root = ET.fromstring(xml_text.encode('utf-8') if isinstance(xml_text, str) else xml_text)
+    except ET.ParseError:
+        return {}
+    entries = {}
+    for item in root.iter('item'):
+        link = (item.findtext('link') or item.findtext('guid') or '').strip()
+        body = item.findtext(RSS_CONTENT) or item.findtext('description') or ''
+        if link:
+            entries[canonicalize_url(link)] = {'title': (item.findtext('title') or '').strip(),
+                                               'content': html_to_text(body)}
+    for entry in root.iter(ATOM + 'entry'):
+        link = ''
+        for candidate in entry.findall(ATOM + 'link'):
+            if candidate.get('rel', 'alternate') == 'alternate':
+                link = candidate.get('href', '')
+                break
+        body = entry.findtext(ATOM + 'content') or entry.findtext(ATOM + 'summary') or ''
+        if link:
+            entries[canonicalize_url(link)] = {'title': (entry.findtext(ATOM + 'title') or '').strip(),
+                                               'content': html_to_text(body)}
+    return entries
+
+
+class RepresentationChooser:
+    def __init__(self, get, outcomes, feed_cache=None):
+        self.get = get                  # scheduler-style get(url, timeout=...)
+        self.outcomes = outcomes        # DomainOutcomes holding learned preferences
+        self.feed_cache = feed_cache or shared_feed_cache()
+
+    def preference(self, domain):
+        return self.outcomes.get(domain).get('representation')
+
+    def head_is_enough(self, domain):
+        """Predicate telling the page reader it may stop after </head>, or None"""
+        preference = self.preference(domain)
+        if preference == 'jsonld':
+            return lambda head: jsonld_article(head) is not None
+        if preference == 'amp':
+            return lambda head: head_links(head)['amp'] is not None
+        return None
+
+    def feed_entries(self, feed_url, timeout):
+        entries = self.feed_cache.get(feed_url)
+        if entries is None:
+            response = self.get(feed_url, timeout=timeout)
+            response.raise_for_status()
+            entries = parse_feed(response.content)
+            self.feed_cache.set(feed_url, entries)
+        return entries
+
+    def from_feed(self, url, domain, timeout):
+        """The article straight from the site's feed if this domain prefers it,
+        else None (the caller reads the page)"""
+        stats = self.outcomes.get(domain)
+        if stats.get('representation') != 'feed' or not stats.get('feed_url'):
+            return None
+        try:
+            entries = self.feed_entries(stats['feed_url'], timeout)
+        except Exception:
+            # The feed has gone away or is failing; forget it and read the page
+            self.outcomes.set_preference(domain, 'representation', None)
+            return None
+        entry = entries.get(canonicalize_url(url))
+        if not entry or not entry['content']:
+            return None
+        return {'title': entry['title'], 'content': entry['content'],
+                'canonical_url': canonicalize_url(url), 'representation': 'feed', 'bytes': 0}
+
+    def from_amp(self, amp_url, timeout):
+        response = self.get(amp_url, timeout=timeout)
+        response.raise_for_status()
+        extracted = extract_article(response.text)
+        return {'title': extracted['title'], 'content': extracted['content'],
+                'representation': 'amp', 'bytes': len(response.content)}
+
+    def choose(self, url, domain, markup, final_url, complete, timeout=10):
+        """Best text for a page, using (and learning) the domain's lightest source
+
+        Returns None when the reader stopped after the head for a lighter copy
+        that turned out to be missing; the caller then reads the full page.
+        """
+        preference = self.preference(domain)
+        links = head_links(markup, final_url)
+        canonical = resolve_canonical(final_url, links['canonical'])
+
+        if preference == 'jsonld':
+            found = jsonld_article(markup)
+            if found:
+                return {'title': found['title'], 'content': found['content'],
+                        'canonical_url': canonical, 'representation': 'jsonld',
+                        'bytes': len(markup)}
+        if preference == 'amp' and links['amp']:
+            try:
+                amp = self.from_amp(links['amp'], timeout)
+            except Exception:
+                amp = None
+            if amp and amp['content']:
+                amp['canonical_url'] = canonical
+                amp['bytes'] += len(markup)
+                return amp
+        if not complete:
+            # The lighter copy has gone away; forget it and relearn
+            self.outcomes.set_preference(domain, 'representation', None)
+            return None
+
+        extracted = extract_article(markup)
+        page = {'title': extracted['title'], 'content': extracted['content'],
+                'canonical_url': resolve_canonical(final_url, extracted['canonical_url']),
+                'representation': 'html', 'bytes': len(markup)}
+        if preference is None:
+            self.learn(url, domain, markup, page, links, timeout)
+        return page
+
+    def learn(self, url, domain, markup, page, links, timeout):
+        """Probe this domain's lighter representations once and remember the best"""
+        full_length = len(page['content'])
+        if full_length < 200:
+            return  # nothing to compare against yet
+        needed = full_length * FULL_TEXT_RATIO
+
+        try:
+            for feed_url in links['feeds'][:1]:
+                entry = self.feed_entries(feed_url, timeout).get(canonicalize_url(url))
+                if entry and len(entry['content']) >= needed:
+                    self.outcomes.set_preference(domain, 'feed_url', feed_url)
+                    self.outcomes.set_preference(domain, 'representation', 'feed')
+                    return
+
+            found = jsonld_article(head_of(markup))
+            if found and len(found['content']) >= needed:
+                self.outcomes.set_preference(domain, 'representation', 'jsonld')
+                return
+
+            if links['amp'] and len(markup) > HEAVY_PAGE_BYTES:
+                amp = self.from_amp(links['amp'], timeout)
+                if len(amp['content']) >= needed and amp['bytes'] < len(markup):
+                    self.outcomes.set_preference(domain, 'representation', 'amp')
+                    return
+        except Exception:
+            return  # try again on the next article from this site
+
+        self.outcomes.set_preference(domain, 'representation', 'html')
+
+
+_shared_feed_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_feed_cache():
+    """Parsed feeds, kept briefly so one download serves every linked item"""
+    global _shared_feed_cache
+    if _shared_feed_cache is None:
+        with _shared_lock:
+            if _shared_feed_cache is None:
+                _shared_feed_cache = DiskCache(FEED_CACHE_DIR, ttl_seconds=15 * 60,
+                                               max_bytes=20 * 1024 * 1024)
+    return _shared_feed_cache
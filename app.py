@@ -15,10 +15,22 @@ import ssl
 import pandas as pd
 from pathlib import Path
 import re
-import requests
 import tempfile
 import base64
 
+from audio_cache import shared_audio_cache
+from chunked_summarizer import ChunkedSummarizer
+from hedged_script import shared_script_hedge
+from llm_client import shared_llm_client, llm_configured
+from token_budget import max_tokens_for_duration, shared_usage_log
+from script_cues import SOUNDS_DIR, SoundLibrary
+from speech_stream import elevenlabs_synthesizer, narrate
+from tts_engine import episode_tags
+from mp3_tools import file_duration, id3_tag, write_id3
+from segment_store import episode_id, shared_segment_store
+from dialogue import dialogue_hosts, dialogue_instructions, voice_engine
+from resilience import ProviderError, configure_limits
+
 # Page config
 st.set_page_config(
     page_title="📧 Email to Podcast",
@@ -142,27 +154,18 @@ def load_config():
         }
 
 config = load_config()
+configure_limits(config)
+
+# Spoken length each prompt asks for, which sizes the script's max_tokens
+SCRIPT_MINUTES = {'mando_minutes': 5, 'puck_news': 8}
 
 # AI and Voice Processing Functions
-def process_with_ai(content, newsletter_type, config):
-    """Convert email content to podcast script using OpenAI"""
-    try:
-        # Check if OpenAI is available and has valid API key
-        ai_config = config.get('ai_processing', {})
-        api_key = ai_config.get('api_key', '')
-        
-        if not api_key or api_key == 'YOUR_OPENAI_API_KEY':
-            # Fallback to template-based script generation
-            return generate_template_script(content, newsletter_type)
-        
-        import openai
-        
-        # Set up OpenAI client
-        client = openai.OpenAI(api_key=api_key)
-        
-        # Different prompts for different newsletters
-        if newsletter_type == "mando_minutes":
-            prompt = f"""
+def build_podcast_prompt(content, newsletter_type, hosts=None):
+    """Script-writing prompt for a newsletter type, with sound and music cues;
+    with two or more hosts the script is asked for as their dialogue"""
+    # Different prompts for different newsletters
+    if newsletter_type == "mando_minutes":
+        prompt = f"""
 Convert this Mando Minutes newsletter into a professional podcast script with sound effects and music cues. 
 Make it energetic, fast-paced, and include professional audio production elements.
 
@@ -186,8 +189,8 @@ Good morning! I'm Mark, and this is your Mando Minutes briefing...
 
 Script:
 """
-        else:  # puck_news
-            prompt = f"""
+    else:  # puck_news
+        prompt = f"""
 Convert this Puck newsletter into a sophisticated podcast script with professional sound design. 
 Make it thoughtful, analytical, and include elegant audio production elements.
 
@@ -211,28 +214,74 @@ Welcome to Puck News Analysis. I'm Mark, and this is your deep-dive briefing...
 
 Script:
 """
+    
+    if hosts:
+        prompt = prompt.rsplit("Script:", 1)[0] + dialogue_instructions(hosts) + "\nScript:\n"
+    
+    return prompt
+
+def podcast_messages(content, newsletter_type, hosts=None):
+    return [
+        {"role": "system", "content": "You are a professional podcast script writer who creates engaging, conversational audio content."},
+        {"role": "user", "content": build_podcast_prompt(content, newsletter_type, hosts)}
+    ]
+
+def condense_newsletter(client, ai_config, content, force_refresh=False):
+    """Condense long issues section by section so nothing past the fold is lost"""
+    return ChunkedSummarizer(client, ai_config.get('summary_model', ai_config['model']),
+                             budget_tokens=ai_config.get('content_budget_tokens', 1500)
+                             ).condense(content, force_refresh=force_refresh)
+
+def write_ai_script(client, ai_config, content, newsletter_type, force_refresh=False, hosts=None):
+    """Condense the issue and have the model write the script"""
+    content = condense_newsletter(client, ai_config, content, force_refresh)
+    
+    return client.complete(
+        model=ai_config['model'],
+        messages=podcast_messages(content, newsletter_type, hosts),
+        max_tokens=max_tokens_for_duration(SCRIPT_MINUTES.get(newsletter_type, 5)),
+        temperature=0.7,
+        force_refresh=force_refresh,
+        label=newsletter_type
+    )
+
+def process_with_ai(content, newsletter_type, config, force_refresh=False):
+    """Convert email content to podcast script using OpenAI
+    
+    Identical prompts are answered from the on-disk LLM cache unless
+    force_refresh is set. The template script is built at the same time and
+    used if the model misses `script_deadline_seconds` or fails its checks.
+    """
+    try:
+        # Check if OpenAI is available and has valid API key
+        ai_config = config.get('ai_processing', {})
+        api_key = ai_config.get('api_key', '')
         
-        response = client.chat.completions.create(
-            model=config['ai_processing']['model'],
-            messages=[
-                {"role": "system", "content": "You are a professional podcast script writer who creates engaging, conversational audio content."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.7
-        )
+        if not api_key or api_key == 'YOUR_OPENAI_API_KEY':
+            # Fallback to template-based script generation
+            return generate_template_script(content, newsletter_type)
+        
+        # Shared async client: pooled connections, bounded concurrency,
+        # so reruns and both buttons don't each open a fresh client
+        client = shared_llm_client(api_key)
         
-        return response.choices[0].message.content.strip()
+        script, report = shared_script_hedge().run(
+            lambda: write_ai_script(client, ai_config, content, newsletter_type, force_refresh,
+                                    hosts=dialogue_hosts(config.get('voice_generation', {}))),
+            lambda: generate_template_script(content, newsletter_type),
+            deadline=ai_config.get('script_deadline_seconds', 20)
+        )
+        if report['winner'] == 'template':
+            if report['llm_error'] in ('quota', 'rate_limit', 'circuit_open'):
+                st.warning(f"⚠️ OpenAI {report['llm_error'].replace('_', ' ')}. Using template script instead.")
+            else:
+                st.info(f"💡 Using template script ({report['reason']})")
+        return script
         
     except Exception as e:
-        error_msg = str(e)
-        if "quota" in error_msg.lower() or "429" in error_msg:
-            st.warning("⚠️ OpenAI quota exceeded. Using template script instead.")
-            return generate_template_script(content, newsletter_type)
-        else:
-            st.error(f"AI processing failed: {error_msg}")
-            st.info("💡 Using fallback template script...")
-            return generate_template_script(content, newsletter_type)
+        st.error(f"AI processing failed: {str(e)}")
+        st.info("💡 Using fallback template script...")
+        return generate_template_script(content, newsletter_type)
 
 def generate_template_script(content, newsletter_type):
     """Generate a professional script with sound effects and personalization"""
@@ -352,7 +401,7 @@ Welcome! I'm Mark, and this is your newsletter podcast for {datetime.now().strft
 
 Here's today's content summary:
 
-{content[:500]}...
+{ChunkedSummarizer().condense(content, budget_tokens=150)}
 
 [OUTRO MUSIC]
 
@@ -361,66 +410,100 @@ That's your update for today. Thanks for listening!
 [MUSIC FADES OUT]"""
         
 
-def generate_voice(script, config):
-    """Convert script to audio using ElevenLabs"""
+def podcast_file(newsletter_type):
+    """A new timestamped path in podcasts/ for an episode"""
+    podcast_dir = Path("podcasts")
+    podcast_dir.mkdir(exist_ok=True)
+    filename = f"{newsletter_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
+    return filename, podcast_dir / filename
+
+def podcast_info(filename, filepath):
+    return {
+        'filename': filename,
+        'filepath': filepath,
+        'size': filepath.stat().st_size,
+        'duration': file_duration(filepath),
+        'created': datetime.now()
+    }
+
+def format_duration(seconds):
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+def show_name(newsletter_type):
+    return newsletter_type.replace('_', ' ').title()
+
+def generate_voice(script, config, newsletter_type):
+    """Voice the script with ElevenLabs straight into podcasts/; returns file info"""
+    filename, filepath = podcast_file(newsletter_type)
     try:
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{config['voice_generation']['voice_id']}"
-        
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": config['voice_generation']['api_key']
-        }
-        
-        data = {
-            "text": script,
-            "model_id": config['voice_generation'].get('model', 'eleven_multilingual_v2'),
-            "voice_settings": {
-                "stability": config['voice_generation'].get('voice_settings', {}).get('stability', 0.5),
-                "similarity_boost": config['voice_generation'].get('voice_settings', {}).get('similarity_boost', 0.8),
-                "style": config['voice_generation'].get('voice_settings', {}).get('style', 0.2),
-                "use_speaker_boost": config['voice_generation'].get('voice_settings', {}).get('use_speaker_boost', True)
-            }
-        }
-        
-        response = requests.post(url, json=data, headers=headers)
+        # Split under the model's limit, voiced in parallel and streamed to disk;
+        # transient 429/5xx errors are retried with backoff before giving up.
+        # Rerunning the same issue only re-voices the stories that changed.
+        # With two or more hosts configured each voices their own turns.
+        voice_config = config['voice_generation']
+        show = show_name(newsletter_type)
+        hosts = dialogue_hosts(voice_config)
+        shared_segment_store().render(voice_engine(voice_config), episode_id(show), script, filepath,
+                                      tags=episode_tags(show, host=' & '.join(hosts) if hosts else "Mark"))
+        return podcast_info(filename, filepath)
         
-        if response.status_code == 200:
-            return response.content
+    except ProviderError as e:
+        if e.kind == 'quota':
+            st.error(f"⚠️ ElevenLabs character quota used up: {e}")
         else:
-            st.error(f"Voice generation failed: {response.status_code} - {response.text}")
-            return None
-            
+            st.error(f"Voice generation failed: {e}")
+        return None
     except Exception as e:
         st.error(f"Voice generation error: {str(e)}")
         return None
 
-def save_podcast(audio_data, newsletter_type):
-    """Save audio data and return file info"""
+def stream_podcast(content, newsletter_type, config, force_refresh=False):
+    """Write the script and voice it at the same time
+    
+    Sentences go to ElevenLabs while the model is still writing and the first
+    finished segment starts playing right away. Returns None when either API
+    isn't configured, two hosts are set up (dialogue is voiced per host) or
+    streaming fails, so the caller can go step by step.
+    """
+    ai_config = config.get('ai_processing', {})
+    voice_config = config.get('voice_generation', {})
+    if not llm_configured(ai_config) or voice_config.get('api_key', '') in ('', 'YOUR_ELEVENLABS_API_KEY'):
+        return None
+    if dialogue_hosts(voice_config):
+        return None
+    
+    filename, filepath = podcast_file(newsletter_type)
+    first_audio = st.empty()
+    
+    def play_first_segment(index, audio):
+        if index == 0:
+            first_audio.audio(audio, format='audio/mp3')
+    
     try:
-        # Create podcasts directory if it doesn't exist
-        podcast_dir = Path("podcasts")
-        podcast_dir.mkdir(exist_ok=True)
-        
-        # Create filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{newsletter_type}_{timestamp}.mp3"
-        filepath = podcast_dir / filename
-        
-        # Save audio file
-        with open(filepath, 'wb') as f:
-            f.write(audio_data)
-        
-        return {
-            'filename': filename,
-            'filepath': filepath,
-            'size': len(audio_data),
-            'created': datetime.now()
-        }
-        
+        client = shared_llm_client(ai_config['api_key'])
+        content = condense_newsletter(client, ai_config, content, force_refresh)
+        deltas = client.stream(podcast_messages(content, newsletter_type), ai_config['model'],
+                               max_tokens=max_tokens_for_duration(SCRIPT_MINUTES.get(newsletter_type, 5)),
+                               temperature=0.7, force_refresh=force_refresh, label=newsletter_type)
+        audio_cache = shared_audio_cache() if voice_config.get('cache_audio', True) else None
+        sounds = SoundLibrary(voice_config.get('sounds_dir', SOUNDS_DIR))
+        script, report = narrate(deltas, elevenlabs_synthesizer(voice_config, cache=audio_cache), filepath,
+                                 on_segment=play_first_segment, sounds=sounds)
     except Exception as e:
-        st.error(f"Failed to save podcast: {str(e)}")
+        first_audio.empty()
+        filepath.unlink(missing_ok=True)
+        st.warning(f"⚠️ Streaming failed ({e}), generating step by step instead...")
         return None
+    
+    first_audio.empty()
+    write_id3(filepath, id3_tag(episode_tags(show_name(newsletter_type)), duration=file_duration(filepath)))
+    st.caption(f"⚡ First audio after {report['first_audio_seconds']}s, "
+               f"full podcast after {report['total_seconds']}s")
+    return {
+        'script': script,
+        'file_info': podcast_info(filename, filepath)
+    }
 
 # Sidebar for configuration
 with st.sidebar:
@@ -441,6 +524,19 @@ with st.sidebar:
     if st.button("🔄 Refresh Config"):
         st.cache_data.clear()
         st.rerun()
+    
+    st.subheader("🤖 AI Scripts")
+    force_fresh_ai = st.checkbox("♻️ Force fresh AI scripts",
+                                 help="Skip cached scripts for identical newsletters and call OpenAI again")
+    stream_audio = st.checkbox("⚡ Stream voice while the script is written",
+                               help="Send each finished sentence to ElevenLabs so audio starts within seconds")
+    hedge_wins = shared_script_hedge().wins
+    if hedge_wins:
+        st.caption(f"⏱️ Scripts: {hedge_wins['llm']} from AI, {hedge_wins['template']} from template")
+    for label, usage in shared_usage_log().summary().items():
+        st.caption(f"🧮 {label}: {usage['calls']} calls, "
+                   f"{usage['prompt_tokens']:,} in / {usage['completion_tokens']:,} out tokens, "
+                   f"${usage['cost_usd']:.4f}")
 
 # Main content area
 tab1, tab2, tab3, tab4 = st.tabs(["📬 Process Emails", "📚 Recent Podcasts", "📊 Analytics", "⚙️ Settings"])
@@ -512,7 +608,8 @@ with tab1:
                             
                             # AI Processing
                             status.info("🤖 Creating podcast script with AI...")
-                            script = process_with_ai(body, "mando_minutes", config)
+                            streamed = stream_podcast(body, "mando_minutes", config, force_refresh=force_fresh_ai) if stream_audio else None
+                            script = streamed['script'] if streamed else process_with_ai(body, "mando_minutes", config, force_refresh=force_fresh_ai)
                             
                             if script:
                                 # Show generated script
@@ -521,40 +618,34 @@ with tab1:
                                 
                                 # Voice Generation
                                 status.info("🎤 Generating voice with ElevenLabs...")
-                                audio_data = generate_voice(script, config)
+                                file_info = streamed['file_info'] if streamed else generate_voice(script, config, "mando_minutes")
                                 
-                                if audio_data:
-                                    # Save podcast
-                                    status.info("💾 Saving podcast file...")
-                                    file_info = save_podcast(audio_data, "mando_minutes")
+                                if file_info:
+                                    status.success("✅ PODCAST CREATED SUCCESSFULLY!")
                                     
-                                    if file_info:
-                                        status.success("✅ PODCAST CREATED SUCCESSFULLY!")
-                                        
-                                        # Show file info
-                                        col1, col2, col3 = st.columns(3)
-                                        with col1:
-                                            st.metric("File Size", f"{file_info['size'] / (1024*1024):.1f} MB")
-                                        with col2:
-                                            st.metric("Duration", "~3-5 min")
-                                        with col3:
-                                            st.metric("Created", file_info['created'].strftime("%H:%M:%S"))
-                                        
-                                        # Download button
+                                    # Show file info
+                                    col1, col2, col3 = st.columns(3)
+                                    with col1:
+                                        st.metric("File Size", f"{file_info['size'] / (1024*1024):.1f} MB")
+                                    with col2:
+                                        st.metric("Duration", format_duration(file_info['duration']))
+                                    with col3:
+                                        st.metric("Created", file_info['created'].strftime("%H:%M:%S"))
+                                    
+                                    # Download button, read from the file rather than a copy in memory
+                                    with open(file_info['filepath'], 'rb') as audio_file:
                                         st.download_button(
                                             label="🎧 Download Podcast",
-                                            data=audio_data,
+                                            data=audio_file,
                                             file_name=file_info['filename'],
                                             mime="audio/mpeg",
                                             type="primary"
                                         )
-                                        
-                                        # Audio player
-                                        st.audio(audio_data, format='audio/mp3')
-                                        
-                                        st.balloons()
-                                    else:
-                                        st.error("❌ Failed to save podcast file")
+                                    
+                                    # Audio player
+                                    st.audio(str(file_info['filepath']), format='audio/mp3')
+                                    
+                                    st.balloons()
                                 else:
                                     st.error("❌ Voice generation failed")
                             else:
@@ -665,7 +756,8 @@ with tab1:
                             
                             # AI Processing
                             status.info("🤖 Creating podcast script with AI...")
-                            script = process_with_ai(body, "puck_news", config)
+                            streamed = stream_podcast(body, "puck_news", config, force_refresh=force_fresh_ai) if stream_audio else None
+                            script = streamed['script'] if streamed else process_with_ai(body, "puck_news", config, force_refresh=force_fresh_ai)
                             
                             if script:
                                 # Show generated script
@@ -674,40 +766,34 @@ with tab1:
                                 
                                 # Voice Generation
                                 status.info("🎤 Generating voice with ElevenLabs...")
-                                audio_data = generate_voice(script, config)
+                                file_info = streamed['file_info'] if streamed else generate_voice(script, config, "puck_news")
                                 
-                                if audio_data:
-                                    # Save podcast
-                                    status.info("💾 Saving podcast file...")
-                                    file_info = save_podcast(audio_data, "puck_news")
+                                if file_info:
+                                    status.success("✅ PUCK NEWS PODCAST CREATED!")
+                                    
+                                    # Show file info
+                                    col1, col2, col3 = st.columns(3)
+                                    with col1:
+                                        st.metric("File Size", f"{file_info['size'] / (1024*1024):.1f} MB")
+                                    with col2:
+                                        st.metric("Duration", format_duration(file_info['duration']))
+                                    with col3:
+                                        st.metric("Created", file_info['created'].strftime("%H:%M:%S"))
                                     
-                                    if file_info:
-                                        status.success("✅ PUCK NEWS PODCAST CREATED!")
-                                        
-                                        # Show file info
-                                        col1, col2, col3 = st.columns(3)
-                                        with col1:
-                                            st.metric("File Size", f"{file_info['size'] / (1024*1024):.1f} MB")
-                                        with col2:
-                                            st.metric("Duration", "~5-8 min")
-                                        with col3:
-                                            st.metric("Created", file_info['created'].strftime("%H:%M:%S"))
-                                        
-                                        # Download button
+                                    # Download button, read from the file rather than a copy in memory
+                                    with open(file_info['filepath'], 'rb') as audio_file:
                                         st.download_button(
                                             label="🎧 Download Podcast",
-                                            data=audio_data,
+                                            data=audio_file,
                                             file_name=file_info['filename'],
                                             mime="audio/mpeg",
                                             type="primary"
                                         )
-                                        
-                                        # Audio player
-                                        st.audio(audio_data, format='audio/mp3')
-                                        
-                                        st.balloons()
-                                    else:
-                                        st.error("❌ Failed to save podcast file")
+                                    
+                                    # Audio player
+                                    st.audio(str(file_info['filepath']), format='audio/mp3')
+                                    
+                                    st.balloons()
                                 else:
                                     st.error("❌ Voice generation failed")
                             else:
@@ -796,7 +882,7 @@ with tab2:
                 with open(file, 'rb') as f:
                     st.download_button(
                         label="⬇️ Download",
-                        data=f.read(),
+                        data=f,
                         file_name=file.name,
                         mime="audio/mpeg",
                         key=f"download_{file.name}"
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Fetched Article Cache
+Extracted articles keyed by canonical URL, so links seen earlier in the
+day (or pulled in by warm-up) cost no network time
+"""
+
+import threading
+
+from disk_cache import DiskCache
+from url_canonicalizer import canonicalize_url
+
+ARTICLE_CACHE_DIR = "cache/articles"
+
+
+class ArticleCache:
+    def __init__(self, directory=ARTICLE_CACHE_DIR, ttl_hours=24, max_mb=200):
+        self.store = DiskCache(directory, ttl_seconds=ttl_hours * 3600,
+                               max_bytes=max_mb * 1024 * 1024)
+
+    def has(self, url):
+        return self.store.contains(canonicalize_url(url))
+
+    def get(self, url):
+        return self.store.get(canonicalize_url(url))
+
+    def put(self, article):
+        """Store under both the requested and the page's declared canonical URL"""
+        keys = {canonicalize_url(article['url'])}
+        if article.get('canonical_url'):
+            keys.add(article['canonical_url'])
+        for key in keys:
+            self.store.set(key, article)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_article_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = ArticleCache()
+    return _shared_cache
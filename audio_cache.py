@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+TTS Audio Cache
+Voiced segments stored on disk under a hash of their normalized text and
+the voice, model and voice settings, so recurring intros, sign-offs and
+unchanged stories are never paid for twice
+"""
+
+import os
+import re
+import threading
+import unicodedata
+
+from disk_cache import DiskCache, cache_key
+
+AUDIO_CACHE_DIR = "cache/audio"
+
+TYPOGRAPHY = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"', '–': '-', '—': ' - ', '…': '...'})
+
+
+def normalize_text(text):
+    """Text as the voice hears it: same words, same punctuation, tidy spacing"""
+    text = unicodedata.normalize('NFKC', text).translate(TYPOGRAPHY)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def voice_identity(voice_config, payload):
+    """What besides the text changes the audio: voice, model and settings"""
+    return {
+        'voice_id': voice_config.get('voice_id'),
+        'model_id': payload.get('model_id'),
+        'voice_settings': payload.get('voice_settings')
+    }
+
+
+class AudioCache:
+    def __init__(self, directory=AUDIO_CACHE_DIR, ttl_days=60, max_mb=500):
+        self.store = DiskCache(directory, ttl_seconds=ttl_days * 86400,
+                               max_bytes=max_mb * 1024 * 1024)
+
+    def key(self, text, voice):
+        return cache_key('tts', normalize_text(text), voice)
+
+    def get(self, key):
+        return self.store.get_bytes(key)
+
+    def put(self, key, audio):
+        if audio:
+            self.store.set_bytes(key, audio)
+
+    def path(self, key):
+        return self.store.get_path(key)
+
+    def put_file(self, key, path):
+        if os.path.getsize(path):
+            self.store.set_file(key, path)
+
+    def stats(self):
+        return self.store.stats()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_audio_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = AudioCache()
+    return _shared_cache
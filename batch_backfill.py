@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Batch Backfill
+Turns every archived issue of a newsletter since a date into a podcast
+script through one overnight Batch API job instead of hundreds of live
+calls, and optionally writes one recap script per week
+
+    python3 batch_backfill.py --since 07-Jul-2025 --newsletter mando_minutes --recap
+    python3 batch_backfill.py --resume batch_abc123   # collect an earlier batch first
+
+Answers land in the LLM cache, so rerunning returns them without new calls.
+"""
+
+import argparse
+import email
+import logging
+import os
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+
+from batch_llm import BatchRunner
+from dual_newsletter_automation import DualNewsletterAutomation, setup_logging
+from token_budget import max_tokens_for_duration
+
+BACKFILL_DIR = "podcasts/backfill"
+
+
+def archived_issues(automation, newsletter_config, since):
+    """(date, subject, sender, body) for every matching email since the date, oldest first"""
+    imap = automation.connect_to_aol()
+    try:
+        imap.select('INBOX')
+        email_ids = set()
+        for subject in newsletter_config['subject_contains']:
+            _, data = imap.search(None, f'SUBJECT "{subject}" SINCE {since}')
+            if data[0]:
+                email_ids.update(data[0].split())
+        issues = []
+        for email_id in sorted(email_ids, key=int):
+            _, msg_data = imap.fetch(email_id, '(RFC822)')
+            message = email.message_from_bytes(msg_data[0][1])
+            body = automation.extract_email_body(message)
+            if body:
+                issues.append((parsedate_to_datetime(message['Date']),
+                               message.get('Subject', 'No Subject'), message.get('From', 'Unknown'), body))
+        logging.info(f"📚 Found {len(issues)} {newsletter_config['name']} issues since {since}")
+        return sorted(issues, key=lambda issue: issue[0])
+    finally:
+        imap.logout()
+
+
+def weekly_recap_jobs(scripts, newsletter_config, model, minutes=10):
+    """One recap request per ISO week from that week's daily scripts"""
+    weeks = defaultdict(list)
+    for sent, script in scripts:
+        weeks[sent.isocalendar()[:2]].append((sent, script))
+    name = newsletter_config['name'].replace('_', ' ').title()
+    jobs = []
+    for (year, week), days in sorted(weeks.items()):
+        daily = '\n\n---\n\n'.join(f"{sent.strftime('%A, %B %d')}:\n{script}" for sent, script in days)
+        jobs.append({
+            'model': model,
+            'messages': [
+                {"role": "system", "content": "You are a professional podcast script writer who creates engaging, conversational audio content."},
+                {"role": "user", "content": f"Write a {minutes}-minute weekly recap podcast of {name} for week {week} "
+                                            f"of {year}. Pull the biggest stories together and show how they "
+                                            f"developed over the week; skip anything minor.\n\n{daily}"}
+            ],
+            'max_tokens': max_tokens_for_duration(minutes),
+            'temperature': 0.7,
+            'label': f"{newsletter_config['name']}_recap"
+        })
+    return [f"{year}-W{week:02d}" for year, week in sorted(weeks)], jobs
+
+
+def save(name, text):
+    os.makedirs(BACKFILL_DIR, exist_ok=True)
+    path = os.path.join(BACKFILL_DIR, f"{name}.txt")
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill podcast scripts through the Batch API")
+    parser.add_argument('--since', default='07-Jul-2025', help="IMAP date, e.g. 07-Jul-2025")
+    parser.add_argument('--newsletter', default='mando_minutes')
+    parser.add_argument('--recap', action='store_true', help="also write one recap per week")
+    parser.add_argument('--resume', help="collect this earlier batch before starting")
+    parser.add_argument('--config', default='multi_newsletter_config.json')
+    args = parser.parse_args()
+
+    automation = DualNewsletterAutomation(args.config)
+    ai_config = automation.config['ai_processing']
+    newsletter_config = next(n for n in automation.config['newsletters'] if n['name'] == args.newsletter)
+    runner = BatchRunner(ai_config['api_key'], poll_seconds=ai_config.get('batch_poll_seconds', 60))
+    try:
+        if args.resume:
+            runner.resume(args.resume)
+
+        issues = archived_issues(automation, newsletter_config, args.since)
+        # Condensed extractively: live map-reduce calls here would cost more than the batch saves
+        jobs = [automation.ai_script_job(subject, sender, body, newsletter_config, llm_condense=False)
+                for _, subject, sender, body in issues]
+        scripts = []
+        for (sent, _, _, _), script in zip(issues, runner.run(jobs, f"{args.newsletter}_backfill")):
+            if isinstance(script, Exception):
+                logging.error(f"❌ {sent:%Y-%m-%d}: {script}")
+                continue
+            save(f"{args.newsletter}_{sent:%Y%m%d}", script)
+            scripts.append((sent, script))
+        print(f"✅ {len(scripts)}/{len(issues)} scripts written to {BACKFILL_DIR}/")
+
+        if args.recap and scripts:
+            weeks, recap_jobs = weekly_recap_jobs(scripts, newsletter_config, ai_config['model'])
+            for week, recap in zip(weeks, runner.run(recap_jobs, f"{args.newsletter}_recaps")):
+                if isinstance(recap, Exception):
+                    logging.error(f"❌ Recap {week}: {recap}")
+                else:
+                    print(f"🗓️ Recap {week}: {save(f'{args.newsletter}_recap_{week}', recap)}")
+    finally:
+        runner.close()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
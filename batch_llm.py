@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Batch LLM Jobs
+Packages many chat completions into one JSONL file for the Batch API
+(half price, done within 24 hours), polls until the batch finishes and
+writes every answer into the LLM response cache, so backfills and weekly
+recaps don't need hundreds of synchronous calls
+"""
+
+import json
+import logging
+import os
+import time
+
+import httpx
+from openai import OpenAI
+
+from llm_cache import shared_llm_cache
+from resilience import ProviderError, Resilience, shared_quota_ledger
+from token_budget import count_message_tokens, shared_usage_log
+
+BATCH_DIR = "cache/batches"
+ENDPOINT = "/v1/chat/completions"
+FINISHED = {'completed', 'failed', 'expired', 'cancelled'}
+
+# The Batch API bills half the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+
+SHARED = object()  # default usage_log and ledger: the process-wide ones
+
+
+class BatchRunner:
+    def __init__(self, api_key, base_url=None, cache=None, usage_log=SHARED, ledger=SHARED,
+                 poll_seconds=60.0, max_wait_hours=24, state_dir=BATCH_DIR):
+        """usage_log=None turns token usage logging off; tokens count against
+        the quota ledger's OpenAI limit like live calls (ledger=None: not at all)"""
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                             http_client=httpx.Client(timeout=httpx.Timeout(120.0, connect=10.0)))
+        self.resilience = Resilience('openai-batch')
+        self.cache = cache if cache is not None else shared_llm_cache()
+        self.usage_log = shared_usage_log() if usage_log is SHARED else usage_log
+        self.ledger = shared_quota_ledger() if ledger is SHARED else ledger
+        self.poll_seconds = poll_seconds
+        self.max_wait_hours = max_wait_hours
+        self.state_dir = state_dir
+
+    def request_line(self, key, job):
+        """One JSONL request; the cache key doubles as custom_id"""
+        body = {name: value for name, value in job.items() if name not in ('label', 'force_refresh')}
+        body.setdefault('max_tokens', 1000)
+        body.setdefault('temperature', 0.7)
+        return {'custom_id': key, 'method': 'POST', 'url': ENDPOINT, 'body': body}
+
+    def job_key(self, job):
+        params = {name: value for name, value in job.items()
+                  if name not in ('model', 'messages', 'max_tokens', 'temperature', 'label', 'force_refresh')}
+        return self.cache.key(job['model'], job['messages'], job.get('temperature', 0.7),
+                              job.get('max_tokens', 1000), **params)
+
+    def submit(self, jobs, description='backfill'):
+        """Upload and start a batch for every job the cache can't answer yet
+
+        jobs are LLMClient.acomplete() keyword dicts. Returns the batch id,
+        or None when everything is already cached.
+        """
+        lines, labels, estimate = [], {}, 0
+        for job in jobs:
+            key = self.job_key(job)
+            if key in labels or (not job.get('force_refresh') and self.cache.get(key) is not None):
+                continue
+            labels[key] = {'label': job.get('label'), 'model': job['model']}
+            lines.append(json.dumps(self.request_line(key, job)))
+            estimate += count_message_tokens(job['messages'], job['model']) + job.get('max_tokens', 1000)
+        if not lines:
+            logging.info(f"📦 All {len(jobs)} {description} requests already cached")
+            return None
+        self.check_quota(estimate)
+
+        payload = ('\n'.join(lines) + '\n').encode('utf-8')
+        uploaded = self.resilience.call(lambda: self.client.files.create(
+            file=(f"{description}.jsonl", payload), purpose='batch'))
+        batch = self.resilience.call(lambda: self.client.batches.create(
+            input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window='24h',
+            metadata={'description': description}))
+
+        # Saved so a later run can collect a batch this one didn't wait for
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(os.path.join(self.state_dir, f"{batch.id}.json"), 'w') as f:
+            json.dump({'id': batch.id, 'description': description, 'submitted': time.time(),
+                       'requests': labels}, f, indent=2)
+        logging.info(f"📦 Submitted {len(lines)} {description} requests as batch {batch.id} "
+                     f"({len(jobs) - len(lines)} already cached)")
+        return batch.id
+
+    def check_quota(self, estimate):
+        """Raise ProviderError (kind 'quota') before uploading when the month's
+        token limit can't cover the batch"""
+        if self.ledger is not None and not self.ledger.can_spend('openai', 'tokens', estimate):
+            raise ProviderError('openai', 'quota', f"about {estimate} tokens needed, "
+                                f"{self.ledger.remaining('openai', 'tokens')} left this month")
+
+    def wait(self, batch_id):
+        """Poll until the batch reaches a final status or max_wait_hours pass"""
+        give_up = time.monotonic() + self.max_wait_hours * 3600
+        while True:
+            batch = self.resilience.call(lambda: self.client.batches.retrieve(batch_id),
+                                         wait_open=self.poll_seconds * 10)
+            counts = batch.request_counts
+            if counts is not None:
+                logging.info(f"⏳ Batch {batch_id} {batch.status}: "
+                             f"{counts.completed + counts.failed}/{counts.total} done")
+            if batch.status in FINISHED:
+                return batch
+            if time.monotonic() > give_up:
+                raise TimeoutError(f"Batch {batch_id} still {batch.status} after {self.max_wait_hours}h")
+            time.sleep(self.poll_seconds)
+
+    def collect(self, batch):
+        """Cache every answer in a finished batch; returns {custom_id: text or Exception}"""
+        with open(os.path.join(self.state_dir, f"{batch.id}.json"), 'r') as f:
+            requests = json.load(f)['requests']
+
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = self.resilience.call(lambda: self.client.files.content(file_id).text)
+            for line in content.splitlines():
+                if line.strip():
+                    key, result = self.read_result(json.loads(line), requests)
+                    results[key] = result
+
+        for key in requests:
+            results.setdefault(key, RuntimeError(f"no result in batch ({batch.status})"))
+        failed = sum(1 for result in results.values() if isinstance(result, Exception))
+        logging.info(f"📦 Batch {batch.id} {batch.status}: {len(results) - failed} answers cached, "
+                     f"{failed} failed")
+        return results
+
+    def read_result(self, entry, requests):
+        key = entry['custom_id']
+        response = entry.get('response') or {}
+        if entry.get('error') or response.get('status_code') != 200:
+            error = entry.get('error') or response.get('body', {}).get('error') or {}
+            return key, RuntimeError(error.get('message', f"status {response.get('status_code')}"))
+
+        body = response['body']
+        text = body['choices'][0]['message']['content'].strip()
+        self.cache.put(key, text)
+        usage = body.get('usage') or {}
+        request = requests.get(key, {})
+        if self.ledger is not None:
+            self.ledger.record('openai', 'tokens',
+                               usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0))
+        if self.usage_log is not None:
+            self.usage_log.record(f"batch:{request.get('label') or 'unlabelled'}",
+                                  body.get('model') or request.get('model', ''),
+                                  usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0),
+                                  0.0, price_factor=BATCH_PRICE_FACTOR)
+        return key, text
+
+    def run(self, jobs, description='backfill'):
+        """Submit, wait and collect; answers (or exceptions) in job order"""
+        batch_id = self.submit(jobs, description)
+        results = self.collect(self.wait(batch_id)) if batch_id else {}
+        answers = []
+        for job in jobs:
+            key = self.job_key(job)
+            answer = results.get(key)
+            if answer is None:
+                answer = self.cache.get(key)
+            answers.append(answer if answer is not None else RuntimeError("missing from batch"))
+        return answers
+
+    def resume(self, batch_id):
+        """Collect a batch submitted by an earlier run"""
+        return self.collect(self.wait(batch_id))
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark two-host dialogue rendering on the newsletter corpus
+Compares voicing the turns one after another against batching each host's
+turns and voicing the hosts side by side, for wall-clock time
+
+Speech comes from a local stand-in voice whose latency grows with the
+text's length and whose audio is real MP3 frames, so runs are repeatable
+and free and the interleaved episode is actually written.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from statistics import median
+
+from dialogue import DialogueRenderer
+from mp3_tools import file_duration
+from tts_engine import TTSEngine
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'newsletter_corpus')
+HOSTS = ('Mark', 'Sarah')
+
+# Stand-in voice speed: time to first byte plus generation per character
+BASE_SECONDS = 0.08
+SECONDS_PER_CHAR = 0.0001
+FRAMES_PER_CHAR = 2  # roughly 15 characters of speech a second
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz
+FRAME = b'\xff\xfb\x90\x44' + bytes(413)
+
+TURN_CHARS = 400
+STORY_TURNS = 4
+
+
+def stand_in_voice(text, previous_text=None, next_text=None):
+    time.sleep(BASE_SECONDS + len(text) * SECONDS_PER_CHAR)
+    return FRAME * (len(text) * FRAMES_PER_CHAR)
+
+
+def dialogue_script(body, max_turns):
+    """The issue's paragraphs as alternating host turns, a transition cue
+    between every few"""
+    paragraphs = [' '.join(line.split()) for line in body.split('\n') if len(line.strip()) > 40]
+    lines = ["[INTRO MUSIC]"]
+    for number, paragraph in enumerate(paragraphs[:max_turns]):
+        if number and number % STORY_TURNS == 0:
+            lines.append("[TRANSITION SOUND]")
+        if len(paragraph) > TURN_CHARS:
+            paragraph = paragraph[:TURN_CHARS].rsplit(' ', 1)[0] + '.'
+        lines.append(f"{HOSTS[number % 2].upper()}: {paragraph}")
+    lines.append("[OUTRO MUSIC]")
+    return '\n\n'.join(lines)
+
+
+def strategies():
+    def renderer(workers, parallel):
+        return DialogueRenderer({host: TTSEngine(stand_in_voice, max_workers=workers) for host in HOSTS},
+                                parallel=parallel)
+    return {
+        'sequential': renderer(1, False),
+        'per_host_x1': renderer(1, True),
+        'per_host_x2': renderer(2, True),
+        'per_host_x4': renderer(4, True),
+    }
+
+
+def time_render(renderer, script, runs):
+    """Median wall-clock seconds and the episode's audio length"""
+    seconds = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory:
+        path = os.path.join(directory, 'dialogue.mp3')
+        for _ in range(runs):
+            start = time.perf_counter()
+            renderer.render_to(script, path)
+            seconds.append(time.perf_counter() - start)
+        return median(seconds), file_duration(path)
+
+
+def run_corpus_benchmark(runs, max_turns=24):
+    scripts = {}
+    for filename in sorted(os.listdir(CORPUS_DIR)):
+        if filename.endswith('.txt'):
+            with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+                scripts[filename] = dialogue_script(f.read(), max_turns)
+    named = strategies()
+
+    print(f"🗣️ Two-host dialogue rendering (stand-in voice, up to {max_turns} turns, median of {runs})")
+    print("=" * 86)
+    print(f"{'newsletter':<28}{'strategy':<14}{'turns':>7}{'chars':>8}{'audio s':>9}"
+          f"{'wall ms':>10}{'speedup':>9}")
+    totals = {name: 0.0 for name in named}
+    for filename, script in scripts.items():
+        baseline = None
+        for name, renderer in named.items():
+            seconds, audio = time_render(renderer, script, runs)
+            baseline = baseline or seconds
+            totals[name] += seconds
+            stats = renderer.last_stats
+            print(f"{filename[:27]:<28}{name:<14}{stats['turns']:>7}{stats['characters']:>8}"
+                  f"{audio:>9.0f}{seconds * 1000:>10.0f}{baseline / seconds:>8.1f}x")
+
+    print("-" * 86)
+    for name, total in totals.items():
+        print(f"{'TOTAL':<28}{name:<14}{'':>7}{'':>8}{'':>9}{total * 1000:>10.0f}"
+              f"{totals['sequential'] / total:>8.1f}x")
+
+
+def run_scaling_benchmark():
+    """Wall-clock time as the conversation grows, sequential versus per host"""
+    with open(os.path.join(CORPUS_DIR, 'puck_long_issue.txt'), 'r', encoding='utf-8') as f:
+        body = f.read()
+    body = '\n'.join([body] * 4)  # enough paragraphs for the longest run
+    named = strategies()
+    print("\n📈 Dialogue rendering time by number of turns (ms)")
+    print("=" * 86)
+    print(f"{'turns':<10}" + ''.join(f"{name:>16}" for name in named))
+    for turns in (4, 8, 16, 32):
+        script = dialogue_script(body, turns)
+        print(f"{turns:<10}" + ''.join(f"{time_render(renderer, script, 1)[0] * 1000:>16.0f}"
+                                       for renderer in named.values()))
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    run_corpus_benchmark(runs)
+    run_scaling_benchmark()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark article extraction on the saved-HTML corpus
+Compares the old selector/paragraph approach against ContentExtractor
+for both speed and extraction quality
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from statistics import median
+
+from bs4 import BeautifulSoup
+
+from content_extractor import ContentExtractor
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_corpus')
+
+
+def legacy_selector_extract(html):
+    """The extraction previously inlined in LinkFollowingNewsletterAgent"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'header', 'footer',
+                         'aside', 'form', 'button', 'iframe']):
+        element.decompose()
+
+    article_text = ""
+    article_selectors = [
+        'article', 'main', '[role="main"]', '.article-content',
+        '.post-content', '.entry-content', '.content-body',
+        '.story-body', '.article-body', '.post-body'
+    ]
+    for selector in article_selectors:
+        elements = soup.select(selector)
+        if elements:
+            article_text = ' '.join([elem.get_text(strip=True) for elem in elements])
+            if len(article_text) > 200:
+                break
+
+    if len(article_text) < 200:
+        paragraphs = soup.find_all('p')
+        article_text = ' '.join([p.get_text(strip=True) for p in paragraphs
+                                 if len(p.get_text(strip=True)) > 50])
+    return re.sub(r'\s+', ' ', article_text)
+
+
+def legacy_candidate_extract(html):
+    """The generic candidate scan previously used by ImprovedMandoProcessor"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+        element.decompose()
+
+    article_text = ""
+    article_candidates = soup.find_all(['article', 'main', 'div'],
+                                       class_=re.compile('content|article|story|post'))
+    for candidate in article_candidates:
+        text = candidate.get_text(strip=True)
+        if len(text) > len(article_text):
+            article_text = text
+
+    if len(article_text) < 200:
+        paragraphs = soup.find_all('p')
+        article_text = ' '.join([p.get_text(strip=True) for p in paragraphs
+                                 if len(p.get_text(strip=True)) > 50])
+    return re.sub(r'\s+', ' ', article_text)
+
+
+def content_extractor_extract(html, extractor=ContentExtractor()):
+    return extractor.extract(html)['content']
+
+
+EXTRACTORS = {
+    'legacy_selectors': legacy_selector_extract,
+    'legacy_candidates': legacy_candidate_extract,
+    'content_extractor': content_extractor_extract,
+}
+
+
+def nested_page(depth, paragraphs=40):
+    """Synthetic page with deeply nested 'content' divs (worst case for candidate scans)"""
+    body = ''.join(
+        f'<p>Paragraph {i} of the nested story, with enough words, commas, and detail to count as prose.</p>'
+        for i in range(paragraphs)
+    )
+    opening = ''.join(f'<div class="content-wrapper-{i}">' for i in range(depth))
+    closing = '</div>' * depth
+    return f'<html><body><nav><a href="/">Home</a></nav>{opening}{body}{closing}</body></html>'
+
+
+def time_call(func, html, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(html)
+        timings.append(time.perf_counter() - start)
+    return median(timings) * 1000
+
+
+def score_quality(text, expectations):
+    """Fraction of key sentences kept, and number of boilerplate strings leaked"""
+    included = sum(1 for phrase in expectations['must_include'] if phrase in text)
+    leaked = sum(1 for phrase in expectations['must_exclude'] if phrase in text)
+    recall = included / len(expectations['must_include'])
+    return recall, leaked
+
+
+def run_corpus_benchmark(runs):
+    with open(os.path.join(CORPUS_DIR, 'expected.json'), 'r') as f:
+        expected = json.load(f)
+
+    print("📚 Saved-HTML corpus")
+    print("=" * 78)
+    print(f"{'page':<32}{'extractor':<20}{'ms':>8}{'recall':>9}{'leaks':>7}")
+
+    totals = {name: {'ms': 0.0, 'recall': 0.0, 'leaks': 0} for name in EXTRACTORS}
+    for filename, expectations in expected.items():
+        with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        for name, func in EXTRACTORS.items():
+            ms = time_call(func, html, runs)
+            recall, leaked = score_quality(func(html), expectations)
+            totals[name]['ms'] += ms
+            totals[name]['recall'] += recall
+            totals[name]['leaks'] += leaked
+            print(f"{filename[:31]:<32}{name:<20}{ms:>8.2f}{recall:>9.0%}{leaked:>7}")
+
+    print("-" * 78)
+    pages = len(expected)
+    for name, total in totals.items():
+        print(f"{'TOTAL':<32}{name:<20}{total['ms']:>8.2f}"
+              f"{total['recall'] / pages:>9.0%}{total['leaks']:>7}")
+
+
+def run_nesting_benchmark(runs):
+    print("\n🪆 Nested-div scaling (ms per page)")
+    print("=" * 78)
+    print(f"{'depth':<10}" + ''.join(f"{name:>22}" for name in EXTRACTORS))
+    for depth in (10, 50, 100, 200, 400):
+        html = nested_page(depth)
+        row = f"{depth:<10}"
+        for func in EXTRACTORS.values():
+            row += f"{time_call(func, html, runs):>22.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    run_corpus_benchmark(runs)
+    run_nesting_benchmark(runs)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark long-newsletter condensing on the newsletter corpus
+Compares the old 3000-character cut against extractive and map-reduce
+condensing for latency, throughput and how much of each issue survives
+
+LLM calls go to a local stand-in chat server whose latency grows with
+prompt and completion size, so runs are repeatable and free.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import median
+
+from chunked_summarizer import ChunkedSummarizer, extractive_summary
+from llm_client import LLMClient
+from token_budget import compress_text, count_tokens
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'newsletter_corpus')
+
+# Stand-in model speed: fixed overhead, prompt reading and token generation
+BASE_SECONDS = 0.08
+PROMPT_SECONDS_PER_TOKEN = 0.00005
+COMPLETION_SECONDS_PER_TOKEN = 0.0015
+
+BUDGET_TOKENS = 750  # the same size as the old 3000-character cut
+SCRIPT_TOKENS = 1000
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][-1]['content']
+        if 'Condense this part' in prompt:
+            part = prompt.split(':\n\n', 1)[1].rsplit('\n\nCondense this part', 1)[0]
+            text = extractive_summary(part, body['max_tokens'])
+        else:
+            text = ' '.join(prompt.split()[:body['max_tokens'] * 3 // 4])
+        time.sleep(BASE_SECONDS + count_tokens(prompt) * PROMPT_SECONDS_PER_TOKEN
+                   + count_tokens(text) * COMPLETION_SECONDS_PER_TOKEN)
+        payload = json.dumps({
+            'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': 0,
+            'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': text}}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_stand_in():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def write_script(client, body):
+    return client.complete([{'role': 'user', 'content': f"Write a podcast script:\n\n{body}"}],
+                           'stand-in', max_tokens=SCRIPT_TOKENS)
+
+
+def strategies(base_url):
+    sequential = LLMClient('bench', max_concurrency=1, base_url=base_url, max_retries=0)
+    parallel = LLMClient('bench', max_concurrency=4, base_url=base_url, max_retries=0)
+    return {
+        'truncate_3000': (parallel, lambda body: body[:3000]),
+        'extractive': (parallel, ChunkedSummarizer(chunk_tokens=400).condense),
+        'map_reduce_x1': (sequential, ChunkedSummarizer(sequential, 'stand-in', chunk_tokens=400).condense),
+        'map_reduce_x4': (parallel, ChunkedSummarizer(parallel, 'stand-in', chunk_tokens=400).condense),
+    }, (sequential, parallel)
+
+
+def score_coverage(text, expectations):
+    """Fraction of per-section key facts kept, and number of boilerplate strings leaked"""
+    included = sum(1 for phrase in expectations['must_include'] if phrase in text)
+    leaked = sum(1 for phrase in expectations['must_exclude'] if phrase in text)
+    return included / len(expectations['must_include']), leaked
+
+
+def run_corpus_benchmark(runs):
+    with open(os.path.join(CORPUS_DIR, 'expected.json'), 'r') as f:
+        expected = json.load(f)
+    bodies = {}
+    for filename in expected:
+        with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+            bodies[filename] = f.read()
+
+    server, base_url = start_stand_in()
+    named, clients = strategies(base_url)
+    try:
+        print("📰 Long-newsletter corpus "
+              f"(budget {BUDGET_TOKENS} tokens, stand-in model, median of {runs})")
+        print("=" * 86)
+        print(f"{'newsletter':<28}{'strategy':<16}{'tokens in':>10}{'sent':>7}"
+              f"{'prep ms':>9}{'total ms':>10}{'kept':>7}{'leaks':>7}")
+
+        totals = {name: {'prep': 0.0, 'total': 0.0, 'kept': 0.0, 'leaks': 0} for name in named}
+        for filename, expectations in expected.items():
+            body = bodies[filename]
+            for name, (client, condense) in named.items():
+                preps, ends = [], []
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    if name == 'truncate_3000':
+                        sent = condense(body)
+                    else:
+                        sent = condense(body, budget_tokens=BUDGET_TOKENS)
+                    prepared = time.perf_counter()
+                    write_script(client, sent)
+                    preps.append(prepared - start)
+                    ends.append(time.perf_counter() - start)
+                kept, leaked = score_coverage(sent, expectations)
+                prep_ms, total_ms = median(preps) * 1000, median(ends) * 1000
+                totals[name]['prep'] += prep_ms
+                totals[name]['total'] += total_ms
+                totals[name]['kept'] += kept
+                totals[name]['leaks'] += leaked
+                print(f"{filename[:27]:<28}{name:<16}{count_tokens(body):>10}"
+                      f"{count_tokens(sent):>7}{prep_ms:>9.0f}{total_ms:>10.0f}"
+                      f"{kept:>7.0%}{leaked:>7}")
+
+        print("-" * 86)
+        issues = len(expected)
+        for name, total in totals.items():
+            per_minute = 60000 * issues / total['total']
+            print(f"{'TOTAL':<28}{name:<16}{'':>10}{'':>7}{total['prep']:>9.0f}"
+                  f"{total['total']:>10.0f}{total['kept'] / issues:>7.0%}{total['leaks']:>7}"
+                  f"   {per_minute:.0f} issues/min")
+    finally:
+        for client in clients:
+            client.close()
+        server.shutdown()
+
+
+def run_scaling_benchmark():
+    """Map-reduce latency as the input grows, sequential versus parallel chunks"""
+    issues = []
+    for filename in sorted(os.listdir(CORPUS_DIR)):
+        if filename.endswith('.txt'):
+            with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+                issues.append(compress_text(f.read()))
+    server, base_url = start_stand_in()
+    named, clients = strategies(base_url)
+    try:
+        print("\n📈 Condensing latency by input length (ms)")
+        print("=" * 86)
+        print(f"{'issues':<10}{'tokens':>8}{'map_reduce_x1':>18}{'map_reduce_x4':>18}{'chunks':>9}")
+        for count in range(1, len(issues) + 1):
+            body = '\n\n---\n\n'.join(issues[:count])
+            row = f"{count:<10}{count_tokens(body):>8}"
+            for name in ('map_reduce_x1', 'map_reduce_x4'):
+                condense = named[name][1]
+                start = time.perf_counter()
+                condense(body, budget_tokens=BUDGET_TOKENS)
+                row += f"{(time.perf_counter() - start) * 1000:>18.0f}"
+            row += f"{condense.__self__.last_stats['chunks']:>9}"
+            print(row)
+    finally:
+        for client in clients:
+            client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    run_corpus_benchmark(runs)
+    run_scaling_benchmark()
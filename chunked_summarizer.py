@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Chunked Summarizer
+Map-reduce condensing for long newsletters: the cleaned body is split on
+section boundaries, chunks are summarized in parallel, and the partial
+summaries are merged under a token budget instead of being cut off
+"""
+
+import logging
+import re
+import time
+
+from token_budget import SEPARATOR, compress_text, count_tokens
+
+# English prose averages about four characters per token; used to size splits
+CHARS_PER_TOKEN = 4
+
+MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+\S')
+SENTENCE_END = re.compile(r'(?<=[.!?…])["”’)\]]*\s+(?=["“‘(\[]?[A-Z0-9$])')
+
+SYSTEM_PROMPT = ("You condense newsletter sections for a podcast script writer. Keep every "
+                 "distinct story with its names, numbers and direct quotes; drop links, ads, "
+                 "sign-up prompts and filler. Write plain prose, no headings or bullet symbols.")
+
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
+
+
+def is_heading(paragraph):
+    """Short, unpunctuated single lines that introduce a new section"""
+    if '\n' in paragraph or len(paragraph) > 80:
+        return False
+    if MARKDOWN_HEADING.match(paragraph):
+        return True
+    letters = [c for c in paragraph if c.isalpha()]
+    if len(letters) >= 4 and paragraph.upper() == paragraph:
+        return True
+    return len(paragraph.split()) <= 8 and paragraph[-1] not in '.!?,;"”'
+
+
+def split_sections(text):
+    """Group paragraphs under the heading or separator that precedes them"""
+    sections, current = [], []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if SEPARATOR.match(paragraph):
+            if current:
+                sections.append('\n\n'.join(current))
+            current = []
+            continue
+        if is_heading(paragraph) and current and not is_heading(current[-1]):
+            sections.append('\n\n'.join(current))
+            current = []
+        current.append(paragraph)
+    if current:
+        sections.append('\n\n'.join(current))
+    return sections
+
+
+def split_oversized(section, chunk_tokens):
+    """Break a section too big for one chunk on paragraphs, then sentences"""
+    pieces = []
+    for paragraph in section.split('\n\n'):
+        if count_tokens(paragraph) <= chunk_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in split_sentences(paragraph):
+            limit = chunk_tokens * CHARS_PER_TOKEN
+            pieces.extend(sentence[i:i + limit] for i in range(0, len(sentence), limit))
+    return pieces
+
+
+def pack_chunks(sections, chunk_tokens):
+    """Pack consecutive sections into chunks of at most chunk_tokens each"""
+    chunks, current, size = [], [], 0
+    for section in sections:
+        parts = [section] if count_tokens(section) <= chunk_tokens else split_oversized(section, chunk_tokens)
+        for part in parts:
+            tokens = count_tokens(part) + 1
+            if current and size + tokens > chunk_tokens:
+                chunks.append('\n\n'.join(current))
+                current, size = [], 0
+            current.append(part)
+            size += tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+def heading_and_sentences(section):
+    paragraphs = section.split('\n\n')
+    headings = []
+    while paragraphs and is_heading(paragraphs[0]) and len(paragraphs) > 1:
+        headings.append(paragraphs.pop(0).lstrip('#').strip())
+    return ' '.join(headings), split_sentences(' '.join(' '.join(paragraphs).split()))
+
+
+def extractive_summary(text, budget_tokens):
+    """No-LLM condensing: lead sentences from every section, round-robin
+
+    Taking the first sentence of each section before the second of any keeps
+    the whole issue represented rather than just its opening.
+    """
+    sections = [heading_and_sentences(section) for section in split_sections(text)]
+    chosen = [[] for _ in sections]
+    used, depth, added = 0, 0, True
+    while added:
+        added = False
+        for index, (heading, sentences) in enumerate(sections):
+            if depth >= len(sentences):
+                continue
+            cost = count_tokens(sentences[depth]) + 1
+            if depth == 0 and heading:
+                cost += count_tokens(heading) + 1
+            if used + cost > budget_tokens:
+                continue
+            chosen[index].append(sentences[depth])
+            used += cost
+            added = True
+        depth += 1
+    summary = '\n\n'.join((f"{heading}\n" if heading else "") + ' '.join(picked)
+                           for (heading, _), picked in zip(sections, chosen) if picked)
+    if not summary and text:
+        summary = text[:budget_tokens * CHARS_PER_TOKEN].rsplit(' ', 1)[0] + "..."
+    return summary
+
+
+class ChunkedSummarizer:
+    def __init__(self, llm=None, model=None, chunk_tokens=1000, budget_tokens=1500,
+                 summary_tokens=300, min_summary_tokens=80, temperature=0.3, max_rounds=3):
+        self.llm = llm
+        self.model = model
+        self.chunk_tokens = chunk_tokens
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.min_summary_tokens = min_summary_tokens
+        self.temperature = temperature
+        self.max_rounds = max_rounds
+        self.last_stats = {}
+
+    def summarize_chunks(self, chunks, tokens_each, context, force_refresh=False):
+        """Map step: one parallel LLM call per chunk; failures fall back to extraction"""
+        words = max(30, tokens_each * 3 // 4)
+        jobs = [{
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"{context}Part {i} of {len(chunks)}:\n\n{chunk}\n\n"
+                                            f"Condense this part to at most {words} words."}
+            ],
+            'max_tokens': tokens_each,
+            'temperature': self.temperature,
+            'force_refresh': force_refresh,
+            'label': 'condense'
+        } for i, chunk in enumerate(chunks, 1)]
+
+        summaries = []
+        for chunk, result in zip(chunks, self.llm.complete_many(jobs)):
+            if isinstance(result, Exception):
+                logging.warning(f"Chunk summary failed, using extract instead: {result}")
+                self.last_stats['fallbacks'] += 1
+                result = extractive_summary(chunk, tokens_each)
+            summaries.append(result)
+        self.last_stats['llm_calls'] += len(jobs)
+        return summaries
+
+    def condense(self, text, budget_tokens=None, subject=None, force_refresh=False):
+        """Return the newsletter body cut down to budget_tokens, covering every section
+
+        Bodies already within budget come back cleaned but otherwise untouched.
+        """
+        budget = budget_tokens or self.budget_tokens
+        start = time.monotonic()
+        raw_tokens = count_tokens(text or "")
+        text = compress_text(text or "")
+        self.last_stats = {'raw_tokens': raw_tokens, 'input_tokens': count_tokens(text),
+                           'chunks': 0, 'rounds': 0, 'llm_calls': 0, 'fallbacks': 0, 'method': 'none'}
+        if self.last_stats['input_tokens'] <= budget:
+            merged = text
+        elif self.llm is None:
+            merged = extractive_summary(text, budget)
+            self.last_stats['method'] = 'extractive'
+        else:
+            context = f"Newsletter: {subject}\n" if subject else ""
+            pieces = pack_chunks(split_sections(text), self.chunk_tokens)
+            self.last_stats.update(chunks=len(pieces), method='map_reduce')
+            merged = text
+            for round_number in range(self.max_rounds):
+                # Map summaries stay short and focused; reduce rounds may use the whole budget
+                cap = self.summary_tokens if round_number == 0 else budget
+                tokens_each = max(self.min_summary_tokens, min(cap, budget // len(pieces)))
+                merged = '\n\n'.join(self.summarize_chunks(pieces, tokens_each, context, force_refresh))
+                self.last_stats['rounds'] += 1
+                if count_tokens(merged) <= budget:
+                    break
+                # Reduce step: the partial summaries become the next round's input
+                pieces = pack_chunks(merged.split('\n\n'), self.chunk_tokens)
+            else:
+                merged = extractive_summary(merged, budget)
+
+        self.last_stats['output_tokens'] = count_tokens(merged)
+        self.last_stats['seconds'] = round(time.monotonic() - start, 2)
+        if self.last_stats['method'] != 'none':
+            logging.info(f"🧩 Condensed {raw_tokens} → {self.last_stats['input_tokens']} tokens "
+                         f"after cleanup → {self.last_stats['output_tokens']} "
+                         f"({self.last_stats['method']}, {self.last_stats['chunks']} chunks, "
+                         f"{self.last_stats['llm_calls']} calls, {self.last_stats['seconds']:.1f}s)")
+        elif raw_tokens > self.last_stats['output_tokens']:
+            logging.info(f"✂️ Cleanup cut the newsletter from {raw_tokens} to "
+                         f"{self.last_stats['output_tokens']} tokens")
+        return merged
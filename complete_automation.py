@@ -11,28 +11,36 @@ import json
 import os
 import ssl
 import time
-import requests
 import base64
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 import schedule
 import logging
 import re
 from typing import Dict, Optional
-import openai
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('podcast_automation.log'),
-        logging.StreamHandler()
-    ]
-)
+from chunked_summarizer import ChunkedSummarizer
+from llm_client import scheduled_llm_client, llm_configured
+from mail_pool import file_attachment
+from resilience import ProviderError, configure_limits
+from segment_store import episode_id, shared_segment_store
+from tts_engine import elevenlabs_engine, episode_tags
+from token_budget import max_tokens_for_duration
+
+
+def setup_logging():
+    """Log to podcast_automation.log and the console; called by the entry points, not
+    on import, so importing this module leaves logging alone"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('podcast_automation.log'),
+            logging.StreamHandler()
+        ]
+    )
+
 
 class PodcastAutomationAgent:
     def __init__(self, config_file='aol_complete_config.json'):
@@ -41,7 +49,8 @@ class PodcastAutomationAgent:
         self.podcasts_dir = self.config['output']['podcast_folder']
         os.makedirs(self.podcasts_dir, exist_ok=True)
         
-        # Initialize API clients
+        # Initialize API clients and the monthly quota ledger
+        configure_limits(self.config)
         self.setup_openai()
         
     def load_config(self, config_file):
@@ -55,8 +64,10 @@ class PodcastAutomationAgent:
     
     def setup_openai(self):
         """Setup OpenAI client"""
-        if self.config['ai_processing']['api_key'] != "YOUR_OPENAI_API_KEY":
-            openai.api_key = self.config['ai_processing']['api_key']
+        self.llm = None
+        if llm_configured(self.config['ai_processing']):
+            # Waits out a tripped circuit and keeps to a daily token share
+            self.llm = scheduled_llm_client(self.config['ai_processing'])
         
     def connect_to_aol(self):
         """Connect to AOL email"""
@@ -184,40 +195,49 @@ class PodcastAutomationAgent:
         
         return body.strip()
     
-    def generate_podcast_script(self, email_data):
-        """Use AI to generate engaging podcast script"""
+    def generate_podcast_script(self, email_data, force_refresh=False):
+        """Use AI to generate engaging podcast script (cached unless force_refresh)"""
         try:
             logging.info("🤖 Generating podcast script with AI...")
             
-            if self.config['ai_processing']['api_key'] == "YOUR_OPENAI_API_KEY":
+            if self.llm is None:
                 # Fallback to built-in processing
                 return self.create_basic_script(email_data)
             
+            # Long issues are condensed section by section rather than cut off
+            ai_config = self.config['ai_processing']
+            summarizer = ChunkedSummarizer(
+                self.llm, ai_config.get('summary_model', ai_config['model']),
+                budget_tokens=ai_config.get('content_budget_tokens', 1500)
+            )
+            body = summarizer.condense(email_data['body'], subject=email_data['subject'],
+                                       force_refresh=force_refresh)
+            
             # Use OpenAI to create script
             prompt = f"""
             Subject: {email_data['subject']}
             From: {email_data['sender']}
             
             Email Content:
-            {email_data['body'][:3000]}  # Limit content length
+            {body}
             
             {self.config['ai_processing']['system_prompt']}
             
             Make it sound natural and engaging, like a friendly morning briefing.
             """
             
-            response = openai.ChatCompletion.create(
+            script = self.llm.complete(
                 model=self.config['ai_processing']['model'],
                 messages=[
                     {"role": "system", "content": "You are a professional podcast script writer who creates engaging, conversational content from email newsletters."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=1000,
-                temperature=0.7
+                max_tokens=max_tokens_for_duration(ai_config.get('target_minutes', 5)),
+                temperature=0.7,
+                force_refresh=force_refresh,
+                label='podcast_script'
             )
             
-            script = response.choices[0].message.content.strip()
-            
             # Calculate metadata
             word_count = len(script.split())
             estimated_duration = round(word_count / 150)  # 150 words per minute
@@ -239,9 +259,8 @@ class PodcastAutomationAgent:
         """Fallback script generation"""
         logging.info("📝 Creating basic podcast script...")
         
-        content = email_data['body']
-        sentences = content.split('. ')
-        summary = '. '.join(sentences[:4]) + '.' if len(sentences) >= 4 else content
+        # Lead sentences from every section, not just the first few of the email
+        summary = ChunkedSummarizer().condense(email_data['body'], budget_tokens=400)
         
         script = f"""
         Good morning! Welcome to your daily email podcast.
@@ -274,44 +293,31 @@ class PodcastAutomationAgent:
                 logging.warning("⚠️ ElevenLabs API key not configured, skipping voice generation")
                 return None
             
-            # ElevenLabs API endpoint
-            voice_id = self.config['voice_generation']['voice_id']
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+            # Retried with backoff; waits out a tripped circuit on scheduled runs
+            voice_config = self.config['voice_generation']
+            engine = elevenlabs_engine(voice_config, wait_open=voice_config.get('max_wait_seconds', 300))
             
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.config['voice_generation']['api_key']
-            }
-            
-            data = {
-                "text": script_data['script'],
-                "model_id": self.config['voice_generation']['model'],
-                "voice_settings": self.config['voice_generation']['voice_settings']
-            }
+            # Streamed straight into the audio file
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            audio_filename = f"daily_podcast_{timestamp}.mp3"
+            audio_path = os.path.join(self.podcasts_dir, audio_filename)
+            stats = shared_segment_store().render(engine, episode_id("Newsletter Podcast"),
+                                                  script_data['script'], audio_path,
+                                                  tags=episode_tags("Newsletter Podcast"))
             
-            response = requests.post(url, json=data, headers=headers)
+            logging.info(f"✅ Audio generated: {audio_filename}")
             
-            if response.status_code == 200:
-                # Save audio file
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                audio_filename = f"daily_podcast_{timestamp}.mp3"
-                audio_path = os.path.join(self.podcasts_dir, audio_filename)
-                
-                with open(audio_path, 'wb') as f:
-                    f.write(response.content)
-                
-                logging.info(f"✅ Audio generated: {audio_filename}")
-                
-                return {
-                    'audio_file': audio_path,
-                    'filename': audio_filename,
-                    'size_mb': round(len(response.content) / 1024 / 1024, 2)
-                }
-            else:
-                logging.error(f"❌ ElevenLabs API error: {response.status_code} - {response.text}")
-                return None
+            return {
+                'audio_file': audio_path,
+                'filename': audio_filename,
+                'size_mb': round(stats['bytes'] / 1024 / 1024, 2),
+                # Exact, from the MP3 frame headers
+                'duration_minutes': round(stats['duration_seconds'] / 60, 1)
+            }
                 
+        except ProviderError as e:
+            logging.error(f"❌ ElevenLabs API error: {e}")
+            return None
         except Exception as e:
             logging.error(f"❌ Voice generation failed: {e}")
             return None
@@ -332,7 +338,7 @@ class PodcastAutomationAgent:
             # Email body
             body = self.config['email_delivery']['body_template'].format(
                 email_subject=email_data['subject'],
-                duration=script_data['estimated_duration'],
+                duration=audio_data['duration_minutes'] if audio_data else script_data['estimated_duration'],
                 timestamp=datetime.now().strftime('%B %d, %Y at %I:%M %p')
             )
             
@@ -340,16 +346,7 @@ class PodcastAutomationAgent:
             
             # Attach audio file if available
             if audio_data:
-                with open(audio_data['audio_file'], "rb") as attachment:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment.read())
-                
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= {audio_data["filename"]}'
-                )
-                msg.attach(part)
+                msg.attach(file_attachment(audio_data['audio_file'], audio_data['filename']))
             else:
                 # Attach script as text file
                 script_attachment = MIMEText(script_data['script'])
@@ -448,9 +445,11 @@ class PodcastAutomationAgent:
                 
                 logging.info("🎉 Complete automation successful!")
                 logging.info(f"📊 Processed: {email_data['subject']}")
-                logging.info(f"🎙️ Duration: ~{script_data['estimated_duration']} minutes")
                 if audio_data:
+                    logging.info(f"🎙️ Duration: {audio_data['duration_minutes']} minutes")
                     logging.info(f"📁 Audio: {audio_data['size_mb']} MB")
+                else:
+                    logging.info(f"🎙️ Duration: ~{script_data['estimated_duration']} minutes (script estimate)")
             
             # Close connections
             imap.close()
@@ -479,10 +478,10 @@ class PodcastAutomationAgent:
             return False
         
         # Test 2: OpenAI (if configured)
-        if self.config['ai_processing']['api_key'] != "YOUR_OPENAI_API_KEY":
+        if self.llm is not None:
             print("2. Testing OpenAI API...")
             try:
-                test_response = openai.ChatCompletion.create(
+                self.llm.complete(
                     model="gpt-3.5-turbo",
                     messages=[{"role": "user", "content": "Say 'API test successful'"}],
                     max_tokens=10
@@ -558,6 +557,8 @@ def main():
 
 if __name__ == "__main__":
     import sys
+
+    setup_logging()
     
     if len(sys.argv) > 1 and sys.argv[1] == "--schedule":
         agent = PodcastAutomationAgent()
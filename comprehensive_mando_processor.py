@@ -13,7 +13,9 @@ import random
 logging.basicConfig(level=logging.INFO)
 
 class ComprehensiveMandoProcessor:
-    def __init__(self):
+    def __init__(self, router=None):
+        # Optional ModelRouter: per-item LLM expansion instead of templates only
+        self.router = router
         self.link_pattern = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
         
         # Comprehensive analysis templates for different types of news
@@ -123,14 +125,37 @@ class ComprehensiveMandoProcessor:
         
         return analysis
     
+    def news_category(self, item):
+        """Which analysis template fits an item, or None when only the generic one would"""
+        item_lower = item.lower()
+        if 'whale' in item_lower or 'wallet' in item_lower:
+            return 'whale_activity'
+        if 'etf' in item_lower:
+            return 'etf_flows' if re.search(r'([-+]?\$[\d.]+[bm]n?)', item) else None
+        if any(word in item_lower for word in ['bill', 'law', 'regulation', 'sec', 'cftc', 'senator']):
+            return 'regulatory_news'
+        if any(word in item_lower for word in ['greed', 'fear', 'sentiment', 'ath', 'all-time high']):
+            return 'market_sentiment'
+        if any(word in item_lower for word in ['defi', 'protocol', 'stake', 'yield', 'apy']):
+            return 'defi'
+        return None
+    
+    def expand_items(self, items):
+        """Expand every news item, concurrently across models when a router is set"""
+        if self.router is None:
+            return [self.expand_news_item(item) for item in items]
+        return self.router.expand_all(items, self.expand_news_item,
+                                      has_template=lambda item: self.news_category(item) is not None)
+    
     def expand_news_item(self, item):
         """Create comprehensive analysis for each news item"""
         
         # Detect type of news
         item_lower = item.lower()
+        category = self.news_category(item)
         
         # Whale activity
-        if 'whale' in item_lower or 'wallet' in item_lower:
+        if category == 'whale_activity':
             amount = re.search(r'\$[\d.]+[bm]', item) or re.search(r'[\d.]+[bm]\s*(?:btc|eth)', item_lower)
             amount_str = amount.group() if amount else "significant amount"
             
@@ -142,7 +167,7 @@ class ComprehensiveMandoProcessor:
             analysis += "Traders should monitor exchange inflows closely, as coins moving to exchanges often indicate selling pressure, while movement to cold storage suggests accumulation."
             
         # ETF flows
-        elif 'etf' in item_lower:
+        elif category == 'etf_flows':
             flow_match = re.search(r'([-+]?\$[\d.]+[bm]n?)', item)
             if flow_match:
                 flow = flow_match.group()
@@ -158,7 +183,7 @@ class ComprehensiveMandoProcessor:
                 analysis = self.generic_expansion(item)
         
         # Regulatory news
-        elif any(word in item_lower for word in ['bill', 'law', 'regulation', 'sec', 'cftc', 'senator']):
+        elif category == 'regulatory_news':
             analysis = f"{item}\n\nThis regulatory development represents a crucial inflection point for the crypto industry. "
             analysis += "Clear regulatory frameworks reduce uncertainty, which has historically been one of the biggest barriers to institutional adoption. "
             analysis += "If passed, this could unlock billions in sidelined institutional capital that has been waiting for regulatory clarity. "
@@ -167,7 +192,7 @@ class ComprehensiveMandoProcessor:
             analysis += "Short-term volatility is expected as traders position for various outcomes, but long-term, regulatory clarity is overwhelmingly positive for the ecosystem."
         
         # Market sentiment
-        elif any(word in item_lower for word in ['greed', 'fear', 'sentiment', 'ath', 'all-time high']):
+        elif category == 'market_sentiment':
             analysis = f"{item}\n\nMarket sentiment indicators are flashing important signals. "
             
             if 'greed' in item_lower:
@@ -183,7 +208,7 @@ class ComprehensiveMandoProcessor:
             analysis += "Risk management becomes paramount in these conditions. Consider scaling out of positions, tightening stops, or hedging with options."
         
         # DeFi/Protocol news
-        elif any(word in item_lower for word in ['defi', 'protocol', 'stake', 'yield', 'apy']):
+        elif category == 'defi':
             analysis = f"{item}\n\nThis DeFi development highlights the continued innovation in decentralized finance. "
             analysis += "Protocol updates and yield opportunities drive capital flows across the ecosystem. "
             analysis += "When major protocols announce changes, it often triggers a cascade of repositioning across related tokens and platforms. "
@@ -216,6 +241,10 @@ class ComprehensiveMandoProcessor:
         # Count all news items
         total_items = len(sections['all_items'])
         
+        # Expand every story up front so routed model calls run together
+        expanded = iter(self.expand_items(
+            sections['crypto_news'] + sections['market_news'] + sections['other_news']))
+        
         script = f"""Good morning and welcome to your comprehensive Mando Minutes analysis for {date_str}.
 
 I'm your AI market analyst, and today we're diving deep into {total_items} critical developments that could impact your trading decisions. We'll explore not just what happened, but why it matters and how you can position yourself accordingly.
@@ -240,7 +269,7 @@ Let's start with a market overview before diving into each story.
             
             for i, news in enumerate(sections['crypto_news'], 1):
                 script += f"Story {i} of {len(sections['crypto_news'])}: "
-                script += self.expand_news_item(news)
+                script += next(expanded)
                 script += "\n"
         
         # TRADITIONAL MARKET ANALYSIS
@@ -258,7 +287,7 @@ Let's start with a market overview before diving into each story.
             # Market news
             for i, news in enumerate(sections['market_news'], 1):
                 script += f"Macro Story {i}: "
-                script += self.expand_news_item(news)
+                script += next(expanded)
                 script += "\n"
         
         # OTHER DEVELOPMENTS
@@ -266,7 +295,7 @@ Let's start with a market overview before diving into each story.
             script += "**ADDITIONAL MARKET DEVELOPMENTS**\n\n"
             
             for news in sections['other_news']:
-                script += self.expand_news_item(news)
+                script += next(expanded)
                 script += "\n"
         
         # TRADING INSIGHTS AND ACTIONABLE TAKEAWAYS
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Readability-style Article Content Extractor
+Scores text density and link density bottom-up in a single tree walk
+and returns the text of the highest scoring node
+"""
+
+import re
+import logging
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Elements whose text never belongs to an article body
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header',
+    'footer', 'aside', 'form', 'button', 'iframe', 'select', 'input'
+}
+
+# Elements that hold a run of article prose
+PARAGRAPH_TAGS = {'p', 'pre', 'td', 'blockquote', 'li'}
+
+# A div with none of these inside it is treated as a paragraph
+BLOCK_TAGS = {
+    'p', 'div', 'pre', 'td', 'table', 'blockquote', 'li', 'ul', 'ol',
+    'dl', 'section', 'article', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'
+}
+
+POSITIVE_HINTS = re.compile(
+    r'article|body|content|entry|main|page|post|story|text|blog', re.I
+)
+NEGATIVE_HINTS = re.compile(
+    r'comment|footer|footnote|masthead|media|meta|nav|outbrain|promo|related|'
+    r'scroll|share|shoutbox|sidebar|sponsor|shopping|social|subscribe|'
+    r'newsletter|taboola|widget|advert|cookie|banner|popup|modal', re.I
+)
+
+
+class _NodeStats:
+    """Running totals for one element, filled in during the walk"""
+    __slots__ = ('text_len', 'link_len', 'commas', 'score', 'has_block')
+
+    def __init__(self):
+        self.text_len = 0
+        self.link_len = 0
+        self.commas = 0
+        self.score = 0.0
+        self.has_block = False
+
+
+class ContentExtractor:
+    def __init__(self, min_paragraph_length=25, min_text_length=200):
+        self.min_paragraph_length = min_paragraph_length
+        self.min_text_length = min_text_length
+
+    def class_weight(self, tag):
+        """Bonus or penalty from class/id names (same idea as readability)"""
+        weight = 0
+        for value in (tag.get('class'), tag.get('id')):
+            if not value:
+                continue
+            if isinstance(value, list):
+                value = ' '.join(value)
+            if NEGATIVE_HINTS.search(value):
+                weight -= 25
+            if POSITIVE_HINTS.search(value):
+                weight += 25
+        return weight
+
+    def score_tree(self, root):
+        """Walk the tree once (post-order) and score every element
+
+        Returns (stats, best_tag, meta) where stats is keyed by id(tag) and
+        meta holds the page title and declared canonical URL.
+        """
+        stats = {}
+        best_tag, best_score = None, float('-inf')
+        title = {'h1': None, 'title': None, 'og': None}
+        canonical = {'link': None, 'og': None}
+
+        # Iterative post-order walk: (node, parent, grandparent, children_done)
+        stack = [(root, None, None, False)]
+        while stack:
+            node, parent, grandparent, done = stack.pop()
+
+            if isinstance(node, NavigableString):
+                if type(node) is not NavigableString or parent is None:
+                    continue  # comments, CDATA, doctype, script text
+                text = node.strip()
+                if text:
+                    node_stats = stats[id(parent)]
+                    node_stats.text_len += len(text)
+                    node_stats.commas += text.count(',')
+                continue
+
+            name = node.name
+            if not done:
+                if name in SKIP_TAGS:
+                    if name == 'header' and title['h1'] is None:
+                        h1 = node.find('h1')
+                        if h1 is not None:
+                            title['h1'] = h1.get_text(' ', strip=True)
+                    continue
+                if name == 'meta' and node.get('property') == 'og:title':
+                    title['og'] = node.get('content')
+                elif name == 'meta' and node.get('property') == 'og:url':
+                    canonical['og'] = node.get('content')
+                elif name == 'link' and 'canonical' in (node.get('rel') or []):
+                    canonical['link'] = canonical['link'] or node.get('href')
+                elif name == 'title' and title['title'] is None:
+                    title['title'] = node.get_text(strip=True)
+                elif name == 'h1' and title['h1'] is None:
+                    title['h1'] = node.get_text(' ', strip=True)
+
+                stats[id(node)] = _NodeStats()
+                stack.append((node, parent, grandparent, True))
+                for child in reversed(node.contents):
+                    stack.append((child, node, parent, False))
+                continue
+
+            # All children have been folded into this node's totals
+            node_stats = stats[id(node)]
+            if name == 'a':
+                node_stats.link_len = node_stats.text_len
+
+            if parent is not None:
+                parent_stats = stats[id(parent)]
+                parent_stats.text_len += node_stats.text_len
+                parent_stats.link_len += node_stats.link_len
+                parent_stats.commas += node_stats.commas
+                if name in BLOCK_TAGS:
+                    parent_stats.has_block = True
+
+                # Paragraph scores flow up to the parent (full) and
+                # grandparent (half), so containers of prose win
+                is_paragraph = (name in PARAGRAPH_TAGS or
+                                (name == 'div' and not node_stats.has_block))
+                if (is_paragraph and
+                        node_stats.text_len >= self.min_paragraph_length):
+                    own_links = node_stats.link_len / node_stats.text_len
+                    paragraph_score = (1 + node_stats.commas +
+                                       min(node_stats.text_len / 100, 3))
+                    paragraph_score *= (1 - own_links)
+                    parent_stats.score += paragraph_score
+                    if grandparent is not None:
+                        stats[id(grandparent)].score += paragraph_score / 2
+
+            if node_stats.score <= 0 or node_stats.text_len == 0:
+                continue
+
+            link_density = node_stats.link_len / node_stats.text_len
+            final = (node_stats.score + self.class_weight(node)) * (1 - link_density)
+            node_stats.score = final
+            if final > best_score:
+                best_tag, best_score = node, final
+
+        meta = {
+            'title': title['og'] or title['h1'] or title['title'] or "",
+            'canonical_url': canonical['link'] or canonical['og'] or ""
+        }
+        return stats, best_tag, meta
+
+    def collect_text(self, node, stats):
+        """Gather readable text under the chosen node, skipping link farms"""
+        parts = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, NavigableString):
+                if type(current) is NavigableString:
+                    text = current.strip()
+                    if text:
+                        parts.append(text)
+                continue
+            if current.name in SKIP_TAGS:
+                continue
+            node_stats = stats.get(id(current))
+            if node_stats is None:
+                continue
+            if current is not node and node_stats.text_len:
+                # Drop "related stories" lists and share bars inside the body
+                link_density = node_stats.link_len / node_stats.text_len
+                if link_density > 0.5 and current.name not in ('a', 'p'):
+                    continue
+                if current.name != 'p' and self.class_weight(current) < 0:
+                    continue
+            stack.extend(reversed(current.contents))
+        return ' '.join(parts)
+
+    def article_nodes(self, best_tag, stats):
+        """The best node plus any siblings that look like more of the story"""
+        parent = best_tag.parent
+        if parent is None:
+            return [best_tag]
+
+        threshold = max(10, stats[id(best_tag)].score * 0.2)
+        nodes = []
+        for sibling in parent.children:
+            if not isinstance(sibling, Tag):
+                continue
+            sibling_stats = stats.get(id(sibling))
+            if sibling_stats is None:
+                continue
+            if sibling is best_tag or sibling_stats.score >= threshold:
+                nodes.append(sibling)
+            elif sibling.name == 'p' and sibling_stats.text_len > 80:
+                if sibling_stats.link_len / sibling_stats.text_len < 0.25:
+                    nodes.append(sibling)
+        return nodes
+
+    def extract(self, html):
+        """Extract {'title', 'content', 'canonical_url', 'score'} from HTML"""
+        soup = BeautifulSoup(html, 'html.parser')
+        stats, best_tag, meta = self.score_tree(soup)
+
+        content = ""
+        score = 0.0
+        if best_tag is not None:
+            content = ' '.join(self.collect_text(node, stats)
+                               for node in self.article_nodes(best_tag, stats))
+            score = stats[id(best_tag)].score
+
+        if len(content) < self.min_text_length:
+            # Pages without any paragraph structure: fall back to the body
+            body = soup.body or soup
+            fallback = self.collect_text(body, stats) if id(body) in stats else ""
+            if len(fallback) > len(content):
+                content = fallback
+
+        content = re.sub(r'\s+', ' ', content).strip()
+        return {
+            'title': meta['title'],
+            'content': content,
+            'canonical_url': meta['canonical_url'],
+            'score': round(score, 2)
+        }
+
+
+_default_extractor = ContentExtractor()
+
+
+def extract_article(html):
+    """Extract article title and body text using the shared extractor"""
+    try:
+        return _default_extractor.extract(html)
+    except Exception as e:
+        logging.error(f"Content extraction failed: {e}")
+        return {'title': "", 'content': "", 'canonical_url': "", 'score': 0.0}
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Deadline-Bounded Link Fetching
+Fetches links under one total time budget, hedges slow requests with a
+second attempt and returns whatever finished when the budget runs out
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class DeadlineFetcher:
+    def __init__(self, budget=8.0, hedge_after=None, min_hedge_window=1.0, max_workers=16):
+        self.budget = budget
+        # Hedge a request once it has taken longer than this
+        self.hedge_after = hedge_after if hedge_after is not None else budget / 3
+        # Don't bother hedging if less than this much time is left
+        self.min_hedge_window = min_hedge_window
+        self.max_workers = max_workers
+
+    def run(self, fetch, urls):
+        """Call fetch(url, timeout=...) for each URL, in the given (ranked) order
+
+        Hedge attempts are called with coalesce=False. Returns (results,
+        outcomes): results holds the successful fetch results in URL order,
+        outcomes one metrics dict per URL with status ok / empty / skipped /
+        failed / deadline, latency, attempts, whether a hedge attempt won
+        and whether the result was shared with a concurrent fetch.
+        """
+        start = time.monotonic()
+        deadline = start + self.budget
+        outcomes = [{'url': url, 'status': 'deadline', 'latency': None,
+                     'attempts': 0, 'hedged': False, 'won_by': None, 'shared': False}
+                    for url in urls]
+        results = {}
+        if not urls:
+            return [], outcomes
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls) * 2))
+        running = {}        # future -> (index, attempt name)
+        started = {}        # index -> monotonic start of the primary attempt
+        live_attempts = {}  # index -> attempts still in flight
+        resolved = set()
+
+        def launch(index, attempt):
+            timeout = max(0.5, deadline - time.monotonic())
+            if attempt == 'hedge':
+                # A hedge must not just join the primary's coalesced request
+                future = executor.submit(fetch, urls[index], timeout=timeout, coalesce=False)
+            else:
+                future = executor.submit(fetch, urls[index], timeout=timeout)
+            running[future] = (index, attempt)
+            live_attempts[index] = live_attempts.get(index, 0) + 1
+            outcomes[index]['attempts'] += 1
+
+        try:
+            for index in range(len(urls)):
+                started[index] = time.monotonic()
+                launch(index, 'primary')
+
+            while len(resolved) < len(urls) and running:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+
+                # Wake up for whichever comes first: a completion, the next
+                # hedge point, or the deadline
+                last_hedge = deadline - self.min_hedge_window
+                next_hedge = min((started[i] + self.hedge_after for i in started
+                                  if i not in resolved and not outcomes[i]['hedged']),
+                                 default=deadline)
+                if next_hedge > last_hedge:
+                    next_hedge = deadline
+                timeout = max(0.0, min(deadline, next_hedge) - now)
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    index, attempt = running.pop(future)
+                    live_attempts[index] -= 1
+                    if index in resolved:
+                        continue
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.warning(f"Fetch failed for {urls[index]}: {e}")
+                        result = None
+                    outcome = outcomes[index]
+                    if result and result.pop('shared', False):
+                        outcome['shared'] = True
+                    if result and result.get('content'):
+                        results[index] = result
+                        outcome.update(status='ok', won_by=attempt,
+                                       latency=round(time.monotonic() - started[index], 3))
+                        resolved.add(index)
+                    elif live_attempts[index] == 0:
+                        status = 'empty' if result else 'failed'
+                        if result and result.get('skipped'):
+                            status = 'skipped'
+                            outcome['reason'] = result['skipped']
+                        outcome.update(status=status,
+                                       latency=round(time.monotonic() - started[index], 3))
+                        resolved.add(index)
+
+                now = time.monotonic()
+                if now > last_hedge:
+                    continue
+                for index in started:
+                    outcome = outcomes[index]
+                    if (index not in resolved and not outcome['hedged']
+                            and now - started[index] >= self.hedge_after):
+                        outcome['hedged'] = True
+                        launch(index, 'hedge')
+        finally:
+            # Abandon stragglers: each attempt's timeout, waiting for a slot
+            # included, was what was left of the budget when it launched
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.monotonic() - start
+        finished = sum(1 for o in outcomes if o['status'] == 'ok')
+        logging.info(f"⏱️ Fetched {finished}/{len(urls)} links in {elapsed:.1f}s "
+                     f"(budget {self.budget:.0f}s, "
+                     f"{sum(1 for o in outcomes if o['hedged'])} hedged)")
+
+        return [results[i] for i in sorted(results)], outcomes
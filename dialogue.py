@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Two-Host Dialogue
+Scripts written as speaker turns ("MARK: ...", "SARAH: ...") are voiced
+with each host's own voice: every host's turns go out as one batch through
+that host's engine, the batches run side by side, and the turns are
+interleaved back into one gapless MP3 in script order
+"""
+
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mp3_tools import mapped
+from script_cues import split_cues
+from tts_engine import elevenlabs_engine, stitch
+
+# A speaker tag at the start of a line, e.g. "SARAH:" or "**Mark:**"
+TURN = re.compile(r"^[ \t]*[*_]*([A-Za-z][\w .'-]{0,30}?)[*_]*[ \t]*:[*_]*[ \t]*", re.MULTILINE)
+
+
+def host_voices(voice_config):
+    """{host name: voice_generation config} from voice_generation.hosts, each
+    host's voice_id and voice_settings laid over the shared ones"""
+    voices = {}
+    for name, host in voice_config.get('hosts', {}).items():
+        merged = {key: value for key, value in voice_config.items() if key != 'hosts'}
+        merged.update(host)
+        merged['voice_settings'] = dict(voice_config.get('voice_settings', {}), **host.get('voice_settings', {}))
+        voices[name] = merged
+    return voices
+
+
+def dialogue_hosts(voice_config):
+    """Host names when two or more are configured, else [] (one narrator)"""
+    hosts = list(voice_config.get('hosts', {}))
+    return hosts if len(hosts) >= 2 else []
+
+
+def dialogue_instructions(hosts):
+    """Prompt lines asking for the script as a conversation between hosts"""
+    names = ' and '.join([', '.join(hosts[:-1]), hosts[-1]]) if len(hosts) > 1 else hosts[0]
+    example = hosts[1] if len(hosts) > 1 else hosts[0]
+    return f"""Write it as a natural conversation between the hosts {names}, not a monologue:
+- Start every turn on its own line with the host's name in capitals and a colon, e.g. "{hosts[0].upper()}: ..." or "{example.upper()}: ..."
+- Start the first turn after every sound cue with a name too
+- Keep sound and music cues on their own lines in square brackets
+- Let the hosts react to each other, trade off stories and keep turns short
+"""
+
+
+def split_turns(script, speakers):
+    """split_cues for a dialogue: speech parts also carry 'speaker'; text
+    before the first tag goes to the first speaker"""
+    names = {name.lower(): name for name in speakers}
+    speaker, last, blocks = next(iter(names.values())), 0, []
+    for match in TURN.finditer(script):
+        name = names.get(match.group(1).strip().lower())
+        if name is None:
+            continue  # "MARKET UPDATE 1:" and the like are part of the turn
+        blocks.append((speaker, script[last:match.start()]))
+        speaker, last = name, match.end()
+    blocks.append((speaker, script[last:]))
+
+    parts = []
+    for speaker, text in blocks:
+        for part in split_cues(text):
+            if part['type'] == 'speech':
+                part['speaker'] = speaker
+            parts.append(part)
+    return parts
+
+
+class DialogueRenderer:
+    def __init__(self, engines, sounds=None, parallel=True):
+        """engines: {speaker: TTSEngine}, the first also voicing anything said
+        before the first speaker tag; cue clips come from sounds (default the
+        first engine's)
+
+        Each speaker's turns are voiced as one batch through their own
+        engine, all speakers at once; parallel=False voices the turns one
+        after another in script order instead. Renders like a TTSEngine, so
+        it can stand in for one in a SegmentStore.
+        """
+        self.engines = dict(engines)
+        first = next(iter(self.engines.values()))
+        self.sounds = sounds if sounds is not None else first.sounds
+        self.voice = {speaker: engine.voice for speaker, engine in self.engines.items()}
+        self.parallel = parallel
+        self.last_stats = {}
+
+    def render_to(self, script, path, tags=None):
+        """Write the whole dialogue to path as one MP3 and return its stats"""
+        return self.render_many([script], [path], tags)
+
+    def render_many(self, scripts, paths, tags=None):
+        """render_to for several scripts at once, each speaker's turns from
+        all of them in one batch; returns the combined stats"""
+        start = time.monotonic()
+        parts_by_script = [split_turns(script, self.engines) for script in scripts]
+        turns = [part for parts in parts_by_script for part in parts if part['type'] == 'speech']
+        cues = sum(len(parts) for parts in parts_by_script) - len(turns)
+        speakers = {speaker: {'turns': 0, 'billed_characters': 0, 'seconds': 0.0} for speaker in self.engines}
+
+        def voice(speaker, batch):
+            began = time.monotonic()
+            stats = self.engines[speaker].render_many([turn['text'] for turn in batch],
+                                                      [turn['file'] for turn in batch])
+            speakers[speaker]['turns'] += len(batch)
+            speakers[speaker]['billed_characters'] += stats['billed_characters']
+            speakers[speaker]['seconds'] += time.monotonic() - began
+
+        with tempfile.TemporaryDirectory(prefix="dialogue-") as workdir:
+            for number, turn in enumerate(turns):
+                turn['file'] = os.path.join(workdir, f"{number}.mp3")
+
+            if self.parallel:
+                batches = {speaker: [turn for turn in turns if turn['speaker'] == speaker]
+                           for speaker in self.engines}
+                batches = {speaker: batch for speaker, batch in batches.items() if batch}
+                if batches:
+                    with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix="dialogue") as pool:
+                        for future in [pool.submit(voice, speaker, batch) for speaker, batch in batches.items()]:
+                            future.result()
+            else:
+                for turn in turns:
+                    voice(turn['speaker'], [turn])
+
+            # Interleave the turns and cue clips back in script order
+            like = b''
+            if turns:
+                with mapped(turns[0]['file']) as first:
+                    like = bytes(first[:8192])
+            voiced = iter(turns)
+            size = duration = chapter_count = 0
+            for parts, path in zip(parts_by_script, paths):
+                writer = stitch(parts, path, lambda: [next(voiced)['file']], sounds=self.sounds,
+                                tags=tags, like=like)
+                size += writer.bytes
+                duration += writer.seconds
+                chapter_count += len(writer.chapters)
+
+        self.last_stats = {
+            'turns': len(turns),
+            'cues': cues,
+            'speakers': {speaker: dict(stats, seconds=round(stats['seconds'], 2))
+                         for speaker, stats in speakers.items()},
+            'characters': sum(len(turn['text']) for turn in turns),
+            'billed_characters': sum(stats['billed_characters'] for stats in speakers.values()),
+            'bytes': size,
+            'duration_seconds': round(duration, 3),
+            'chapters': chapter_count,
+            'seconds': round(time.monotonic() - start, 2)
+        }
+        logging.info(f"🗣️ Voiced {len(turns)} turns by {len(self.engines)} hosts "
+                     f"({'in parallel' if self.parallel else 'one at a time'}, "
+                     f"{self.last_stats['billed_characters']:,} characters billed) "
+                     f"in {self.last_stats['seconds']:.1f}s")
+        return self.last_stats
+
+
+def dialogue_engine(voice_config, timeout=120):
+    """DialogueRenderer with an ElevenLabs engine per host in
+    voice_generation.hosts; the plan's max_concurrency is split between them"""
+    voices = host_voices(voice_config)
+    share = max(1, voice_config.get('max_concurrency', 4) // max(len(voices), 1))
+    return DialogueRenderer({name: elevenlabs_engine(dict(config, max_concurrency=share), timeout=timeout)
+                             for name, config in voices.items()})
+
+
+def voice_engine(voice_config, timeout=120):
+    """dialogue_engine when two or more hosts are configured, otherwise the
+    single-voice elevenlabs_engine"""
+    if dialogue_hosts(voice_config):
+        return dialogue_engine(voice_config, timeout=timeout)
+    return elevenlabs_engine(voice_config, timeout=timeout)
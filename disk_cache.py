@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Disk Cache
+Small file-per-entry cache with TTL and size-bounded LRU eviction,
+shared by the article, LLM and audio caches
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Eviction trims to this share of max_bytes, so the next few writes don't walk again
+LOW_WATER = 0.9
+# The running total is recounted this often, since other processes write too
+RECOUNT_SECONDS = 300
+
+
+def cache_key(*parts):
+    """Stable SHA-256 key for any JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, directory, ttl_seconds=None, max_bytes=None):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = None  # running total, counted on the first write
+        self.counted_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        digest = hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + suffix)
+
+    def _fresh(self, path):
+        try:
+            modified = os.path.getmtime(path)
+        except OSError:
+            return False
+        if self.ttl_seconds is not None and time.time() - modified > self.ttl_seconds:
+            self._remove(path)
+            return False
+        return True
+
+    def _remove(self, path):
+        """Delete an entry and its marker, taking it off the running total"""
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            size = 0  # already gone, maybe removed by another thread
+        try:
+            os.remove(path + '.used')
+        except OSError:
+            pass
+        if size:
+            with self.lock:
+                if self.total_bytes is not None:
+                    self.total_bytes = max(0, self.total_bytes - size)
+
+    def _touch(self, path):
+        # LRU order lives in a marker file so reads don't reset the TTL
+        try:
+            os.utime(path + '.used', None)
+        except OSError:
+            try:
+                open(path + '.used', 'a').close()
+            except OSError:
+                pass
+
+    def _count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _added(self, path, replaced):
+        """Keep the running byte total and only walk the directory to evict
+        once it passes max_bytes"""
+        if self.max_bytes is None:
+            return
+        with self.lock:
+            if self.total_bytes is None or time.monotonic() - self.counted_at > RECOUNT_SECONDS:
+                self.total_bytes = sum(size for _, size, _ in self.entries())
+                self.counted_at = time.monotonic()
+            else:
+                self.total_bytes += self._size(path) - replaced
+            over = self.total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replaced = self._size(path)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._touch(path)
+        self._added(path, replaced)
+
+    def contains(self, key):
+        return self._fresh(self._path(key, '.json')) or self._fresh(self._path(key, '.bin'))
+
+    def get(self, key, default=None):
+        """JSON value stored under key, or default"""
+        path = self._path(key, '.json')
+        if not self._fresh(path):
+            self._count(hit=False)
+            return default
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return default
+        self._count(hit=True)
+        self._touch(path)
+        return value
+
+    def set(self, key, value):
+        self._write(self._path(key, '.json'),
+                    json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+    def get_path(self, key):
+        """Path of a fresh binary entry (for streaming/mmap), or None"""
+        path = self._path(key, '.bin')
+        if not self._fresh(path):
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        self._touch(path)
+        return path
+
+    def get_bytes(self, key):
+        path = self.get_path(key)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def set_bytes(self, key, data):
+        self._write(self._path(key, '.bin'), data)
+
+    def set_file(self, key, source):
+        """Move a finished file into the cache as a binary entry without reading it"""
+        path = self._path(key, '.bin')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replaced = self._size(path)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.move(source, tmp)
+        os.replace(tmp, path)
+        self._touch(path)
+        self._added(path, replaced)
+
+    def delete(self, key):
+        for suffix in ('.json', '.bin'):
+            self._remove(self._path(key, suffix))
+
+    def entries(self):
+        """(path, size, last_used) for every stored entry"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(('.json', '.bin')):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    size = os.path.getsize(path)
+                    try:
+                        last_used = os.path.getmtime(path + '.used')
+                    except OSError:
+                        last_used = os.path.getmtime(path)
+                except OSError:
+                    continue
+                found.append((path, size, last_used))
+        return found
+
+    def evict(self):
+        """Drop least recently used entries until under max_bytes, down to
+        LOW_WATER of it when over"""
+        if self.max_bytes is None:
+            return 0
+        with self.lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes if total <= self.max_bytes else self.max_bytes * LOW_WATER
+            removed = 0
+            for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+                if total <= target:
+                    break
+                for victim in (path, path + '.used'):
+                    try:
+                        os.remove(victim)
+                    except OSError:
+                        pass
+                total -= size
+                removed += 1
+            self.total_bytes = total
+            self.counted_at = time.monotonic()
+            return removed
+
+    def stats(self):
+        entries = self.entries()
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'hits': hits,
+            'misses': misses
+        }
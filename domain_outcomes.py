@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Per-Domain Fetch Outcomes
+Remembers across runs how each site behaved (paywalls, binary files,
+page weight) so future runs can rank and fetch its links accordingly
+"""
+
+import json
+import os
+import threading
+
+OUTCOMES_PATH = "cache/domain_outcomes.json"
+
+# Weight of the newest observation in the running averages
+SMOOTHING = 0.3
+
+
+class DomainOutcomes:
+    def __init__(self, path=OUTCOMES_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.domains = {}
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.domains = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, domain):
+        with self.lock:
+            return dict(self.domains.get(domain, {}))
+
+    def record(self, domain, outcome, size=None):
+        """Fold one fetch outcome (ok / paywall / binary / failed) into the domain's history"""
+        with self.lock:
+            entry = self.domains.setdefault(domain, {'fetches': 0, 'paywall_rate': 0.0,
+                                                     'skip_rate': 0.0})
+            entry['fetches'] += 1
+            paywalled = 1.0 if outcome == 'paywall' else 0.0
+            skipped = 1.0 if outcome in ('paywall', 'binary') else 0.0
+            entry['paywall_rate'] = round(
+                entry['paywall_rate'] * (1 - SMOOTHING) + paywalled * SMOOTHING, 4)
+            entry['skip_rate'] = round(
+                entry['skip_rate'] * (1 - SMOOTHING) + skipped * SMOOTHING, 4)
+            if size:
+                previous = entry.get('avg_bytes')
+                entry['avg_bytes'] = int(size if previous is None
+                                         else previous * (1 - SMOOTHING) + size * SMOOTHING)
+            self.dirty = True
+
+    def set_preference(self, domain, name, value):
+        """Store a learned per-domain setting (e.g. preferred representation)"""
+        with self.lock:
+            self.domains.setdefault(domain, {'fetches': 0, 'paywall_rate': 0.0,
+                                             'skip_rate': 0.0})[name] = value
+            self.dirty = True
+
+    def snapshot(self):
+        with self.lock:
+            return {domain: dict(entry) for domain, entry in self.domains.items()}
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.domains, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+
+_shared_outcomes = None
+_shared_lock = threading.Lock()
+
+
+def shared_domain_outcomes():
+    global _shared_outcomes
+    if _shared_outcomes is None:
+        with _shared_lock:
+            if _shared_outcomes is None:
+                _shared_outcomes = DomainOutcomes()
+    return _shared_outcomes
@@ -5,32 +5,42 @@ Processes BOTH Mando Minutes and Puck News as separate podcasts
 They arrive at different times and are completely independent
 """
 
-import imaplib
 import email
-import ssl
 import json
 import logging
-import requests
 import os
-import smtplib
 from datetime import datetime, timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
 import schedule
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from chunked_summarizer import ChunkedSummarizer
 from comprehensive_mando_processor import ComprehensiveMandoProcessor
+from llm_client import scheduled_llm_client, llm_configured
+from model_router import ModelRouter
+from resilience import ProviderError, configure_limits
+from segment_store import episode_id, shared_segment_store
+from tts_engine import elevenlabs_engine, episode_tags
+from link_ranker import TRUSTED_DOMAINS
+from mail_pool import file_attachment, take_or_open, open_imap, open_smtp
+from token_budget import max_tokens_for_duration
+from warmup import Warmup, warmup_times
+
+
+def setup_logging():
+    """Log to dual_newsletter.log and the console; called by the entry points, not
+    on import, so importing this module leaves logging alone"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('dual_newsletter.log'),
+            logging.StreamHandler()
+        ]
+    )
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('dual_newsletter.log'),
-        logging.StreamHandler()
-    ]
-)
 
 class DualNewsletterAutomation:
     def __init__(self, config_file='multi_newsletter_config.json'):
@@ -39,8 +49,21 @@ class DualNewsletterAutomation:
         self.podcasts_dir = "./podcasts"
         os.makedirs(self.podcasts_dir, exist_ok=True)
         
-        # Initialize comprehensive processor for Mando
-        self.mando_processor = ComprehensiveMandoProcessor()
+        # Monthly token/character limits for the local quota ledger
+        configure_limits(self.config)
+        
+        # Shared async LLM client (pooled, bounded) when a key is configured.
+        # Scheduled runs sit out a tripped circuit for up to max_wait_seconds
+        # and keep to an even daily share of monthly_token_limit.
+        ai_config = self.config.get('ai_processing', {})
+        self.llm = None
+        router = None
+        if llm_configured(ai_config):
+            self.llm = scheduled_llm_client(ai_config)
+            router = ModelRouter(self.llm, ai_config['model'], ai_config.get('large_model', 'gpt-4o'))
+        
+        # Initialize comprehensive processor for Mando, routing items across models
+        self.mando_processor = ComprehensiveMandoProcessor(router=router)
     
     def load_config(self, config_file):
         """Load configuration"""
@@ -50,20 +73,8 @@ class DualNewsletterAutomation:
     def connect_to_aol(self):
         """Connect to AOL email"""
         try:
-            context = ssl.create_default_context()
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            
-            imap = imaplib.IMAP4_SSL(
-                self.config['email']['imap_server'],
-                self.config['email']['imap_port'],
-                ssl_context=context
-            )
-            
-            imap.login(
-                self.config['email']['username'],
-                self.config['email']['password']
-            )
+            # A connection opened by the warm-up skips TLS and login
+            imap = take_or_open('imap', lambda: open_imap(self.config['email']))
             
             logging.info("✅ Connected to AOL")
             return imap
@@ -146,12 +157,52 @@ class DualNewsletterAutomation:
             
             return script
             
-        else:
-            # For Puck or if link following not available
-            script = self.create_standard_script(subject, sender, body, newsletter_config)
+        elif self.llm is not None:
+            try:
+                return self.create_ai_script(subject, sender, body, newsletter_config)
+            except Exception as e:
+                logging.error(f"AI script failed for {newsletter_name}: {e}")
+        
+        # For Puck or if link following not available
+        script = self.create_standard_script(subject, sender, body, newsletter_config)
         
         return script
     
+    def create_ai_script(self, subject, sender, body, newsletter_config):
+        """Write the script with the LLM using the newsletter's configured prompt"""
+        job = self.ai_script_job(subject, sender, body, newsletter_config)
+        logging.info(f"🤖 Writing {newsletter_config['name']} script with {job['model']}")
+        return self.llm.complete(**job)
+    
+    def ai_script_job(self, subject, sender, body, newsletter_config, llm_condense=True):
+        """The completion request for a newsletter's script, as LLMClient keyword
+        arguments (shared with batch backfills)
+        
+        Long issues are condensed first: map-reduce through the LLM for live
+        runs, extractively with llm_condense=False so building a batch makes
+        no synchronous full-price calls.
+        """
+        ai_config = self.config['ai_processing']
+        prefix = newsletter_config['name'].split('_')[0]
+        instructions = (ai_config.get(f"{prefix}_prompt")
+                        or newsletter_config.get('podcast_style', 'Convert this newsletter into a podcast.'))
+        
+        body = ChunkedSummarizer(self.llm if llm_condense else None,
+                                 ai_config.get('summary_model', ai_config['model']),
+                                 budget_tokens=ai_config.get('content_budget_tokens', 1500)
+                                 ).condense(body, subject=subject)
+        
+        return {
+            'model': ai_config['model'],
+            'messages': [
+                {"role": "system", "content": "You are a professional podcast script writer who creates engaging, conversational audio content."},
+                {"role": "user", "content": f"{instructions}\n\nSubject: {subject}\nFrom: {sender}\n\n{body}"}
+            ],
+            'max_tokens': max_tokens_for_duration(newsletter_config.get('target_minutes', 8)),
+            'temperature': 0.7,
+            'label': newsletter_config['name']
+        }
+    
     def create_mando_script(self, subject, sender, body, articles):
         """Create Mando Minutes script with fetched articles"""
         date_str = datetime.now().strftime('%A, %B %d, %Y')
@@ -189,7 +240,7 @@ I'm your AI assistant with today's crypto and market updates.
         
         else:
             # Fallback to email content
-            script += f"Today's updates:\n\n{body[:1500]}\n\n"
+            script += f"Today's updates:\n\n{ChunkedSummarizer().condense(body, budget_tokens=400)}\n\n"
         
         script += """That's all for today's Mando Minutes.
 
@@ -206,7 +257,7 @@ Check your email for all the links. Have a great day!"""
 
 Today's newsletter: {subject}
 
-{body[:3000]}
+{ChunkedSummarizer().condense(body, budget_tokens=750)}
 
 That concludes today's {newsletter_name} podcast. 
 
@@ -240,34 +291,22 @@ Thank you for listening!"""
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             audio_file = f"{self.podcasts_dir}/{newsletter_name}_{timestamp}.mp3"
             
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.config['voice_generation']['voice_id']}"
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.config['voice_generation']['api_key']
-            }
-            
-            data = {
-                "text": script,
-                "model_id": self.config['voice_generation']['model'],
-                "voice_settings": self.config['voice_generation']['voice_settings']
-            }
+            voice_config = self.config['voice_generation']
+            engine = elevenlabs_engine(voice_config, wait_open=voice_config.get('max_wait_seconds', 300))
+            # A rerun of the same issue only re-voices the stories that changed
+            show = newsletter_name.replace('_', ' ').title()
+            stats = shared_segment_store().render(engine, episode_id(show), script, audio_file,
+                                                  tags=episode_tags(show))
             
-            response = requests.post(url, json=data, headers=headers)
+            # Exact, from the MP3 frame headers
+            duration = stats['duration_seconds'] / 60
             
-            if response.status_code == 200:
-                with open(audio_file, 'wb') as f:
-                    f.write(response.content)
-                
-                file_size = os.path.getsize(audio_file)
-                duration = file_size / (128000 / 8) / 60
-                
-                logging.info(f"✅ Audio generated: {duration:.1f} minutes")
-                return audio_file, duration
-            else:
-                logging.error(f"ElevenLabs error: {response.status_code}")
-                return None, 0
+            logging.info(f"✅ Audio generated: {duration:.1f} minutes")
+            return audio_file, duration
                 
+        except ProviderError as e:
+            logging.error(f"ElevenLabs error: {e}")
+            return None, 0
         except Exception as e:
             logging.error(f"Audio generation failed: {e}")
             return None, 0
@@ -309,24 +348,16 @@ The audio file is attached. Enjoy your personalized podcast!
             
             # Attach audio
             if audio_file and os.path.exists(audio_file):
-                with open(audio_file, "rb") as f:
-                    part = MIMEBase('audio', 'mpeg')
-                    part.set_payload(f.read())
-                    encoders.encode_base64(part)
-                    filename = f"{newsletter_name.lower().replace(' ', '_')}_podcast.mp3"
-                    part.add_header('Content-Disposition', f'attachment; filename="{filename}"')
-                    msg.attach(part)
+                filename = f"{newsletter_name.lower().replace(' ', '_')}_podcast.mp3"
+                msg.attach(file_attachment(audio_file, filename))
             
             # Send
-            server = smtplib.SMTP(
+            server = take_or_open('smtp', lambda: open_smtp(
                 self.config['email_delivery']['smtp_server'],
-                self.config['email_delivery']['smtp_port']
-            )
-            server.starttls()
-            server.login(
+                self.config['email_delivery']['smtp_port'],
                 self.config['email_delivery']['sender_email'],
                 self.config['email']['password']
-            )
+            ))
             server.send_message(msg)
             server.quit()
             
@@ -382,13 +413,22 @@ The audio file is attached. Enjoy your personalized podcast!
         """Process all enabled newsletters"""
         logging.info("🎯 Starting dual newsletter processing...")
         
-        for newsletter in self.config['newsletters']:
-            if newsletter.get('enabled', True):
-                self.process_newsletter(newsletter)
-                time.sleep(5)  # Brief pause between newsletters
+        # Newsletters are independent, so run them side by side; LLM calls
+        # share one pool and never exceed its concurrency limit
+        enabled = [n for n in self.config['newsletters'] if n.get('enabled', True)]
+        if enabled:
+            with ThreadPoolExecutor(max_workers=len(enabled)) as executor:
+                list(executor.map(self.process_newsletter, enabled))
         
         logging.info("✅ All newsletters processed!")
     
+    def warm_up(self):
+        """Pre-open mail/API connections and prefetch trusted sites' feeds"""
+        trusted = set(TRUSTED_DOMAINS)
+        for newsletter in self.config['newsletters']:
+            trusted.update(newsletter.get('trusted_domains', []))
+        return Warmup(self.config, trusted, smtp_password=self.config['email']['password']).run()
+    
     def schedule_automation(self):
         """Schedule newsletter checks"""
         # Schedule Mando Minutes check at 7:45 AM
@@ -401,15 +441,28 @@ The audio file is attached. Enjoy your personalized podcast!
             lambda: self.process_newsletter(self.config['newsletters'][1])
         )
         
+        # Warm connections and caches just before each arrival window and check
+        lead = self.config.get('warmup', {}).get('lead_minutes', 5)
+        warm_times = set()
+        if self.config.get('warmup', {}).get('enabled', True):
+            for newsletter in self.config['newsletters']:
+                if newsletter.get('enabled', True):
+                    warm_times.update(warmup_times(newsletter, lead))
+        for warm_time in sorted(warm_times):
+            schedule.every().day.at(warm_time).do(self.warm_up)
+        
         logging.info("📅 Scheduled:")
         logging.info("   - Mando Minutes: 7:45 AM daily")
         logging.info("   - Puck News: 8:30 AM daily")
+        if warm_times:
+            logging.info(f"   - Warm-up: {', '.join(sorted(warm_times))}")
         
         while True:
             schedule.run_pending()
             time.sleep(60)
 
 if __name__ == "__main__":
+    setup_logging()
     automation = DualNewsletterAutomation()
     
     # Process both newsletters now
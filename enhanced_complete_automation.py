@@ -11,7 +11,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import the original file to extend it
-from complete_automation import PodcastAutomationAgent
+from complete_automation import PodcastAutomationAgent, setup_logging
 from link_following_agent import LinkFollowingNewsletterAgent
 import logging
 import json
@@ -43,14 +43,17 @@ class EnhancedPodcastAutomationAgent(PodcastAutomationAgent, LinkFollowingNewsle
         logging.info("📎 Extracting links from email...")
         
         # Extract links from the email body
-        links = self.extract_links_from_content(body, "")  # Pass empty HTML for now
+        # Ranked best first and trimmed to the byte/time budget before fetching
+        links = self.extract_links_from_content(body, "", max_links=8)  # Pass empty HTML for now
         logging.info(f"🔗 Found {len(links)} links in email")
         
-        # Fetch article content if links found
+        # Fetch article content if links found, never past the time budget
         articles = []
+        self.fetch_outcomes = []
         if links:
             logging.info("📰 Fetching article content from links...")
-            articles = self.fetch_multiple_articles(links[:8])  # Limit to 8 articles
+            budget = self.link_budget()['time_budget']
+            articles, self.fetch_outcomes = self.fetch_articles_within(links, budget=budget)
             logging.info(f"✅ Successfully fetched {len(articles)} articles")
         
         # Create enhanced script
@@ -152,4 +155,5 @@ def run_enhanced_automation():
     logging.info("✅ Enhanced automation complete!")
 
 if __name__ == "__main__":
+    setup_logging()
     run_enhanced_automation()
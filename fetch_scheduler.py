@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Polite Fetch Scheduler
+Per-domain token buckets, AIMD adaptive concurrency and Retry-After
+handling so we fetch more in total while pressing each site less
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from http_pool import get_session
+
+
+def domain_of(url):
+    """Host used for politeness accounting (www. folded into the bare domain)"""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+class TokenBucket:
+    """Classic token bucket; reserve() may borrow and returns how long to wait"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class AIMDLimiter:
+    """Concurrency limit that grows additively and shrinks multiplicatively
+
+    Fast, successful responses raise the limit by about one slot per
+    window of completions; errors, throttling and slow responses halve it.
+    """
+
+    def __init__(self, initial=1, minimum=1, maximum=4,
+                 target_latency=2.5, decrease_factor=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+
+    def on_success(self, latency):
+        if latency > self.target_latency * 2:
+            self.on_congestion()
+        elif latency <= self.target_latency:
+            self.limit = min(self.maximum, self.limit + 1 / max(self.limit, 1))
+
+    def on_congestion(self):
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+    @property
+    def slots(self):
+        return max(self.minimum, int(self.limit))
+
+
+class DomainState:
+    """Politeness state for one host"""
+
+    def __init__(self, domain, rate, burst, max_concurrency, target_latency):
+        self.domain = domain
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AIMDLimiter(maximum=max_concurrency, target_latency=target_latency)
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0, 'latency_total': 0.0}
+
+    def acquire(self, timeout=None, extra=0):
+        """Wait for a free slot (extra beyond the limit) and a token; raises
+        requests' Timeout if that would take more than timeout seconds"""
+        give_up = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if wait <= 0 and self.in_flight < self.limiter.slots + extra:
+                    self.in_flight += 1
+                    break
+                if give_up is not None:
+                    if now >= give_up:
+                        raise requests.exceptions.Timeout(f"No free slot for {self.domain} in {timeout:.1f}s")
+                    wait = min(wait, give_up - now) if wait > 0 else give_up - now
+                self.condition.wait(wait if wait > 0 else None)
+        delay = self.bucket.reserve()
+        if delay:
+            if give_up is not None and time.monotonic() + delay > give_up:
+                self.release()
+                raise requests.exceptions.Timeout(f"No token for {self.domain} in {timeout:.1f}s")
+            time.sleep(delay)
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def block(self, seconds):
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def record(self, latency=None, error=False, throttled=False):
+        with self.condition:
+            self.stats['requests'] += 1
+            if throttled:
+                self.stats['throttled'] += 1
+            if error or throttled:
+                self.stats['errors'] += 1
+                self.limiter.on_congestion()
+            else:
+                self.stats['latency_total'] += latency
+                self.limiter.on_success(latency)
+            self.condition.notify_all()
+
+
+class FetchScheduler:
+    def __init__(self, session=None, per_domain_rate=1.0, per_domain_burst=2,
+                 max_per_domain=4, max_concurrency=16, target_latency=2.5,
+                 max_retry_wait=5.0):
+        self.session = session or get_session()
+        self.per_domain_rate = per_domain_rate
+        self.per_domain_burst = per_domain_burst
+        self.max_per_domain = max_per_domain
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.max_retry_wait = max_retry_wait
+        self.domains = {}
+        self.lock = threading.Lock()
+
+    def domain_state(self, domain):
+        with self.lock:
+            state = self.domains.get(domain)
+            if state is None:
+                state = DomainState(domain, self.per_domain_rate, self.per_domain_burst,
+                                    self.max_per_domain, self.target_latency)
+                self.domains[domain] = state
+            return state
+
+    def get(self, url, retries=1, hedge=False, **kwargs):
+        """GET a URL once the domain's bucket, limit and Retry-After allow it
+
+        A timeout covers the wait for a slot as well as the request: the
+        request gets whatever is left, and requests' Timeout is raised if no
+        slot frees up in time. A hedge races a slow request to the same
+        site, so it may take one slot over the limit rather than queue
+        behind it.
+        """
+        state = self.domain_state(domain_of(url))
+        timeout = kwargs.get('timeout')
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if give_up is None else max(0.0, give_up - time.monotonic())
+            state.acquire(timeout=remaining, extra=1 if hedge else 0)
+            if give_up is not None:
+                kwargs['timeout'] = max(0.1, give_up - time.monotonic())
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                state.record(error=True)
+                raise
+            finally:
+                state.release()
+            latency = time.monotonic() - start
+
+            if response.status_code in (429, 503):
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                state.block(retry_after if retry_after is not None else 1 / self.per_domain_rate)
+                state.record(throttled=True)
+                if retries > 0 and retry_after is not None and retry_after <= self.max_retry_wait:
+                    logging.info(f"⏳ {state.domain} asked us to wait {retry_after:.0f}s")
+                    retries -= 1
+                    continue
+                return response
+
+            state.record(latency=latency, error=response.status_code >= 500)
+            return response
+
+    def interleave(self, urls):
+        """Round-robin URLs across domains so no host gets a burst"""
+        queues = OrderedDict()
+        for index, url in enumerate(urls):
+            queues.setdefault(domain_of(url), deque()).append((index, url))
+        ordered = []
+        while queues:
+            for domain in list(queues):
+                ordered.append(queues[domain].popleft())
+                if not queues[domain]:
+                    del queues[domain]
+        return ordered
+
+    def map(self, func, urls, max_workers=None):
+        """Run func(url) for every URL politely; results keep input order"""
+        if not urls:
+            return []
+        workers = min(max_workers or self.max_concurrency, len(urls))
+        results = [None] * len(urls)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(func, url): index
+                       for index, url in self.interleave(urls)}
+            for future, index in futures.items():
+                results[index] = future.result()
+        return results
+
+    def domain_report(self):
+        """Per-domain request counts, errors and current concurrency limit"""
+        report = {}
+        with self.lock:
+            states = list(self.domains.values())
+        for state in states:
+            stats = state.stats
+            successes = stats['requests'] - stats['errors']
+            report[state.domain] = {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'throttled': stats['throttled'],
+                'avg_latency': round(stats['latency_total'] / successes, 3) if successes else None,
+                'concurrency_limit': state.limiter.slots
+            }
+        return report
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler():
+    """Process-wide scheduler so every agent shares the same per-site budget"""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        with _shared_lock:
+            if _shared_scheduler is None:
+                _shared_scheduler = FetchScheduler()
+    return _shared_scheduler
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Hedged Script Generation
+Builds the template script alongside the LLM call and gives the model a
+deadline: a good LLM script that arrives in time wins, otherwise the
+ready template does, so a slow or rate-limited API never costs more than
+the deadline. Every run records which path won and why.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from resilience import classify
+
+HEDGE_LOG = "cache/script_hedges.jsonl"
+
+REFUSAL = re.compile(r"\b(i'?m sorry|i cannot|i can'?t help|as an ai|i'?m unable to)\b", re.IGNORECASE)
+
+
+def script_problems(script, min_words=120):
+    """Reasons a script isn't fit to voice; empty when it passes"""
+    if not script or not script.strip():
+        return ['empty']
+    problems = []
+    text = script.strip()
+    if len(text.split()) < min_words:
+        problems.append(f"only {len(text.split())} words")
+    if REFUSAL.search(text[:300]):
+        problems.append('refusal')
+    if not text.endswith(('.', '!', '?', ']', ')', '"', "'")):
+        problems.append('cut off mid-sentence')
+    return problems
+
+
+class ScriptHedge:
+    def __init__(self, deadline=20.0, min_words=120, log_path=HEDGE_LOG):
+        self.deadline = deadline
+        self.min_words = min_words
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.wins = Counter()
+        self.last_report = None
+
+    def run(self, write_llm, write_template, deadline=None):
+        """(script, report) from whichever path passes the quality checks first
+
+        The LLM is preferred until the deadline; the template starts at the same
+        time and takes over on timeout, error or a failed check. A late LLM
+        answer is left to finish so it still lands in the LLM cache.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        start = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="script-hedge")
+        llm = executor.submit(write_llm)
+        template = executor.submit(write_template)
+        executor.shutdown(wait=False)
+
+        finished = {}
+
+        def outcome(future, name):
+            if name not in finished:
+                error_kind = None
+                try:
+                    script = future.result()
+                    problems = script_problems(script, self.min_words)
+                except Exception as e:
+                    script, problems, error_kind = None, [f"error: {e}"], classify(e)[0]
+                finished[name] = (script, problems, round(time.monotonic() - start, 2), error_kind)
+            return finished[name]
+
+        # Give the model until the deadline, leaving early if it fails first
+        cutoff = start + deadline
+        while not llm.done():
+            if template.done() and outcome(template, 'template')[1]:
+                # No usable hedge: the model is the only way forward
+                wait([llm])
+                break
+            remaining = cutoff - time.monotonic()
+            if remaining <= 0:
+                break
+            wait([future for future in (llm, template) if not future.done()],
+                 timeout=remaining, return_when=FIRST_COMPLETED)
+
+        if llm.done() and not outcome(llm, 'llm')[1]:
+            winner, reason = 'llm', 'in time'
+        else:
+            reason = outcome(llm, 'llm')[1][0] if llm.done() else f"no answer within {deadline:g}s"
+            winner = 'template'
+            if outcome(template, 'template')[1] and llm.done() and finished['llm'][0]:
+                # Both flawed: a weak model script beats a broken template
+                winner = 'llm'
+                reason = f"template {outcome(template, 'template')[1][0]}"
+
+        script = outcome(llm if winner == 'llm' else template, winner)[0]
+        report = {
+            'winner': winner,
+            'reason': reason,
+            'deadline': deadline,
+            'llm_seconds': finished['llm'][2] if 'llm' in finished else None,
+            'template_seconds': finished['template'][2] if 'template' in finished else None,
+            'llm_error': finished['llm'][3] if 'llm' in finished else None,
+            'seconds': round(time.monotonic() - start, 2)
+        }
+        self.record(report)
+        return script, report
+
+    def record(self, report):
+        with self.lock:
+            self.wins[report['winner']] += 1
+            self.last_report = report
+            if self.log_path:
+                os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(dict(report, time=time.strftime('%Y-%m-%dT%H:%M:%S'))) + '\n')
+        icon = "🤖" if report['winner'] == 'llm' else "📝"
+        logging.info(f"{icon} Script from {report['winner']} ({report['reason']}) "
+                     f"after {report['seconds']:.1f}s")
+
+
+_shared_hedge = None
+_shared_lock = threading.Lock()
+
+
+def shared_script_hedge():
+    global _shared_hedge
+    if _shared_hedge is None:
+        with _shared_lock:
+            if _shared_hedge is None:
+                _shared_hedge = ScriptHedge()
+    return _shared_hedge
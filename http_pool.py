@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Connection Pool
+One requests.Session per process so article fetches, warm-up and API
+calls reuse the same keep-alive connections
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session with a connection pool sized for concurrent fetching"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=32, pool_maxsize=16, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
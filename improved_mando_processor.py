@@ -13,6 +13,8 @@ import time
 import re
 from urllib.parse import urlparse
 import cloudscraper  # Better for bypassing anti-bot measures
+from content_extractor import extract_article
+from url_canonicalizer import dedupe_urls
 
 logging.basicConfig(level=logging.INFO)
 
@@ -73,6 +75,7 @@ class ImprovedMandoProcessor:
         except:
             pass
         
+        links = dedupe_urls(links)  # Same story behind utm/www/AMP variants
         return links[:15]  # Limit to 15 most relevant links
     
     def fetch_article_content(self, url):
@@ -111,28 +114,19 @@ class ImprovedMandoProcessor:
                         if len(article_text) > 200:
                             break
             
-            # Generic article extraction
-            if not article_text:
-                # Try common article patterns
-                article_candidates = soup.find_all(['article', 'main', 'div'], 
-                                                 class_=re.compile('content|article|story|post'))
-                
-                for candidate in article_candidates:
-                    text = candidate.get_text(strip=True)
-                    if len(text) > len(article_text):
-                        article_text = text
-            
-            # Last resort: get all paragraphs
+            # Generic article extraction: single-pass content scoring
+            title = ""
             if len(article_text) < 200:
-                paragraphs = soup.find_all('p')
-                article_text = ' '.join([p.get_text(strip=True) for p in paragraphs 
-                                       if len(p.get_text(strip=True)) > 50])
+                extracted = extract_article(response.text)
+                title = extracted['title']
+                if len(extracted['content']) > len(article_text):
+                    article_text = extracted['content']
             
             # Get title
-            title = ""
-            title_elem = soup.find('h1') or soup.find('title')
-            if title_elem:
-                title = title_elem.get_text(strip=True)
+            if not title:
+                title_elem = soup.find('h1') or soup.find('title')
+                if title_elem:
+                    title = title_elem.get_text(strip=True)
             
             # Clean up text
             article_text = re.sub(r'\s+', ' ', article_text)
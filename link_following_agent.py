@@ -13,11 +13,21 @@ import time
 import requests
 import re
 from datetime import datetime, timedelta
+from functools import partial
 from email.header import decode_header
 import logging
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from url_canonicalizer import canonicalize_url, collapse_duplicate_articles
+from fetch_scheduler import shared_scheduler, domain_of
+from deadline_fetcher import DeadlineFetcher
+from singleflight import shared_flight
+from link_ranker import LinkRanker, TRUSTED_DOMAINS
+from article_cache import shared_article_cache
+from domain_outcomes import shared_domain_outcomes
+from alternate_representations import RepresentationChooser
+from paywall_detector import (classify_url, classify_response, read_article_page,
+                              looks_paywalled)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,11 +46,7 @@ class LinkFollowingNewsletterAgent:
         }
         
         # Common news domains to prioritize
-        self.trusted_domains = {
-            'bloomberg.com', 'reuters.com', 'wsj.com', 'ft.com', 
-            'techcrunch.com', 'coindesk.com', 'cointelegraph.com',
-            'theverge.com', 'arstechnica.com', 'wired.com'
-        }
+        self.trusted_domains = set(TRUSTED_DOMAINS)
         
     def load_config(self):
         """Load configuration"""
@@ -51,93 +57,156 @@ class LinkFollowingNewsletterAgent:
             logging.error("Config file not found")
             return None
     
-    def extract_links_from_content(self, content, html_content=""):
-        """Extract all URLs from email content"""
-        urls = set()
+    def extract_link_candidates(self, content, html_content=""):
+        """Every followable link with its anchor text and position in the newsletter"""
+        # Keyed by canonical form so utm/www/AMP variants collapse to one link
+        candidates = {}
+        
+        def add(url, anchor):
+            lowered = url.lower()
+            # Skip mailto, unsubscribe, and tracking links
+            if (not url.startswith('http') or
+                    'unsubscribe' in lowered or
+                    'email-preferences' in lowered or
+                    'click.pstmrk.it' in lowered or
+                    'list-manage.com' in lowered):
+                return
+            # Skip social media, tracking, and email management links
+            domain = urlparse(url).netloc.lower()
+            skip_domains = ['twitter.com', 'x.com', 'facebook.com', 'linkedin.com', 
+                          'instagram.com', 'youtube.com', 'bit.ly', 'tinyurl.com']
+            if any(skip in domain for skip in skip_domains):
+                return
+            key = canonicalize_url(url)
+            if key in candidates:
+                # Same story linked twice: keep the earlier position, best anchor
+                if len(anchor) > len(candidates[key]['anchor']):
+                    candidates[key]['anchor'] = anchor
+                return
+            candidates[key] = {'url': url, 'anchor': anchor, 'position': len(candidates)}
         
         # Extract from HTML if available
         if html_content:
             try:
                 soup = BeautifulSoup(html_content, 'html.parser')
                 for link in soup.find_all('a', href=True):
-                    url = link['href']
-                    # Skip mailto, unsubscribe, and tracking links
-                    if (url.startswith('http') and 
-                        'unsubscribe' not in url.lower() and
-                        'email-preferences' not in url.lower() and
-                        'click.pstmrk.it' not in url.lower() and
-                        'list-manage.com' not in url.lower()):
-                        urls.add(url)
+                    add(link['href'], link.get_text(' ', strip=True)[:200])
             except Exception as e:
                 logging.error(f"Error parsing HTML for links: {e}")
         
-        # Also extract from plain text using regex
+        # Also extract from plain text; the rest of the line serves as anchor
         url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+(?:[/?#][^\s<>"{}|\\^`\[\]]*)?'
-        text_urls = re.findall(url_pattern, content)
-        urls.update(text_urls)
-        
-        # Filter and prioritize URLs
-        filtered_urls = []
-        for url in urls:
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            
-            # Skip social media, tracking, and email management links
-            skip_domains = ['twitter.com', 'x.com', 'facebook.com', 'linkedin.com', 
-                          'instagram.com', 'youtube.com', 'bit.ly', 'tinyurl.com']
-            if any(skip in domain for skip in skip_domains):
-                continue
-                
-            # Prioritize trusted news sources
-            if any(trusted in domain for trusted in self.trusted_domains):
-                filtered_urls.insert(0, url)  # Add to front
-            else:
-                filtered_urls.append(url)
+        for line in content.splitlines():
+            for match in re.finditer(url_pattern, line):
+                anchor = (line[:match.start()] + line[match.end():]).strip(' -:()[]<>*')
+                add(match.group(0), anchor[:200])
+        
+        ranked = list(candidates.values())
+        for candidate in ranked:
+            candidate['total'] = len(ranked)
+        return ranked
+    
+    def link_budget(self):
+        """Link count, byte and time budgets from the link_following config"""
+        settings = (self.config or {}).get('link_following', {})
+        return {
+            'max_links': settings.get('max_links', 10),
+            'byte_budget': settings.get('fetch_byte_budget_mb', 12) * 1024 * 1024,
+            'time_budget': settings.get('fetch_budget_seconds', 8.0)
+        }
+    
+    def extract_links_from_content(self, content, html_content="", max_links=None):
+        """Extract URLs from email content, best first, within the fetch budget"""
+        candidates = self.extract_link_candidates(content, html_content)
+        if not candidates:
+            return []
+        
+        budget = self.link_budget()
+        
+        # Score before any network I/O: anchor text, position, domain
+        # trust, whether we already hold the article in the cache and
+        # how each site behaved before (paywalls, page weight, latency)
+        domain_stats = shared_domain_outcomes().snapshot()
+        for domain, stats in shared_scheduler().domain_report().items():
+            domain_stats.setdefault(domain, {})['avg_latency'] = stats['avg_latency']
+        ranker = LinkRanker(self.trusted_domains, cache=shared_article_cache(),
+                            domain_stats=domain_stats)
+        selected = ranker.select(ranker.rank(candidates),
+                                 max_links=max_links or budget['max_links'],
+                                 byte_budget=budget['byte_budget'],
+                                 time_budget=budget['time_budget'])
+        
+        cached = sum(1 for candidate in selected if candidate['cached'])
+        logging.info(f"🔗 Ranked {len(candidates)} links, following {len(selected)} "
+                     f"({cached} from cache)")
+        return [candidate['url'] for candidate in selected]
+    
+    def fetch_article_content(self, url, timeout=10, coalesce=True):
+        """Fetch and extract article content from a URL
+        
+        Concurrent requests for the same canonical URL (say Mando and Puck
+        linking one story, or the scheduled run and a manual one in another
+        process) share a single download and extraction; those results come
+        back marked 'shared'. Hedged retries pass coalesce=False so they
+        really issue a second request.
+        """
+        cached = shared_article_cache().get(url)
+        if cached:
+            logging.info(f"Using cached content for: {url}")
+            return cached
+        if not coalesce:
+            return self.download_article(url, timeout, hedge=True)
         
-        return filtered_urls[:10]  # Limit to 10 most relevant links
+        def fetch():
+            # Another process may have fetched it while this one waited its turn
+            done = shared_article_cache().get(url)
+            return dict(done, shared=True) if done else self.download_article(url, timeout)
+        
+        try:
+            article, shared = shared_flight().do(canonicalize_url(url), fetch, timeout=timeout)
+        except TimeoutError:
+            logging.warning(f"Timeout waiting for shared fetch of {url}")
+            return None
+        if shared and article:
+            logging.info(f"🤝 Shared in-flight fetch of: {url}")
+            article = dict(article, url=url, shared=True)
+        return article
     
-    def fetch_article_content(self, url, timeout=10):
-        """Fetch and extract article content from a URL"""
+    def download_article(self, url, timeout=10, hedge=False):
+        """Download and extract one article (no cache, no coalescing); a
+        hedge's requests don't queue behind the attempt they're racing"""
+        # Files and media never make it into a script
+        domain = domain_of(url)
+        outcomes = shared_domain_outcomes()
+        verdict = classify_url(url)
+        if verdict:
+            return self.skip_article(url, domain, verdict)
+        
         try:
             logging.info(f"Fetching content from: {url}")
-            response = requests.get(url, headers=self.headers, timeout=timeout)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup(['script', 'style', 'nav', 'header', 'footer', 
-                               'aside', 'form', 'button', 'iframe']):
-                element.decompose()
-            
-            # Try to find article content using common selectors
-            article_text = ""
-            
-            # Common article selectors
-            article_selectors = [
-                'article', 'main', '[role="main"]', '.article-content',
-                '.post-content', '.entry-content', '.content-body',
-                '.story-body', '.article-body', '.post-body'
-            ]
-            
-            for selector in article_selectors:
-                elements = soup.select(selector)
-                if elements:
-                    article_text = ' '.join([elem.get_text(strip=True) for elem in elements])
-                    if len(article_text) > 200:  # Found substantial content
-                        break
-            
-            # Fallback: get all paragraphs
-            if len(article_text) < 200:
-                paragraphs = soup.find_all('p')
-                article_text = ' '.join([p.get_text(strip=True) for p in paragraphs 
-                                       if len(p.get_text(strip=True)) > 50])
+            # Prefer the site's lightest full-text copy (feed entry, JSON-LD, AMP)
+            get = partial(shared_scheduler().get, hedge=hedge)
+            chooser = RepresentationChooser(get, outcomes)
+            html = ""
+            found = chooser.from_feed(url, domain, timeout)
+            if found is None:
+                html, verdict, final_url = self.download_page(
+                    url, timeout, enough=chooser.head_is_enough(domain), hedge=hedge)
+                if verdict in ('paywall', 'binary'):
+                    return self.skip_article(url, domain, verdict)
+                found = chooser.choose(url, domain, html, final_url,
+                                       complete=verdict != 'partial', timeout=timeout)
+            if found is None:
+                html, verdict, final_url = self.download_page(url, timeout, hedge=hedge)
+                if verdict:
+                    return self.skip_article(url, domain, verdict)
+                found = chooser.choose(url, domain, html, final_url, complete=True,
+                                       timeout=timeout)
             
-            # Extract title
-            title = ""
-            title_elem = soup.find('h1') or soup.find('title')
-            if title_elem:
-                title = title_elem.get_text(strip=True)
+            article_text = found['content']
+            title = found['title']
+            if found['representation'] == 'html' and looks_paywalled(html, len(article_text)):
+                return self.skip_article(url, domain, 'paywall')
             
             # Clean up text
             article_text = re.sub(r'\s+', ' ', article_text)
@@ -148,12 +217,18 @@ class LinkFollowingNewsletterAgent:
             if len(words) > 500:
                 article_text = ' '.join(words[:500]) + "..."
             
-            return {
+            article = {
                 'url': url,
+                'canonical_url': found['canonical_url'],
                 'title': title[:100],  # Limit title length
                 'content': article_text,
-                'domain': urlparse(url).netloc
+                'domain': urlparse(url).netloc,
+                'representation': found['representation']
             }
+            outcomes.record(domain, 'ok', size=found['bytes'])
+            if article_text:
+                shared_article_cache().put(article)
+            return article
             
         except requests.exceptions.Timeout:
             logging.warning(f"Timeout fetching {url}")
@@ -165,20 +240,70 @@ class LinkFollowingNewsletterAgent:
             logging.error(f"Unexpected error fetching {url}: {e}")
             return None
     
-    def fetch_multiple_articles(self, urls, max_workers=5):
+    def download_page(self, url, timeout=10, enough=None, hedge=False):
+        """Stream a page through the scheduler; returns (markup, verdict, final_url)
+        
+        Headers and the first few KB can veto the rest of the download
+        (verdict 'binary' or 'paywall'), and enough() may stop it after
+        </head> (verdict 'partial').
+        """
+        response = shared_scheduler().get(url, headers=self.headers, timeout=timeout,
+                                          stream=True, hedge=hedge)
+        try:
+            verdict = classify_response(response.status_code, response.headers)
+            if verdict:
+                return "", verdict, response.url or url
+            response.raise_for_status()
+            html, verdict = read_article_page(response, enough=enough)
+            return html, verdict, response.url or url
+        finally:
+            response.close()
+    
+    def skip_article(self, url, domain, verdict):
+        """Remember why a link was dropped so future runs rank its site lower"""
+        logging.info(f"⏭️ Skipping {verdict} link: {url}")
+        shared_domain_outcomes().record(domain, verdict)
+        return {'url': url, 'content': '', 'skipped': verdict}
+    
+    def fetch_multiple_articles(self, urls, max_workers=None):
         """Fetch multiple articles concurrently"""
-        articles = []
+        # The scheduler spreads work across sites and adapts per-site
+        # concurrency, so max_workers is only an overall upper bound
+        scheduler = shared_scheduler()
+        results = scheduler.map(self.fetch_article_content, urls, max_workers=max_workers)
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(self.fetch_article_content, url): url 
-                           for url in urls}
-            
-            for future in as_completed(future_to_url):
-                result = future.result()
-                if result and result['content']:
-                    articles.append(result)
+        shared_domain_outcomes().save()
+        
+        # Keep priority order, then collapse syndicated/duplicate stories
+        articles = [result for result in results if result and result['content']]
+        shared = sum(1 for article in articles if article.pop('shared', False))
+        if shared:
+            logging.info(f"🤝 {shared} links shared a download with another pipeline")
+        unique_articles = collapse_duplicate_articles(articles)
+        if len(unique_articles) < len(articles):
+            logging.info(f"🧹 Collapsed {len(articles) - len(unique_articles)} duplicate articles")
+        
+        return unique_articles
+    
+    def fetch_articles_within(self, urls, budget=8.0, hedge_after=None):
+        """Fetch articles under a total time budget, returning what finished in time
+        
+        URLs are launched in the order given (best first), slow ones get a
+        hedged second attempt, and anything unfinished at the deadline is
+        dropped. Returns (articles, outcomes) with per-link metrics.
+        """
+        fetcher = DeadlineFetcher(budget=budget, hedge_after=hedge_after)
+        articles, outcomes = fetcher.run(self.fetch_article_content, urls)
+        shared_domain_outcomes().save()
+        shared = sum(1 for outcome in outcomes if outcome.get('shared'))
+        if shared:
+            logging.info(f"🤝 {shared} links shared a download with another pipeline")
+        
+        unique_articles = collapse_duplicate_articles(articles)
+        if len(unique_articles) < len(articles):
+            logging.info(f"🧹 Collapsed {len(articles) - len(unique_articles)} duplicate articles")
         
-        return articles
+        return unique_articles, outcomes
     
     def create_enhanced_podcast_script(self, email_subject, sender, email_content, 
                                      articles, newsletter_name):
@@ -242,11 +367,13 @@ Generated by your Email-to-Podcast AI Assistant
             links = self.extract_links_from_content(text_content, html_content)
             logging.info(f"Found {len(links)} links in email")
             
-            # Fetch article content from links
+            # Fetch article content from links within the time budget
             articles = []
+            fetch_outcomes = []
             if links:
                 logging.info("Fetching article content...")
-                articles = self.fetch_multiple_articles(links)
+                budget = self.link_budget()['time_budget']
+                articles, fetch_outcomes = self.fetch_articles_within(links, budget=budget)
                 logging.info(f"Successfully fetched {len(articles)} articles")
             
             # Create enhanced podcast script
@@ -275,6 +402,7 @@ Generated by your Email-to-Podcast AI Assistant
                     'sender': sender,
                     'links_found': len(links),
                     'articles_fetched': len(articles),
+                    'fetch_outcomes': fetch_outcomes,
                     'articles': articles
                 }, f, indent=2)
             
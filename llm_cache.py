@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache
+Chat completions stored on disk under a hash of model, messages and
+sampling parameters, so reruns of the same prompt cost nothing
+"""
+
+import threading
+
+from disk_cache import DiskCache, cache_key
+
+LLM_CACHE_DIR = "cache/llm"
+
+
+class LLMCache:
+    def __init__(self, directory=LLM_CACHE_DIR, ttl_hours=72, max_mb=100):
+        self.store = DiskCache(directory, ttl_seconds=ttl_hours * 3600,
+                               max_bytes=max_mb * 1024 * 1024)
+
+    def key(self, model, messages, temperature, max_tokens, **params):
+        return cache_key('chat', model, messages, temperature, max_tokens, params)
+
+    def get(self, key):
+        entry = self.store.get(key)
+        return entry['text'] if entry else None
+
+    def put(self, key, text):
+        self.store.set(key, {'text': text})
+
+    def stats(self):
+        return self.store.stats()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_llm_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = LLMCache()
+    return _shared_cache
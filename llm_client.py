@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Async LLM Client
+One AsyncOpenAI client on a shared keep-alive connection pool, driven by
+a background event loop so sync callers (Streamlit, schedulers) can fan
+out many chat calls in parallel under a concurrency bound
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+from llm_cache import shared_llm_cache
+from resilience import ProviderError, shared_quota_ledger, shared_resilience
+from token_budget import count_message_tokens, count_tokens, shared_usage_log
+
+PLACEHOLDER_KEYS = {'', 'YOUR_OPENAI_API_KEY'}
+
+
+class LLMClient:
+    def __init__(self, api_key, max_concurrency=4, max_connections=16, timeout=60.0,
+                 base_url=None, max_retries=2, cache=None, usage_log=None, ledger=None,
+                 wait_open=0.0, paced=False, resilience=None):
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.usage_log = usage_log
+        self.ledger = ledger
+        # Scheduled runs also keep to an even daily share of the month's tokens
+        self.paced = paced
+        # Retries, backoff and the circuit breaker live here rather than in the
+        # SDK, one breaker for every OpenAI caller in the process
+        self.resilience = resilience if resilience is not None else \
+            shared_resilience('openai', retries=max_retries)
+        self.wait_open = wait_open
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True)
+        self.thread.start()
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, connect=10.0)
+        )
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url,
+                                  http_client=self.http, max_retries=0)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = {'calls': 0, 'errors': 0, 'in_flight': 0, 'peak_in_flight': 0,
+                      'seconds': 0.0, 'cache_hits': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def record_usage(self, label, model, messages, text, usage, seconds, cached=False):
+        """Token use per call: the API's own counts when given, local counts otherwise"""
+        prompt_tokens = usage.prompt_tokens if usage else count_message_tokens(messages, model)
+        completion_tokens = usage.completion_tokens if usage else count_tokens(text, model)
+        if not cached:
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['completion_tokens'] += completion_tokens
+            if self.ledger is not None:
+                self.ledger.record('openai', 'tokens', prompt_tokens + completion_tokens)
+        if self.usage_log is not None:
+            self.usage_log.record(label, model, prompt_tokens, completion_tokens, seconds, cached)
+
+    def check_quota(self, messages, model, max_tokens):
+        """Raise ProviderError (kind 'quota') without calling the API when the
+        ledger can't cover the call, or, when paced, today's share can't"""
+        if self.ledger is None:
+            return
+        estimate = count_message_tokens(messages, model) + max_tokens
+        if not self.ledger.can_spend('openai', 'tokens', estimate):
+            raise ProviderError('openai', 'quota', f"about {estimate} tokens needed, "
+                                f"{self.ledger.remaining('openai', 'tokens')} left this month")
+        if self.paced and not self.ledger.within_daily_allowance('openai', 'tokens', estimate):
+            raise ProviderError('openai', 'quota', f"about {estimate} tokens needed, today's share of "
+                                f"{self.ledger.daily_allowance('openai', 'tokens')} is used up")
+
+    async def acomplete(self, messages, model, max_tokens=1000, temperature=0.7,
+                        force_refresh=False, label=None, **params):
+        """One chat completion; served from the cache unless force_refresh"""
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(model, messages, temperature, max_tokens, **params)
+            if not force_refresh:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.stats['cache_hits'] += 1
+                    self.record_usage(label, model, messages, cached, None, 0.0, cached=True)
+                    return cached
+
+        self.check_quota(messages, model, max_tokens)
+        async with self.semaphore:
+            self.stats['in_flight'] += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+            start = time.monotonic()
+            try:
+                response = await self.resilience.acall(
+                    lambda: self.client.chat.completions.create(
+                        model=model, messages=messages, max_tokens=max_tokens,
+                        temperature=temperature, **params),
+                    wait_open=self.wait_open
+                )
+            except Exception:
+                self.stats['errors'] += 1
+                raise
+            finally:
+                self.stats['in_flight'] -= 1
+                self.stats['calls'] += 1
+                self.stats['seconds'] += time.monotonic() - start
+        message = response.choices[0].message
+        if message.content is None:
+            # A refusal or a tool call instead of text
+            reason = getattr(message, 'refusal', None) or f"finish_reason {response.choices[0].finish_reason}"
+            raise ProviderError('openai', 'client', f"no text in the reply ({reason})")
+        text = message.content.strip()
+        self.record_usage(label, model, messages, text, response.usage, time.monotonic() - start)
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    async def astream(self, messages, model, max_tokens=1000, temperature=0.7,
+                      force_refresh=False, label=None, **params):
+        """Text deltas as the model writes them; a cached answer arrives as one delta"""
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(model, messages, temperature, max_tokens, **params)
+            if not force_refresh:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.stats['cache_hits'] += 1
+                    self.record_usage(label, model, messages, cached, None, 0.0, cached=True)
+                    yield cached
+                    return
+
+        self.check_quota(messages, model, max_tokens)
+        pieces, usage = [], None
+        async with self.semaphore:
+            self.stats['in_flight'] += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+            start = time.monotonic()
+            try:
+                # Only opening the stream is retried; a stream that breaks
+                # mid-way has already handed text to the caller
+                response = await self.resilience.acall(
+                    lambda: self.client.chat.completions.create(
+                        model=model, messages=messages, max_tokens=max_tokens,
+                        temperature=temperature, stream=True,
+                        stream_options={'include_usage': True}, **params),
+                    wait_open=self.wait_open
+                )
+                async for chunk in response:
+                    usage = chunk.usage or usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        pieces.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            except Exception:
+                self.stats['errors'] += 1
+                raise
+            finally:
+                self.stats['in_flight'] -= 1
+                self.stats['calls'] += 1
+                self.stats['seconds'] += time.monotonic() - start
+        self.record_usage(label, model, messages, ''.join(pieces), usage, time.monotonic() - start)
+        if key is not None and pieces:
+            self.cache.put(key, ''.join(pieces).strip())
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the client's loop; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def complete(self, messages, model, **params):
+        """Blocking single completion (safe from any thread but the loop's own)"""
+        return self.submit(self.acomplete(messages, model, **params)).result()
+
+    def stream(self, messages, model, **params):
+        """Blocking iterator over astream() deltas, for sync callers"""
+        deltas = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for delta in self.astream(messages, model, **params):
+                    deltas.put(delta)
+            except Exception as e:
+                deltas.put(e)
+            finally:
+                deltas.put(done)
+
+        self.submit(pump())
+        while True:
+            item = deltas.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def complete_many(self, jobs):
+        """Run many completions at once; jobs are acomplete() keyword dicts
+
+        Returns results in job order; a failed job yields its exception
+        instead of a string so one bad call doesn't sink the batch.
+        """
+        async def gather():
+            return await asyncio.gather(*(self.acomplete(**job) for job in jobs),
+                                        return_exceptions=True)
+        start = time.monotonic()
+        results = self.submit(gather()).result()
+        logging.info(f"🤖 {len(jobs)} LLM calls in {time.monotonic() - start:.1f}s "
+                     f"(max {self.max_concurrency} at once)")
+        return results
+
+    def warm(self):
+        """Open a pooled connection to the API host ahead of the first call"""
+        async def touch():
+            await self.http.head(str(self.client.base_url))
+        self.submit(touch()).result()
+
+    def close(self):
+        self.submit(self.http.aclose()).result()
+        self.submit(self.loop.shutdown_asyncgens()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_shared_clients = {}
+_shared_lock = threading.Lock()
+
+
+def llm_configured(ai_config):
+    return (ai_config or {}).get('api_key', '') not in PLACEHOLDER_KEYS
+
+
+def shared_llm_client(api_key, **kwargs):
+    """Process-wide client per API key and settings, so every caller asking
+    for the same ones shares one pool and cache (and gets the settings it
+    asked for, whoever came first)"""
+    key = (api_key, tuple(sorted(kwargs.items())))
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            kwargs.setdefault('cache', shared_llm_cache())
+            kwargs.setdefault('usage_log', shared_usage_log())
+            kwargs.setdefault('ledger', shared_quota_ledger())
+            client = _shared_clients[key] = LLMClient(api_key, **kwargs)
+        return client
+
+
+def scheduled_llm_client(ai_config):
+    """The shared client for scheduled runs: sits out a tripped circuit for
+    up to max_wait_seconds and keeps to a daily share of the token limit"""
+    return shared_llm_client(ai_config['api_key'],
+                             max_concurrency=ai_config.get('max_concurrency', 4),
+                             wait_open=ai_config.get('max_wait_seconds', 300),
+                             paced=True)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Warm Mail Connections
+Holds logged-in IMAP and SMTP connections opened ahead of time so the
+newsletter run skips the TLS handshake and login round trips
+"""
+
+import base64
+import imaplib
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from email.mime.base import MIMEBase
+
+from mp3_tools import mapped
+
+# Mail servers drop sessions idle for a few minutes, while warm-ups run from
+# minutes to hours ahead of use: idle connections get a NOOP every
+# KEEPALIVE_SECONDS, anything silent for MAX_IDLE_SECONDS is presumed dropped
+# and nothing is kept past MAX_AGE_SECONDS
+KEEPALIVE_SECONDS = 120
+MAX_IDLE_SECONDS = 240
+MAX_AGE_SECONDS = 6 * 3600
+# Each warm-up adds a session; keep only the newest few per kind so they
+# don't pile up against the provider's connection limit
+MAX_IDLE_CONNECTIONS = 2
+
+
+def open_imap(email_config, verify=False):
+    context = ssl.create_default_context()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    imap = imaplib.IMAP4_SSL(email_config['imap_server'], email_config['imap_port'],
+                             ssl_context=context)
+    imap.login(email_config['username'], email_config['password'])
+    return imap
+
+
+def open_smtp(server, port, username, password, timeout=30):
+    smtp = smtplib.SMTP(server, port, timeout=timeout)
+    smtp.starttls()
+    smtp.login(username, password)
+    return smtp
+
+
+def file_attachment(path, filename, maintype='audio', subtype='mpeg'):
+    """MIME part for a file, base64-encoded straight from a memory map so the
+    raw bytes are never held alongside the encoded copy"""
+    part = MIMEBase(maintype, subtype)
+    with mapped(path) as data:
+        part.set_payload(base64.encodebytes(data).decode('ascii'))
+    part['Content-Transfer-Encoding'] = 'base64'
+    part.add_header('Content-Disposition', 'attachment', filename=filename)
+    return part
+
+
+class MailPool:
+    def __init__(self, max_idle=MAX_IDLE_SECONDS, keepalive_seconds=KEEPALIVE_SECONDS,
+                 max_age=MAX_AGE_SECONDS, max_connections=MAX_IDLE_CONNECTIONS,
+                 clock=time.monotonic):
+        """Idle connections are kept alive by a background NOOP every
+        keepalive_seconds until taken (see keep_alive)"""
+        self.max_idle = max_idle
+        self.keepalive_seconds = keepalive_seconds
+        self.max_age = max_age
+        self.max_connections = max_connections
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.idle = {'imap': [], 'smtp': []}  # (opened, last heard from, connection)
+        self.keeper = None
+
+    def put(self, kind, connection):
+        """Keep a connection for later, closing the oldest of its kind past
+        max_connections"""
+        now = self.clock()
+        surplus = []
+        with self.lock:
+            entries = self.idle[kind]
+            entries.append((now, now, connection))
+            while len(entries) > self.max_connections:
+                oldest = min(entries, key=lambda entry: entry[0])
+                entries.remove(oldest)
+                surplus.append(oldest[2])
+        for old in surplus:
+            self.discard(kind, old)
+        self.start_keepalive()
+
+    def take(self, kind):
+        """A still-alive warm connection of this kind, or None"""
+        while True:
+            with self.lock:
+                if not self.idle[kind]:
+                    return None
+                opened, active, connection = self.idle[kind].pop()
+            now = self.clock()
+            if now - active > self.max_idle or now - opened > self.max_age:
+                self.discard(kind, connection)
+                continue
+            try:
+                connection.noop()
+                return connection
+            except Exception:
+                self.discard(kind, connection)
+
+    def keep_alive(self):
+        """NOOP connections that have been quiet for keepalive_seconds so the
+        server doesn't drop them before they're taken; dead or expired ones
+        are closed"""
+        now = self.clock()
+        with self.lock:
+            due = [(kind, entry) for kind, entries in self.idle.items() for entry in entries
+                   if now - entry[1] >= self.keepalive_seconds]
+            for kind, entry in due:
+                self.idle[kind].remove(entry)
+        for kind, (opened, _, connection) in due:
+            if now - opened > self.max_age:
+                self.discard(kind, connection)
+                continue
+            try:
+                connection.noop()
+            except Exception:
+                self.discard(kind, connection)
+                continue
+            with self.lock:
+                self.idle[kind].append((opened, self.clock(), connection))
+
+    def start_keepalive(self):
+        with self.lock:
+            if self.keeper is not None:
+                return
+            self.keeper = threading.Thread(target=self.keepalive_loop, name="mail-keepalive", daemon=True)
+        self.keeper.start()
+
+    def keepalive_loop(self):
+        """Runs while there are idle connections to look after"""
+        while True:
+            time.sleep(self.keepalive_seconds)
+            self.keep_alive()
+            with self.lock:
+                if not any(self.idle.values()):
+                    self.keeper = None
+                    return
+
+    def discard(self, kind, connection):
+        try:
+            if kind == 'imap':
+                connection.logout()
+            else:
+                connection.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.lock:
+            idle = [(kind, connection) for kind, entries in self.idle.items()
+                    for _, _, connection in entries]
+            self.idle = {'imap': [], 'smtp': []}
+        for kind, connection in idle:
+            self.discard(kind, connection)
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def shared_mail_pool():
+    global _shared_pool
+    if _shared_pool is None:
+        with _shared_lock:
+            if _shared_pool is None:
+                _shared_pool = MailPool()
+    return _shared_pool
+
+
+def take_or_open(kind, opener):
+    """Use a warm connection if one is waiting, else open a fresh one"""
+    connection = shared_mail_pool().take(kind)
+    if connection is not None:
+        logging.info(f"♨️ Reusing warm {kind.upper()} connection")
+        return connection
+    return opener()
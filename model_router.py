@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Model Router
+Scores each newsletter item by complexity and sends it to the cheapest
+engine that can do it justice: canned templates for price and flow lines,
+a small model for ordinary stories, a larger model only for dense analysis.
+All model calls for an issue run concurrently.
+"""
+
+import logging
+import re
+import time
+
+# "BTC: 108.6k (-1%)", "NASDAQ: 20.6k", "BTC ETFs: +$602mn, ETH ETFs: +$148mn"
+ROUTINE_LINE = re.compile(r'^[\w &/.-]{1,24}:\s*[-+]?\$?[\d.,]+\s*[kmbt]?n?\b', re.IGNORECASE)
+TICKER = re.compile(r'^[A-Z0-9&$]{2,6}:?$')
+ANALYSIS_WORDS = {
+    'because', 'after', 'amid', 'despite', 'while', 'ahead', 'proposal', 'bill', 'ruling',
+    'lawsuit', 'court', 'investigation', 'probe', 'merger', 'acquisition', 'acquire', 'guidance',
+    'earnings', 'policy', 'fed', 'sec', 'cftc', 'regulation', 'regulators', 'tariff', 'tariffs',
+    'strategy', 'restructuring', 'bankruptcy', 'hack', 'exploit', 'approval', 'approves', 'vote',
+    'settlement', 'sanctions', 'legislation', 'framework', 'concessions', 'antitrust'
+}
+
+TIERS = ('template', 'small', 'large')
+
+SYSTEM_PROMPT = ("You are a markets analyst writing one spoken segment of a morning podcast. "
+                 "Explain what happened, why it matters and what listeners should watch. "
+                 "Use only facts given to you; never invent prices, dates or figures.")
+
+
+def item_complexity(item):
+    """0 for routine data lines up to 1 for long, entity-heavy analysis items"""
+    words = item.split()
+    if not words:
+        return 0.0
+    cleaned = [word.strip('.,:;()"\'') for word in words]
+    numeric = sum(1 for word in cleaned if re.search(r'\d', word)) / len(words)
+    analysis = sum(1 for word in cleaned if word.lower() in ANALYSIS_WORDS)
+    entities = sum(1 for word in cleaned[1:]
+                   if word[:1].isupper() and not TICKER.match(word))
+
+    score = min(len(words), 40) / 40 * 0.5
+    score += 0.1 * min(analysis, 3)
+    score += 0.05 * min(entities, 4)
+    score -= 0.4 * numeric
+    if ROUTINE_LINE.match(item):
+        score -= 0.3
+    return round(max(0.0, min(1.0, score)), 3)
+
+
+class ModelRouter:
+    def __init__(self, llm, small_model='gpt-4o-mini', large_model='gpt-4o',
+                 template_below=0.15, large_from=0.5, small_tokens=220, large_tokens=420,
+                 context_items=15):
+        self.llm = llm
+        self.models = {'small': small_model, 'large': large_model}
+        self.max_tokens = {'small': small_tokens, 'large': large_tokens}
+        self.template_below = template_below
+        self.large_from = large_from
+        self.context_items = context_items
+        self.last_stats = {}
+
+    def route(self, item, has_template=True):
+        """Routine items stay on templates unless only the generic fallback would fit them"""
+        if self.llm is None:
+            return 'template'
+        score = item_complexity(item)
+        if score < self.template_below:
+            return 'template' if has_template else 'small'
+        return 'large' if score >= self.large_from else 'small'
+
+    def job(self, item, tier, headlines):
+        words = self.max_tokens[tier] * 3 // 5
+        prompt = f"Newsletter item: {item}\n\n"
+        if tier == 'large' and headlines:
+            prompt += "Other headlines in today's issue, for context:\n" + \
+                      '\n'.join(f"- {headline}" for headline in headlines if headline != item) + "\n\n"
+        prompt += f"Write about {words} words for the podcast. Plain spoken prose, no headings."
+        return {
+            'model': self.models[tier],
+            'messages': [{"role": "system", "content": SYSTEM_PROMPT},
+                         {"role": "user", "content": prompt}],
+            'max_tokens': self.max_tokens[tier],
+            'temperature': 0.5,
+            'label': f"expand:{tier}"
+        }
+
+    def expand_all(self, items, template, has_template=None):
+        """Expansions in item order; template(item) serves routine items and failed calls
+
+        has_template(item) says whether a specific template covers the item.
+        """
+        start = time.monotonic()
+        tiers = [self.route(item, has_template(item) if has_template else True) for item in items]
+        expansions = [template(item) if tier == 'template' else None
+                      for item, tier in zip(items, tiers)]
+        pending = [index for index, tier in enumerate(tiers) if tier != 'template']
+        headlines = items[:self.context_items]
+
+        fallbacks = 0
+        if pending:
+            jobs = [self.job(items[index], tiers[index], headlines) for index in pending]
+            for index, result in zip(pending, self.llm.complete_many(jobs)):
+                if isinstance(result, Exception) or not result:
+                    logging.warning(f"Expansion failed for '{items[index][:40]}', using template: {result}")
+                    expansions[index] = template(items[index])
+                    fallbacks += 1
+                else:
+                    expansions[index] = f"{items[index]}\n\n{result}\n"
+
+        self.last_stats = {tier: tiers.count(tier) for tier in TIERS}
+        self.last_stats.update(llm_calls=len(pending), fallbacks=fallbacks,
+                               seconds=round(time.monotonic() - start, 2))
+        logging.info(f"🔀 Routed {len(items)} items: {self.last_stats['template']} template, "
+                     f"{self.last_stats['small']} small, {self.last_stats['large']} large "
+                     f"({len(pending)} concurrent calls, {self.last_stats['seconds']:.1f}s)")
+        return expansions
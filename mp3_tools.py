@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+MP3 Tools
+Pure-Python MPEG audio frame scanning for joining separately synthesized
+segments without re-encoding: tags and per-segment Xing/Info header
+frames are dropped so the result plays as one continuous stream. Exact
+durations come from the frame headers and episodes get ID3v2 tags with
+per-story chapters; files are read through memory maps
+"""
+
+import io
+import logging
+import mmap
+import os
+import shutil
+import struct
+from contextlib import ExitStack, contextmanager
+
+# Bitrates in kbps by [MPEG-1?][layer][index]
+BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+VERSIONS = {3: '1', 2: '2', 0: '2.5'}
+
+
+def id3_declared_size(header):
+    """Total bytes an ID3v2 tag says it takes, from its 10-byte header (0 if
+    there isn't one)"""
+    if len(header) >= 10 and header[:3] == b'ID3':
+        size = ((header[6] & 0x7f) << 21) | ((header[7] & 0x7f) << 14) | \
+               ((header[8] & 0x7f) << 7) | (header[9] & 0x7f)
+        footer = 10 if header[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def id3_size(audio):
+    """Bytes taken by a leading ID3v2 tag (0 if there isn't one)"""
+    return min(id3_declared_size(audio), len(audio))
+
+
+def id3v1_size(audio):
+    """Bytes taken by a trailing 128-byte ID3v1 tag (0 if there isn't one)"""
+    return 128 if len(audio) >= 128 and audio[-128:-125] == b'TAG' else 0
+
+
+def strip_id3(audio):
+    """Drop a leading ID3v2 tag so appended segments don't carry headers mid-file"""
+    size = id3_size(audio)
+    return audio[size:] if size else audio
+
+
+def strip_id3v1(audio):
+    """Drop a trailing 128-byte ID3v1 tag"""
+    size = id3v1_size(audio)
+    return audio[:-size] if size else audio
+
+
+def frame_header(data, offset=0):
+    """Decoded MPEG audio frame header at offset, or None if there isn't one"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version_bits = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # reserved values or free format: not a frame we can size
+    mpeg1 = version_bits == 3
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or mpeg1 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        'version': VERSIONS[version_bits],
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'channels': 1 if (b3 >> 6) == 3 else 2,
+        'samples': samples,
+        'length': length
+    }
+
+
+def is_info_frame(data, offset, header):
+    """True for the Xing/Info/VBRI frame encoders put first: metadata that
+    decodes as a frame of silence and describes only its own segment"""
+    if header['version'] == '1':
+        side_info = 17 if header['channels'] == 1 else 32
+    else:
+        side_info = 9 if header['channels'] == 1 else 17
+    start = offset + 4 + side_info
+    return data[start:start + 4] in (b'Xing', b'Info') or data[offset + 36:offset + 40] == b'VBRI'
+
+
+def iter_frames(data, start=0, end=None):
+    """(offset, header) for each audio frame; junk between frames is skipped and
+    a sync match only counts if the next frame (or the end) follows it"""
+    offset, end = start, len(data) if end is None else end
+    while offset + 4 <= end:
+        header = frame_header(data, offset)
+        if header is not None and header['length'] > 4:
+            following = offset + header['length']
+            if following > end:
+                return  # truncated last frame
+            if following == end or frame_header(data, following) is not None:
+                yield offset, header
+                offset = following
+                continue
+        offset += 1
+
+
+def audio_frames(data):
+    """The audio frames of one MP3 file as bytes, without tags or info frames"""
+    data = strip_id3v1(strip_id3(data))
+    kept, first = [], True
+    for offset, header in iter_frames(data):
+        if first and is_info_frame(data, offset, header):
+            first = False
+            continue
+        first = False
+        kept.append(data[offset:offset + header['length']])
+    return b''.join(kept)
+
+
+def mp3_duration(data):
+    """Exact playing time in seconds, summed from the frame headers; the
+    Xing/Info frame at the start plays no audio and isn't counted"""
+    start, end = id3_size(data), len(data) - id3v1_size(data)
+    seconds, first = 0.0, True
+    for offset, header in iter_frames(data, start, end):
+        if not (first and is_info_frame(data, offset, header)):
+            seconds += header['samples'] / header['sample_rate']
+        first = False
+    return seconds
+
+
+def file_duration(path):
+    """mp3_duration of a file, read through a memory map"""
+    with mapped(path) as data:
+        return mp3_duration(data)
+
+
+def stream_format(data):
+    """(sample_rate, channels) of the first frame, or None"""
+    for _, header in iter_frames(strip_id3(data)):
+        return header['sample_rate'], header['channels']
+    return None
+
+
+@contextmanager
+def mapped(source):
+    """Read-only mmap of a file path or binary file object (b'' when empty),
+    so large MP3s can be scanned and copied without loading them"""
+    with ExitStack() as stack:
+        f = stack.enter_context(open(source, 'rb')) if isinstance(source, (str, os.PathLike)) else source
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        yield stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class MP3Writer:
+    def __init__(self, out):
+        """Appends MP3 segments to the binary file out frame by frame: tags and
+        each segment's Xing/Info frame are dropped so the result is one gapless
+        stream, and audio is copied in contiguous runs straight from the source"""
+        self.out = out
+        self.formats = set()
+        self.bytes = 0
+        self.seconds = 0.0
+        self.chapters = []  # (title, start_seconds)
+        self.tag_at = self.tag_size = None
+
+    def reserve_tag(self, size=4096):
+        """Leave room for an ID3v2 tag at this point, written by write_tag once
+        the duration and chapter times are known"""
+        self.tag_at, self.tag_size = self.out.tell(), size
+        self.write(pad_tag(id3_tag({}), size))
+
+    def mark(self, title):
+        """Start a chapter at the current playing time"""
+        self.chapters.append((title, self.seconds))
+
+    def write(self, view):
+        self.out.write(view)
+        self.bytes += len(view)
+
+    def append(self, data):
+        """Add one segment (bytes, memoryview or mmap); bytes that don't parse
+        as MP3 at all are appended as they are"""
+        start, end = id3_size(data), len(data) - id3v1_size(data)
+        run_start = run_end = None
+        first = True
+        with memoryview(data) as view:
+            for offset, header in iter_frames(data, start, end):
+                skip = first and is_info_frame(data, offset, header)
+                if first:
+                    self.formats.add((header['sample_rate'], header['channels']))
+                first = False
+                if skip:
+                    continue
+                self.seconds += header['samples'] / header['sample_rate']
+                if offset != run_end:
+                    if run_start is not None:
+                        self.write(view[run_start:run_end])
+                    run_start = offset
+                run_end = offset + header['length']
+            if run_start is not None:
+                self.write(view[run_start:run_end])
+            elif start < len(data):
+                self.write(view[start:])
+
+    def append_file(self, source):
+        """Add one segment from a path or binary file object via mmap"""
+        with mapped(source) as data:
+            self.append(data)
+
+    def finish(self):
+        if len(self.formats) > 1:
+            logging.warning(f"Joining MP3 segments with different formats: {sorted(self.formats)}")
+        return self.bytes
+
+    def write_tag(self, tags):
+        """Fill the reserved space with tags, the duration and chapters; False
+        if nothing was reserved or it doesn't fit"""
+        if self.tag_at is None:
+            return False
+        tag = id3_tag(tags, self.chapters if len(self.chapters) > 1 else (), self.seconds)
+        if len(tag) > self.tag_size:
+            return False
+        end = self.out.tell()
+        self.out.seek(self.tag_at)
+        self.out.write(pad_tag(tag, self.tag_size))
+        self.out.seek(end)
+        return True
+
+
+def join_mp3(segments):
+    """Concatenate MP3 segments frame by frame into one gapless stream
+
+    Segments must share a sample rate and channel count to play back cleanly;
+    bytes that don't parse as MP3 at all are appended as they are.
+    """
+    out = io.BytesIO()
+    writer = MP3Writer(out)
+    for segment in segments:
+        writer.append(segment)
+    writer.finish()
+    return out.getvalue()
+
+
+def trim_mp3(data, seconds):
+    """The frames of data that fit in the first seconds of playback"""
+    kept, played = [], 0.0
+    for offset, header in iter_frames(data):
+        if played >= seconds:
+            break
+        kept.append(data[offset:offset + header['length']])
+        played += header['samples'] / header['sample_rate']
+    return b''.join(kept)
+
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz mono: ElevenLabs' default output
+DEFAULT_HEADER = b'\xff\xfb\x90\xc4'
+
+
+def silence(seconds, like=None):
+    """seconds of silent frames in the format of the MP3 data like
+
+    A Layer III frame whose side info and main data are all zero decodes to
+    silence, so no encoder is needed.
+    """
+    header, data = DEFAULT_HEADER, strip_id3(like or b'')
+    for offset, _ in iter_frames(data):
+        header = data[offset:offset + 4]
+        break
+    # No padding byte, no CRC, so every frame is the same size and all zeros
+    header = bytes([header[0], header[1] | 0x01, header[2] & ~0x02 & 0xff, header[3]])
+    decoded = frame_header(header)
+    count = round(seconds * decoded['sample_rate'] / decoded['samples'])
+    return (header + bytes(decoded['length'] - 4)) * count
+
+
+# ID3v2.3 text frames for each tags key; v2.3 is what podcast apps read most reliably
+TAG_FRAMES = {'title': 'TIT2', 'artist': 'TPE1', 'album': 'TALB', 'genre': 'TCON',
+              'year': 'TYER', 'track': 'TRCK', 'publisher': 'TPUB'}
+
+
+def syncsafe(value):
+    return bytes([(value >> 21) & 0x7f, (value >> 14) & 0x7f, (value >> 7) & 0x7f, value & 0x7f])
+
+
+def id3_frame(frame_id, body):
+    return frame_id.encode('ascii') + struct.pack('>I', len(body)) + b'\x00\x00' + body
+
+
+def text_frame(frame_id, text):
+    """A text frame in UTF-16 with a byte order mark (ID3v2.3 encoding 1)"""
+    return id3_frame(frame_id, b'\x01' + str(text).encode('utf-16'))
+
+
+def chapter_frames(chapters, total_seconds):
+    """CTOC listing one CHAP per (title, start_seconds), each ending where
+    the next begins, as podcast apps use for chapter navigation"""
+    ids = [f"chp{index}".encode('ascii') for index in range(len(chapters))]
+    frames = [id3_frame('CTOC', b'toc\x00' + b'\x03' + bytes([len(ids)]) +
+                        b''.join(element + b'\x00' for element in ids))]
+    for index, (title, start) in enumerate(chapters):
+        end = chapters[index + 1][1] if index + 1 < len(chapters) else total_seconds
+        timing = struct.pack('>IIII', round(start * 1000), round(end * 1000), 0xFFFFFFFF, 0xFFFFFFFF)
+        frames.append(id3_frame('CHAP', ids[index] + b'\x00' + timing + text_frame('TIT2', title)))
+    return b''.join(frames)
+
+
+def id3_tag(tags, chapters=(), duration=None):
+    """ID3v2.3 tag from tags (title, artist, album, genre, year, track,
+    publisher), the length in seconds and (title, start_seconds) chapters"""
+    frames = [text_frame(TAG_FRAMES[key], value) for key, value in tags.items()
+              if key in TAG_FRAMES and value not in (None, '')]
+    if duration is not None:
+        frames.append(text_frame('TLEN', str(round(duration * 1000))))
+    if chapters:
+        frames.append(chapter_frames(list(chapters), duration or chapters[-1][1]))
+    body = b''.join(frames)
+    return b'ID3\x03\x00\x00' + syncsafe(len(body)) + body
+
+
+def pad_tag(tag, size):
+    """tag grown with zero padding to size bytes in all (never shrunk)"""
+    size = max(size, len(tag))
+    return tag[:6] + syncsafe(size - 10) + tag[10:] + bytes(size - len(tag))
+
+
+def write_id3(path, tag):
+    """Put tag at the front of the MP3 at path, replacing any ID3v2 tag there:
+    in place when the old tag's space is big enough, otherwise by streaming
+    the audio into a new file"""
+    with open(path, 'r+b') as f:
+        existing = id3_declared_size(f.read(10))
+        if existing and len(tag) <= existing:
+            f.seek(0)
+            f.write(pad_tag(tag, existing))
+            return
+    partial = f"{path}.part"
+    with open(path, 'rb') as source, open(partial, 'wb') as out:
+        out.write(tag)
+        source.seek(existing)
+        shutil.copyfileobj(source, out, 1024 * 1024)
+    os.replace(partial, path)
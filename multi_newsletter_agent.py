@@ -21,6 +21,8 @@ from email.header import decode_header
 import logging
 import re
 
+from chunked_summarizer import ChunkedSummarizer
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
 class MultiNewsletterAgent:
@@ -211,19 +213,8 @@ class MultiNewsletterAgent:
             script_parts.append(f"Today's update: {newsletter['subject']}")
             script_parts.append("")
             
-            # Get key content
-            content = newsletter['body']
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip() and len(p) > 50]
-            
-            if paragraphs:
-                main_content = '\n\n'.join(paragraphs[:2])
-            else:
-                sentences = [s.strip() for s in content.split('.') if s.strip()]
-                main_content = '. '.join(sentences[:4]) + '.'
-            
-            # Limit content length
-            if len(main_content) > 800:
-                main_content = main_content[:800] + "..."
+            # Key content: lead sentences from every section of the issue
+            main_content = ChunkedSummarizer().condense(newsletter['body'], budget_tokens=300)
             
             script_parts.append(main_content)
             script_parts.append("")
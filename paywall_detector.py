@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Paywall and Non-Article Detection
+Classifies a link from its URL, response headers and the first few KB
+of markup so paywalls, PDFs and media are dropped before a full download
+"""
+
+import codecs
+import re
+from urllib.parse import urlparse
+
+# How much markup to inspect before deciding whether to keep reading
+HEAD_BYTES = 16 * 1024
+
+NON_ARTICLE_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg',
+    '.mp4', '.mov', '.webm', '.m3u8', '.mp3', '.m4a', '.wav',
+    '.zip', '.gz', '.xlsx', '.xls', '.docx', '.pptx', '.csv'
+)
+ARTICLE_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+# Markup that only appears on pages withholding the article
+HARD_PAYWALL_MARKERS = re.compile(
+    r'"isAccessibleForFree"\s*:\s*"?false|'
+    r'wsj-snippet-login|snippet-promotion|'        # WSJ
+    r'barrier-page|js-barrier|o-barrier|'          # FT
+    r'id="regwall"|class="regwall|registration-wall',
+    re.I
+)
+# Markup that also shows up on metered pages which still carry the full text
+SOFT_PAYWALL_MARKERS = re.compile(
+    r'paywall|meteredContent|tp-modal|piano\.io|'
+    r'subscribe to (?:continue|keep) reading|to continue reading|'
+    r'already a subscriber|sign in to read|create a free account to continue',
+    re.I
+)
+
+
+def classify_url(url):
+    """'binary' for links that are obviously files or media, else None"""
+    path = urlparse(url).path.lower()
+    if path.endswith(NON_ARTICLE_EXTENSIONS):
+        return 'binary'
+    return None
+
+
+def classify_response(status_code, headers):
+    """Verdict from the status line and headers alone: 'binary', 'paywall' or None"""
+    if status_code in (401, 402):
+        return 'paywall'
+    content_type = (headers.get('Content-Type') or '').split(';')[0].strip().lower()
+    if content_type and not content_type.startswith(ARTICLE_CONTENT_TYPES):
+        return 'binary'
+    return None
+
+
+def classify_head(markup):
+    """'paywall' if the opening markup carries a definite paywall marker"""
+    if HARD_PAYWALL_MARKERS.search(markup):
+        return 'paywall'
+    return None
+
+
+def looks_paywalled(markup, text_length, min_text_length=200):
+    """After extraction: too little text on a page with paywall markup"""
+    return text_length < min_text_length and bool(SOFT_PAYWALL_MARKERS.search(markup))
+
+
+def response_encoding(response):
+    content_type = response.headers.get('Content-Type') or ''
+    if 'charset=' in content_type.lower() and response.encoding:
+        try:
+            return codecs.lookup(response.encoding).name
+        except LookupError:
+            pass
+    # HTML without a declared charset is nearly always UTF-8 nowadays
+    return 'utf-8'
+
+
+def read_article_page(response, head_bytes=HEAD_BYTES, enough=None):
+    """Read a streamed response, giving up after the first few KB on a paywall
+
+    enough(head_markup) is asked once </head> has arrived; if it says the
+    head alone will do, the body is never downloaded. Returns (markup,
+    verdict) where verdict is 'paywall', 'partial' or None.
+    """
+    encoding = response_encoding(response)
+    chunks = []
+    size = 0
+    checked = False
+    head_seen = enough is None
+    for chunk in response.iter_content(chunk_size=8192):
+        if not chunk:
+            continue
+        chunks.append(chunk)
+        size += len(chunk)
+        if not head_seen and b'</head>' in b''.join(chunks[-2:]).lower():
+            head_seen = checked = True
+            head = b''.join(chunks).decode(encoding, errors='replace')
+            if classify_head(head):
+                return head, 'paywall'
+            if enough(head):
+                return head, 'partial'
+        if not checked and size >= head_bytes:
+            checked = True
+            head = b''.join(chunks).decode(encoding, errors='replace')
+            if classify_head(head):
+                return head, 'paywall'
+    markup = b''.join(chunks).decode(encoding, errors='replace')
+    if not checked and classify_head(markup):
+        return markup, 'paywall'
+    return markup, None
@@ -4,10 +4,9 @@ Process Today's Mando Minutes - Complete Flow
 Creates enhanced podcast with link following, generates audio, sends email
 """
 
-from dual_newsletter_automation import DualNewsletterAutomation
-import logging
+from dual_newsletter_automation import DualNewsletterAutomation, setup_logging
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 
 # Create automation instance
 automation = DualNewsletterAutomation()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Provider Resilience
+Retries with exponential backoff and jitter that honor Retry-After, a
+circuit breaker per provider (OpenAI, ElevenLabs), and a local ledger of
+tokens and characters used against each plan's monthly limit, so
+scheduled runs wait out a bad patch instead of failing at peak time
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import random
+import threading
+import time
+from calendar import monthrange
+from contextlib import contextmanager
+from datetime import date
+
+from fetch_scheduler import parse_retry_after
+
+QUOTA_LEDGER = "cache/quota_ledger.json"
+
+# Worth another try after a pause; everything else fails straight away
+RETRYABLE = {'rate_limit', 'server', 'network'}
+
+
+class ProviderError(Exception):
+    """A provider call that failed for good, with the reason as a kind:
+    rate_limit, quota, server, network, auth, client or circuit_open"""
+
+    def __init__(self, provider, kind, message, status=None, retry_after=None):
+        super().__init__(f"{provider} {kind}: {message}")
+        self.provider = provider
+        self.kind = kind
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ProviderError):
+    def __init__(self, provider, seconds):
+        super().__init__(provider, 'circuit_open', f"paused for another {seconds:.0f}s",
+                         retry_after=seconds)
+
+
+def raise_for_provider(provider, response):
+    """Raise a classified ProviderError for a non-2xx requests response"""
+    if response.status_code < 300:
+        return response
+    raise ProviderError(provider, status_kind(response.status_code, response.text),
+                        f"HTTP {response.status_code} {response.text[:200]}",
+                        status=response.status_code,
+                        retry_after=parse_retry_after(response.headers.get('Retry-After')))
+
+
+def status_kind(status, text=''):
+    if 'quota' in (text or '').lower():
+        # OpenAI insufficient_quota (429) and ElevenLabs quota_exceeded (401)
+        return 'quota'
+    if status == 429:
+        return 'rate_limit'
+    if status in (408, 409) or status >= 500:
+        return 'server'
+    if status in (401, 403):
+        return 'auth'
+    return 'client'
+
+
+def classify(error):
+    """(kind, status, retry_after) for any exception a provider call raised"""
+    if isinstance(error, ProviderError):
+        return error.kind, error.status, error.retry_after
+    status = getattr(error, 'status_code', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+    if status is None:
+        # No HTTP status: connection resets, timeouts, DNS failures
+        names = ' '.join(cls.__name__ for cls in type(error).__mro__)
+        network = any(word in names for word in ('Connection', 'Timeout', 'Network'))
+        return ('network' if network or isinstance(error, OSError) else 'client'), None, None
+    headers = getattr(response, 'headers', None) or {}
+    text = f"{error} {getattr(error, 'body', '') or ''}"
+    return status_kind(status, text), status, parse_retry_after(headers.get('retry-after'))
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=20.0, retry_after=None):
+    """Full-jitter exponential backoff; a server's Retry-After is a floor"""
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, base_delay)
+    return delay
+
+
+class CircuitBreaker:
+    """Opens after a run of failures so callers stop hammering a struggling
+    provider; after reset_after one trial call is let through (half-open)"""
+
+    def __init__(self, name, failure_threshold=5, reset_after=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.cooldown = reset_after
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def seconds_until_retry(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self):
+        with self.lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logging.info(f"🟢 {self.name} circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self, cooldown=None, trip=False):
+        """Count a failure; trip opens at once (a spent quota won't heal in seconds)"""
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if trip or self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.cooldown = cooldown or self.reset_after
+                logging.warning(f"🔴 {self.name} circuit open for {self.cooldown:.0f}s "
+                                f"after {self.failures} failures")
+
+
+class Resilience:
+    def __init__(self, provider, retries=3, base_delay=0.5, max_delay=20.0, max_retry_after=60.0,
+                 failure_threshold=5, reset_after=30.0, quota_cooldown=3600.0):
+        self.provider = provider
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.quota_cooldown = quota_cooldown
+        self.breaker = CircuitBreaker(provider, failure_threshold, reset_after)
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+
+    def gate(self, wait_open):
+        """Seconds to pause before asking the breaker again (0: go ahead), or CircuitOpenError"""
+        if self.breaker.allow():
+            return 0.0
+        # Zero left on the clock means another caller holds the half-open trial
+        seconds = self.breaker.seconds_until_retry() or 0.5
+        if seconds > wait_open:
+            self.stats['rejected'] += 1
+            raise CircuitOpenError(self.provider, seconds)
+        logging.info(f"⏸️ {self.provider} paused, waiting {seconds:.0f}s before calling again")
+        return seconds
+
+    def failed(self, error, attempt):
+        """Backoff before the next attempt, or the ProviderError to give up with"""
+        kind, status, retry_after = classify(error)
+        if kind in RETRYABLE:
+            self.breaker.record_failure()
+        elif kind == 'quota':
+            self.breaker.record_failure(cooldown=self.quota_cooldown, trip=True)
+        else:
+            # The request itself was bad; the provider is fine
+            self.breaker.record_success()
+
+        give_up = (kind not in RETRYABLE or attempt >= self.retries
+                   or self.breaker.state == 'open'
+                   or (retry_after is not None and retry_after > self.max_retry_after))
+        if give_up:
+            self.stats['failures'] += 1
+            if isinstance(error, ProviderError):
+                return error
+            return ProviderError(self.provider, kind, str(error), status, retry_after)
+        self.stats['retries'] += 1
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay, retry_after)
+        logging.warning(f"🔁 {self.provider} {kind} ({status or 'no response'}), "
+                        f"retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+        return delay
+
+    def call(self, fn, wait_open=0.0):
+        """fn() with retries; wait_open lets scheduled runs sit out an open circuit"""
+        self.stats['calls'] += 1
+        for attempt in range(self.retries + 1):
+            pause = self.gate(wait_open)
+            while pause:
+                time.sleep(pause)
+                wait_open -= pause
+                pause = self.gate(wait_open)
+            try:
+                result = fn()
+            except Exception as e:
+                outcome = self.failed(e, attempt)
+                if isinstance(outcome, Exception):
+                    raise outcome from e
+                time.sleep(outcome)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, make_coroutine, wait_open=0.0):
+        """Async call(): make_coroutine() builds a fresh awaitable per attempt"""
+        self.stats['calls'] += 1
+        for attempt in range(self.retries + 1):
+            pause = self.gate(wait_open)
+            while pause:
+                await asyncio.sleep(pause)
+                wait_open -= pause
+                pause = self.gate(wait_open)
+            try:
+                result = await make_coroutine()
+            except Exception as e:
+                outcome = self.failed(e, attempt)
+                if isinstance(outcome, Exception):
+                    raise outcome from e
+                await asyncio.sleep(outcome)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+class QuotaLedger:
+    """Units used this calendar month (and today) per provider, persisted
+    locally and checked against plan limits such as ElevenLabs characters
+
+    The file is shared by every process (the dashboard and the scheduler):
+    each record merges into what's on disk under a file lock and replaces
+    it atomically, and reads pick up the other processes' spending.
+    """
+
+    def __init__(self, path=QUOTA_LEDGER, limits=None, clock=date.today):
+        self.path = path
+        self.limits = dict(limits or {})
+        self.clock = clock
+        self.lock = threading.Lock()
+        today = clock()
+        self.period = today.strftime('%Y-%m')
+        self.day = today.isoformat()
+        self.used = {}
+        self.used_today = {}
+        self.refresh()
+
+    def refresh(self):
+        """Take this month's and today's usage from the file; kept as is
+        when it can't be read"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Quota ledger unreadable, keeping the counts in memory: {e}")
+            return
+        if saved.get('period') == self.period:
+            self.used = saved.get('used', {})
+            self.used_today = saved.get('today', {}) if saved.get('day') == self.day else {}
+
+    @contextmanager
+    def file_lock(self):
+        """Exclusive across processes while a record reads, merges and writes"""
+        if not self.path:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.lock', 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def set_limit(self, provider, unit, limit):
+        if limit:
+            self.limits[(provider, unit)] = limit
+
+    def roll_over(self):
+        today = self.clock()
+        period, day = today.strftime('%Y-%m'), today.isoformat()
+        if period != self.period:
+            self.period, self.used = period, {}
+        if day != self.day:
+            self.day, self.used_today = day, {}
+
+    def record(self, provider, unit, amount):
+        with self.lock, self.file_lock():
+            self.roll_over()
+            self.refresh()
+            for used in (self.used, self.used_today):
+                usage = used.setdefault(provider, {})
+                usage[unit] = usage.get(unit, 0) + amount
+            if self.path:
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, 'w') as f:
+                    json.dump({'period': self.period, 'used': self.used,
+                               'day': self.day, 'today': self.used_today}, f, indent=2)
+                os.replace(tmp, self.path)
+
+    def spent(self, provider, unit):
+        with self.lock:
+            self.roll_over()
+            self.refresh()
+            return self.used.get(provider, {}).get(unit, 0)
+
+    def spent_today(self, provider, unit):
+        with self.lock:
+            self.roll_over()
+            self.refresh()
+            return self.used_today.get(provider, {}).get(unit, 0)
+
+    def remaining(self, provider, unit):
+        """Units left this month, or None when no limit is set"""
+        limit = self.limits.get((provider, unit))
+        return None if limit is None else max(0, limit - self.spent(provider, unit))
+
+    def can_spend(self, provider, unit, amount):
+        remaining = self.remaining(provider, unit)
+        return remaining is None or amount <= remaining
+
+    def daily_allowance(self, provider, unit, today=None):
+        """Even share of what was left at the start of the day over the rest
+        of the month, today included"""
+        remaining = self.remaining(provider, unit)
+        if remaining is None:
+            return None
+        today = today or self.clock()
+        if today.isoformat() == self.day:
+            remaining += self.spent_today(provider, unit)
+        days_left = monthrange(today.year, today.month)[1] - today.day + 1
+        return remaining // days_left
+
+    def within_daily_allowance(self, provider, unit, amount):
+        """Whether amount more still fits in today's share of the month"""
+        allowance = self.daily_allowance(provider, unit)
+        return allowance is None or self.spent_today(provider, unit) + amount <= allowance
+
+
+_shared = {}
+_shared_ledger = None
+_shared_lock = threading.Lock()
+
+
+def shared_resilience(provider, **kwargs):
+    """One retry policy and circuit breaker per provider for the whole process"""
+    with _shared_lock:
+        if provider not in _shared:
+            _shared[provider] = Resilience(provider, **kwargs)
+        return _shared[provider]
+
+
+def configure_limits(config, ledger=None):
+    """Plan limits from config: ai_processing.monthly_token_limit and
+    voice_generation.monthly_character_limit"""
+    ledger = ledger or shared_quota_ledger()
+    ledger.set_limit('openai', 'tokens', (config.get('ai_processing') or {}).get('monthly_token_limit'))
+    ledger.set_limit('elevenlabs', 'characters',
+                     (config.get('voice_generation') or {}).get('monthly_character_limit'))
+    return ledger
+
+
+def shared_quota_ledger():
+    global _shared_ledger
+    if _shared_ledger is None:
+        with _shared_lock:
+            if _shared_ledger is None:
+                _shared_ledger = QuotaLedger()
+    return _shared_ledger
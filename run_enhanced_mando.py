@@ -60,10 +60,11 @@ class EnhancedMandoAgent(LinkFollowingNewsletterAgent):
             text_content, html_content = self.extract_email_content(email_message)
             
             # Extract and follow links
-            links = self.extract_links_from_content(text_content, html_content)
+            links = self.extract_links_from_content(text_content, html_content, max_links=8)
             logging.info(f"🔗 Found {len(links)} links")
             
             articles = []
+            fetch_outcomes = []
             if links:
                 logging.info("📰 Fetching article content...")
                 # Prioritize crypto and market news links
@@ -73,7 +74,7 @@ class EnhancedMandoAgent(LinkFollowingNewsletterAgent):
                 
                 # Fetch crypto articles first
                 all_links = crypto_links + other_links
-                articles = self.fetch_multiple_articles(all_links[:8])  # Limit to 8 articles
+                articles, fetch_outcomes = self.fetch_articles_within(all_links)
                 logging.info(f"✅ Fetched {len(articles)} articles successfully")
             
             # Create enhanced podcast script
@@ -99,6 +100,7 @@ class EnhancedMandoAgent(LinkFollowingNewsletterAgent):
                 'script_file': script_file,
                 'audio_file': audio_file,
                 'articles_count': len(articles),
+                'fetch_outcomes': fetch_outcomes,
                 'word_count': len(podcast_script.split())
             }
             
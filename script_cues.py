@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Script Cues
+Separates stage directions like [INTRO MUSIC FADES IN] or
+[SOUND EFFECT: Digital beep] from the narration, so only spoken words go
+to the voice API and the cues are rendered locally from pre-made clips
+"""
+
+import logging
+import re
+import threading
+from pathlib import Path
+
+from mp3_tools import audio_frames, silence, trim_mp3
+
+SOUNDS_DIR = "sounds"
+
+BRACKETS = re.compile(r'\[([^\[\]\n]{1,160})\]')
+SECONDS = re.compile(r'(\d+(?:\.\d+)?)\s*sec', re.IGNORECASE)
+EMPHASIS = re.compile(r'\*\*|__|^#+\s+', re.MULTILINE)
+SPEAKER = re.compile(r"^[A-Z][A-Z.'-]{1,20}:\s+(?=\S)")  # "SARAH: " opening a dialogue turn
+
+DEFAULT_SECONDS = {'pause': 1.0, 'bed': 4.0}
+
+
+def cue_label(inner):
+    """The all-caps head of a bracketed cue ("SOUND EFFECT" for
+    [SOUND EFFECT: Digital beep]), or None for ordinary bracketed text"""
+    head = inner.split(':', 1)[0].split(' - ', 1)[0].strip()
+    return head if head.isupper() else None
+
+
+def cue_kind(label):
+    """What a cue asks for: intro, outro, transition, effect, bed, pause,
+    fade or end (fades and end markers have no sound of their own)"""
+    words = label.upper()
+    if words == 'END':
+        return 'end'
+    if 'PAUSE' in words:
+        return 'pause'
+    if 'OUTRO' in words:
+        return 'outro'
+    if 'FADE' in words and 'FADES IN' not in words:
+        return 'fade'  # the clip that's fading already carries its own tail
+    if 'INTRO' in words:
+        return 'intro'
+    if 'TRANSITION' in words:
+        return 'transition'
+    if 'BACKGROUND' in words or 'MUSIC' in words:
+        return 'bed'
+    if 'SOUND' in words or 'EFFECT' in words:
+        return 'effect'
+    return 'other'
+
+
+def make_cue(inner):
+    label = cue_label(inner)
+    description = inner.split(':', 1)[1].strip() if ':' in inner else ''
+    seconds = SECONDS.search(inner)
+    kind = cue_kind(label)
+    return {
+        'kind': kind,
+        'label': label,
+        'description': SECONDS.sub('', description).strip(' -'),
+        'seconds': float(seconds.group(1)) if seconds else DEFAULT_SECONDS.get(kind),
+        'text': f"[{inner}]"
+    }
+
+
+def speakable(text):
+    """Narration without markdown emphasis or heading marks"""
+    return EMPHASIS.sub('', text)
+
+
+def tokenize(text):
+    """Narration strings and cue dicts in script order"""
+    pieces, last = [], 0
+    for match in BRACKETS.finditer(text):
+        if cue_label(match.group(1)) is None:
+            continue  # e.g. [sic] or [1] is part of what's read
+        if match.start() > last:
+            pieces.append(speakable(text[last:match.start()]))
+        pieces.append(make_cue(match.group(1)))
+        last = match.end()
+    if last < len(text):
+        pieces.append(speakable(text[last:]))
+    return pieces
+
+
+def split_cues(script):
+    """The script as a track of {'type': 'speech', 'text'} and cue parts
+    ({'type': 'cue', 'kind', ...}); runs of narration between cues are merged"""
+    parts = []
+    for piece in tokenize(script.replace('\r\n', '\n')):
+        if isinstance(piece, dict):
+            parts.append(dict(piece, type='cue'))
+        elif parts and parts[-1]['type'] == 'speech':
+            parts[-1]['text'] += piece
+        else:
+            parts.append({'type': 'speech', 'text': piece})
+    for part in parts:
+        if part['type'] == 'speech':
+            part['text'] = re.sub(r'\n{3,}', '\n\n', re.sub(r'[ \t]+\n', '\n', part['text'])).strip()
+    return [part for part in parts if part['type'] == 'cue' or part['text']]
+
+
+def narration(script):
+    """Only the words to be spoken"""
+    return '\n\n'.join(part['text'] for part in split_cues(script) if part['type'] == 'speech')
+
+
+def chapter_title(text, max_chars=60):
+    """A short chapter name from a run of narration: its first line without
+    a speaker tag, cut at a word"""
+    line = SPEAKER.sub('', text.strip().split('\n', 1)[0].strip()).rstrip(':')
+    if len(line) <= max_chars:
+        return line
+    return line[:max_chars].rsplit(' ', 1)[0].rstrip(',;:-') + '…'
+
+
+def chapter_starts(parts, first_title="Intro"):
+    """{part index: title} where a story starts: the top of the script and
+    each transition cue, titled after the narration that follows it"""
+    starts = {0: first_title} if parts else {}
+    for index, part in enumerate(parts):
+        if part['type'] == 'cue' and part['kind'] == 'transition' and index > 0:
+            following = next((later['text'] for later in parts[index + 1:] if later['type'] == 'speech'), None)
+            if following:
+                starts[index] = chapter_title(following)
+    return starts
+
+
+def is_heading(paragraph):
+    """A short single line that doesn't read as a sentence: a story title or
+    a section label like MARKET UPDATE 1:"""
+    line = paragraph.strip()
+    return ('\n' not in line and 0 < len(line) <= 100
+            and (line.endswith(':') or not line.endswith(('.', '!', '?', '…', '"', "'", ')'))))
+
+
+def split_stories(script):
+    """The script cut into stories: [{'title', 'script', 'chapter'}], each
+    script the story's narration with its own cues
+
+    Stories start at transition cues. Scripts without them are cut at
+    headings, and failing those at every paragraph, so a correction still
+    only touches the story it's in; paragraph stories don't start chapters.
+    """
+    parts = split_cues(script)
+    starts = chapter_starts(parts)
+    if len(starts) > 1:
+        bounds = sorted(starts) + [len(parts)]
+        return [{'title': starts[begin], 'chapter': True,
+                 'script': '\n\n'.join(part['text'] for part in parts[begin:end])}
+                for begin, end in zip(bounds, bounds[1:])]
+
+    pieces = []  # (is speech, text) paragraph by paragraph
+    for part in parts:
+        if part['type'] == 'speech':
+            pieces.extend((True, paragraph.strip()) for paragraph in part['text'].split('\n\n')
+                          if paragraph.strip())
+        else:
+            pieces.append((False, part['text']))
+    headed = any(speech and is_heading(text) for speech, text in pieces[1:])
+    bounds = [0]
+    for index, (speech, text) in enumerate(pieces):
+        if index and speech and (is_heading(text) or not headed) \
+                and any(earlier for earlier, _ in pieces[bounds[-1]:index]):
+            bounds.append(index)
+    bounds.append(len(pieces))
+
+    stories = []
+    for begin, end in zip(bounds, bounds[1:]):
+        first = next((text for speech, text in pieces[begin:end] if speech), '')
+        stories.append({'title': chapter_title(first) if stories else "Intro",
+                        'chapter': headed or not stories,
+                        'script': '\n\n'.join(text for _, text in pieces[begin:end])})
+    return stories if pieces else []
+
+
+class CueFilter:
+    """split_cues for a stream of text deltas: a bracket (or emphasis mark)
+    still open at the end of a delta is held back until it can be decided"""
+
+    def __init__(self, max_cue_chars=160):
+        self.max_cue_chars = max_cue_chars
+        self.buffer = ""
+
+    def feed(self, delta):
+        """Narration strings and cue dicts completed by this delta"""
+        self.buffer += delta
+        hold = len(self.buffer)
+        opening = self.buffer.rfind('[')
+        if opening != -1 and ']' not in self.buffer[opening:] and '\n' not in self.buffer[opening:] \
+                and len(self.buffer) - opening <= self.max_cue_chars:
+            hold = opening
+        while hold > 0 and self.buffer[hold - 1] in '*_#':
+            hold -= 1
+        ready, self.buffer = self.buffer[:hold], self.buffer[hold:]
+        return tokenize(ready) if ready else []
+
+    def flush(self):
+        ready, self.buffer = self.buffer, ""
+        return tokenize(ready) if ready else []
+
+
+class SoundLibrary:
+    def __init__(self, directory=SOUNDS_DIR):
+        """Pre-rendered clips in directory: <kind>.mp3 (intro, outro,
+        transition, effect, bed), optionally overridden per description as
+        <kind>_<description>.mp3, e.g. effect_digital_beep.mp3
+
+        Pauses are rendered as silence; cues without a clip are just dropped.
+        """
+        self.directory = Path(directory)
+        self.clips = {}
+        self.lock = threading.Lock()
+
+    def load(self, name):
+        with self.lock:
+            if name not in self.clips:
+                path = self.directory / f"{name}.mp3"
+                self.clips[name] = audio_frames(path.read_bytes()) if path.is_file() else None
+                if self.clips[name] is None:
+                    logging.debug(f"No sound clip {path}")
+            return self.clips[name]
+
+    def clip(self, cue, like=None):
+        """MP3 frames for a cue (b'' if there's nothing to play); like is audio
+        whose format silence should match"""
+        if cue['kind'] == 'pause':
+            return silence(cue['seconds'] or DEFAULT_SECONDS['pause'], like)
+        if cue['kind'] in ('fade', 'end', 'other'):
+            return b''
+        slug = re.sub(r'[^a-z0-9]+', '_', cue['description'].lower()).strip('_')
+        audio = (slug and self.load(f"{cue['kind']}_{slug}")) or self.load(cue['kind'])
+        if audio and cue['kind'] == 'bed':
+            # Mixing a bed under the voice needs a decoder; play a short sting of it instead
+            audio = trim_mp3(audio, cue['seconds'])
+        return audio or b''
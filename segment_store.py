@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Episode Segment Store
+Keeps each rendered podcast as an ordered list of per-story MP3 segments
+keyed by a hash of the story's text and voice, so a rerun after a
+correction only re-voices the stories that changed and re-stitches the rest
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from audio_cache import normalize_text
+from disk_cache import cache_key
+from mp3_tools import MP3Writer
+from script_cues import split_stories
+
+SEGMENTS_DIR = "cache/segments"
+TAG_BYTES = 2048
+
+
+def episode_id(show, when=None):
+    """Name under which reruns of the same issue find each other"""
+    when = when or datetime.now()
+    slug = re.sub(r'[^a-z0-9]+', '_', show.lower()).strip('_')
+    return f"{slug}-{when.strftime('%Y-%m-%d')}"
+
+
+class SegmentStore:
+    def __init__(self, directory=SEGMENTS_DIR, keep_days=14):
+        self.directory = directory
+        self.keep_days = keep_days
+        self.lock = threading.Lock()
+        self.episode_locks = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def episode_dir(self, episode):
+        return os.path.join(self.directory, episode)
+
+    def episode_lock(self, episode):
+        """Lock for one episode's folder, so different shows render side by side"""
+        with self.lock:
+            return self.episode_locks.setdefault(episode, threading.Lock())
+
+    def load(self, episode):
+        """The episode's manifest, or an empty one"""
+        try:
+            with open(os.path.join(self.episode_dir(episode), 'manifest.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'stories': []}
+
+    def save(self, episode, manifest):
+        path = os.path.join(self.episode_dir(episode), 'manifest.json')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def story_key(self, engine, story):
+        sounds = str(engine.sounds.directory) if engine.sounds is not None else None
+        return cache_key('story', normalize_text(story['script']), engine.voice, sounds)
+
+    def render(self, engine, episode, script, path, tags=None):
+        """Write the episode to path, voicing only stories whose segment isn't
+        stored yet; returns stats with stories, reused and the engine's billing"""
+        start = time.monotonic()
+        folder = self.episode_dir(episode)
+        os.makedirs(folder, exist_ok=True)
+        stories = split_stories(script)
+        for story in stories:
+            story['key'] = self.story_key(engine, story)
+            story['file'] = os.path.join(folder, f"{story['key'][:24]}.mp3")
+
+        with self.episode_lock(episode):
+            changed = [story for story in stories if not os.path.exists(story['file'])]
+            # One story repeated verbatim only needs voicing once
+            unique = list({story['file']: story for story in changed}.values())
+            voiced = engine.render_many([story['script'] for story in unique],
+                                        [story['file'] for story in unique]) if unique else {}
+
+            partial = f"{path}.part"
+            try:
+                with open(partial, 'wb') as out:
+                    writer = MP3Writer(out)
+                    if tags is not None:
+                        writer.reserve_tag(TAG_BYTES + 256 * len(stories))
+                    for story in stories:
+                        if story['chapter']:
+                            writer.mark(story['title'])
+                        writer.append_file(story['file'])
+                    writer.finish()
+                    if tags is not None and not writer.write_tag(tags):
+                        logging.warning("ID3 tag didn't fit the space reserved for it; file left untagged")
+                os.replace(partial, path)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+
+            self.save(episode, {
+                'episode': episode,
+                'output': str(path),
+                'updated': datetime.now().isoformat(),
+                'stories': [{'title': story['title'], 'key': story['key'],
+                             'file': os.path.basename(story['file']),
+                             'characters': len(story['script'])} for story in stories]
+            })
+            self.drop_unused(episode, {os.path.basename(story['file']) for story in stories})
+        self.prune()
+
+        stats = {
+            'stories': len(stories),
+            'reused': len(stories) - len(changed),
+            'revoiced': len(unique),
+            'billed_characters': voiced.get('billed_characters', 0),
+            'bytes': writer.bytes,
+            'duration_seconds': round(writer.seconds, 3),
+            'seconds': round(time.monotonic() - start, 2)
+        }
+        logging.info(f"🧩 {episode}: reused {stats['reused']} of {stats['stories']} stories, "
+                     f"voiced {stats['revoiced']} ({stats['billed_characters']:,} characters) "
+                     f"in {stats['seconds']:.1f}s")
+        return stats
+
+    def drop_unused(self, episode, keep):
+        """Remove segments of earlier versions of the episode"""
+        folder = self.episode_dir(episode)
+        for name in os.listdir(folder):
+            if name.endswith('.mp3') and name not in keep:
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+
+    def prune(self):
+        """Forget episodes not rendered for keep_days"""
+        cutoff = time.time() - self.keep_days * 86400
+        for name in os.listdir(self.directory):
+            folder = os.path.join(self.directory, name)
+            manifest = os.path.join(folder, 'manifest.json')
+            lock = self.episode_lock(name)
+            if not lock.acquire(blocking=False):
+                continue  # being rendered right now
+            try:
+                if os.path.isdir(folder) and os.path.getmtime(manifest) < cutoff:
+                    shutil.rmtree(folder, ignore_errors=True)
+            except OSError:
+                pass
+            finally:
+                lock.release()
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def shared_segment_store():
+    global _shared_store
+    if _shared_store is None:
+        with _shared_lock:
+            if _shared_store is None:
+                _shared_store = SegmentStore()
+    return _shared_store
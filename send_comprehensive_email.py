@@ -5,7 +5,6 @@ Send the comprehensive Mando podcast that was already created
 
 import os
 import json
-import requests
 import smtplib
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
@@ -13,6 +12,10 @@ from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 
+from mail_pool import file_attachment
+from segment_store import episode_id, shared_segment_store
+from tts_engine import elevenlabs_engine, episode_tags
+
 print("📧 Sending your comprehensive Mando Minutes podcast...")
 
 # Load config
@@ -34,51 +37,26 @@ duration = word_count / 150
 
 print(f"\n📝 Found comprehensive script:")
 print(f"   Words: {word_count:,}")
-print(f"   Duration: {duration:.1f} minutes")
+print(f"   Estimated duration: {duration:.1f} minutes")
 
 # Try to generate audio again
 print("\n🎙️ Generating audio (this may take a moment for long content)...")
 
-ELEVENLABS_API_KEY = config['voice_generation']['api_key']
-VOICE_ID = config['voice_generation']['voice_id']
-
-url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
-headers = {
-    "Accept": "audio/mpeg",
-    "Content-Type": "application/json",
-    "xi-api-key": ELEVENLABS_API_KEY
-}
-
-# For very long content, we might need to adjust settings
-data = {
-    "text": script,
-    "model_id": "eleven_monolingual_v1",  # More stable for long content
-    "voice_settings": {
-        "stability": 0.5,
-        "similarity_boost": 0.75
-    }
-}
+# Long scripts are split at sentence boundaries under the model's limit,
+# voiced in parallel and joined frame by frame, so length is never an error
+engine = elevenlabs_engine(config['voice_generation'])
 
 try:
-    response = requests.post(url, json=data, headers=headers, timeout=120)  # Longer timeout
-    
-    if response.status_code == 200:
-        audio_file = f"podcasts/mando_comprehensive_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
-        with open(audio_file, 'wb') as f:
-            f.write(response.content)
-        file_size_mb = os.path.getsize(audio_file) / 1024 / 1024
-        print(f"✅ Audio generated: {file_size_mb:.1f} MB")
-        audio_success = True
-    else:
-        print(f"❌ Audio generation failed: {response.status_code}")
-        print(f"Error: {response.text[:200]}...")
-        audio_file = None
-        audio_success = False
-        
-        # Check if it's a length issue
-        if "string_too_long" in response.text or "too_long" in response.text:
-            print("\n⚠️  Script may be too long for ElevenLabs in one request")
-            print("   Attempting to send podcast with script attached instead...")
+    audio_file = f"podcasts/mando_comprehensive_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
+    # Reruns after a failure or a correction only voice the stories not done yet
+    show = "Mando Minutes Comprehensive"
+    stats = shared_segment_store().render(engine, episode_id(show), script, audio_file,
+                                          tags=episode_tags(show))
+    duration = stats['duration_seconds'] / 60  # exact, from the MP3 frames
+    file_size_mb = os.path.getsize(audio_file) / 1024 / 1024
+    print(f"✅ Audio generated: {file_size_mb:.1f} MB, {duration:.1f} minutes "
+          f"({stats['revoiced']} of {stats['stories']} stories voiced in {stats['seconds']:.0f}s)")
+    audio_success = True
             
 except Exception as e:
     print(f"❌ Audio generation error: {e}")
@@ -100,7 +78,7 @@ Your comprehensive Mando Minutes analysis is ready.
 📊 Analysis Statistics:
 • News items covered: 42
 • Word count: {word_count:,} words
-• Estimated duration: {duration:.1f} minutes
+• {'Duration' if audio_success else 'Estimated duration'}: {duration:.1f} minutes
 • Coverage: EVERY item analyzed in detail
 
 """
@@ -111,11 +89,11 @@ The MP3 file is attached below.
 
 """
 else:
-    email_body += """⚠️ Audio Status: Generation failed (content may be too long)
+    email_body += """⚠️ Audio Status: Generation failed (voice service unavailable)
 The full text script is attached instead. You can:
 1. Read the comprehensive analysis
 2. Use your own text-to-speech tool
-3. Upload to ElevenLabs in smaller chunks
+3. Run this script again later to retry the audio
 
 """
 
@@ -139,12 +117,7 @@ msg.attach(MIMEText(email_body, 'plain'))
 # Attach audio if available
 if audio_file and os.path.exists(audio_file):
     print("📎 Attaching audio file...")
-    with open(audio_file, "rb") as f:
-        part = MIMEBase('audio', 'mpeg')
-        part.set_payload(f.read())
-        encoders.encode_base64(part)
-        part.add_header('Content-Disposition', 'attachment; filename="mando_comprehensive.mp3"')
-        msg.attach(part)
+    msg.attach(file_attachment(audio_file, "mando_comprehensive.mp3"))
 
 # Always attach the script
 print("📎 Attaching text script...")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+In-Flight Request Coalescing
+Concurrent callers asking for the same key share one piece of work:
+the first runs it, the rest wait for its result. Given a lock directory,
+runs in other processes (the scheduler and a manual run) take turns too.
+"""
+
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LOCK_DIR = "cache/inflight"
+
+
+@contextmanager
+def file_lock(path, timeout=None, poll=0.05):
+    """Exclusive lock on path shared with other processes; raises
+    TimeoutError if it's held for longer than timeout"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    give_up = None if timeout is None else time.monotonic() + timeout
+    with open(path, 'a') as handle:
+        while True:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if give_up is not None and time.monotonic() >= give_up:
+                    raise TimeoutError(f"Timed out waiting for {path}")
+                time.sleep(poll)
+        try:
+            yield
+        finally:
+            # Removed so lock files don't pile up; at worst a racing process
+            # locks the old file and repeats the work
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=None):
+        """lock_dir: where runs hold a lock file per key so other processes'
+        runs of the same key wait their turn (func should then look for the
+        other run's result first)"""
+        self.lock_dir = lock_dir
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, func, timeout=None):
+        """Run func() once per key at a time; returns (result, shared)
+
+        shared is True when the result came from another caller's run.
+        Followers re-raise the leader's exception, and raise TimeoutError
+        if it takes longer than timeout; so does a leader kept waiting that
+        long by another process.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.followers += 1
+                self.followers += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            if self.lock_dir is None:
+                call.result = func()
+            else:
+                with file_lock(self.lock_path(key), timeout):
+                    call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def lock_path(self, key):
+        digest = hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.lock_dir, digest + '.lock')
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
+
+    def stats(self):
+        """How much work was shared since start-up"""
+        with self.lock:
+            return {'leaders': self.leaders, 'followers': self.followers}
+
+
+_shared_flight = None
+_shared_lock = threading.Lock()
+
+
+def shared_flight():
+    """Process-wide instance so every pipeline's fetches coalesce, locking
+    per key in LOCK_DIR against other processes"""
+    global _shared_flight
+    if _shared_flight is None:
+        with _shared_lock:
+            if _shared_flight is None:
+                _shared_flight = SingleFlight(LOCK_DIR)
+    return _shared_flight
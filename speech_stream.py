@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Streaming Narration
+Cuts an LLM's token stream into sentences and voices them while the model
+is still writing, appending each finished audio segment to the output in
+order so the first audio is ready within seconds
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from audio_cache import voice_identity
+from http_pool import get_session
+from mp3_tools import strip_id3
+from resilience import ProviderError, raise_for_provider, shared_quota_ledger, shared_resilience
+from script_cues import CueFilter
+
+SENTENCE_END = re.compile(r'[.!?…]["”’)\]]*(?=\s+["“‘(\[]?[A-Z0-9])|\n')
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'st', 'vs', 'jr', 'sr', 'inc', 'co', 'corp',
+                 'u.s', 'u.k', 'e.g', 'i.e', 'etc', 'jan', 'feb', 'aug', 'sept', 'oct', 'nov', 'dec'}
+
+
+def elevenlabs_payload(voice_config, text):
+    """Request body for ElevenLabs text-to-speech from the voice_generation config"""
+    settings = voice_config.get('voice_settings', {})
+    return {
+        "text": text,
+        "model_id": voice_config.get('model', 'eleven_multilingual_v2'),
+        "voice_settings": {
+            "stability": settings.get('stability', 0.5),
+            "similarity_boost": settings.get('similarity_boost', 0.8),
+            "style": settings.get('style', 0.2),
+            "use_speaker_boost": settings.get('use_speaker_boost', True)
+        }
+    }
+
+
+def elevenlabs_request(voice_config, text, previous_text=None, next_text=None):
+    """(url, headers, body) for a text-to-speech request, charged against the
+    month's character ledger up front
+
+    Raises ProviderError (kind 'quota') without calling the API when the
+    ledger can't cover the text.
+    """
+    ledger = shared_quota_ledger()
+    if not ledger.can_spend('elevenlabs', 'characters', len(text)):
+        raise ProviderError('elevenlabs', 'quota', f"{len(text)} characters requested, "
+                            f"{ledger.remaining('elevenlabs', 'characters')} left this month")
+    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_config['voice_id']}"
+    headers = {
+        "Accept": "audio/mpeg",
+        "Content-Type": "application/json",
+        "xi-api-key": voice_config['api_key']
+    }
+    data = elevenlabs_payload(voice_config, text)
+    if previous_text:
+        data['previous_text'] = previous_text
+    if next_text:
+        data['next_text'] = next_text
+    return url, headers, data
+
+
+def elevenlabs_tts(voice_config, text, previous_text=None, timeout=60, wait_open=0.0, next_text=None):
+    """MP3 bytes for text, retried with backoff and counted against the plan"""
+    url, headers, data = elevenlabs_request(voice_config, text, previous_text, next_text)
+
+    def send():
+        response = get_session().post(url, json=data, headers=headers, timeout=timeout)
+        return raise_for_provider('elevenlabs', response).content
+
+    audio = shared_resilience('elevenlabs').call(send, wait_open=wait_open)
+    shared_quota_ledger().record('elevenlabs', 'characters', len(text))
+    return audio
+
+
+def elevenlabs_tts_to(voice_config, text, out, previous_text=None, timeout=60, wait_open=0.0,
+                      next_text=None, chunk_bytes=64 * 1024):
+    """Write the MP3 for text to the binary file out as it downloads from the
+    streaming endpoint, so no more than chunk_bytes is held at once; a
+    retried attempt starts the file over. Returns the bytes written."""
+    url, headers, data = elevenlabs_request(voice_config, text, previous_text, next_text)
+
+    def send():
+        out.seek(0)
+        out.truncate()
+        with get_session().post(f"{url}/stream", json=data, headers=headers,
+                                timeout=timeout, stream=True) as response:
+            raise_for_provider('elevenlabs', response)
+            for chunk in response.iter_content(chunk_size=chunk_bytes):
+                out.write(chunk)
+        return out.tell()
+
+    written = shared_resilience('elevenlabs').call(send, wait_open=wait_open)
+    shared_quota_ledger().record('elevenlabs', 'characters', len(text))
+    return written
+
+
+def elevenlabs_synthesizer(voice_config, timeout=60, cache=None):
+    """synthesize(text, previous_text) -> MP3 bytes over the shared session
+
+    previous_text lets ElevenLabs keep intonation continuous across segments.
+    Segments already in the AudioCache for this voice aren't voiced again.
+    """
+    voice = voice_identity(voice_config, elevenlabs_payload(voice_config, ''))
+
+    def synthesize(text, previous_text=None):
+        key = cache.key(text, voice) if cache is not None else None
+        audio = cache.get(key) if key else None
+        if audio is None:
+            audio = elevenlabs_tts(voice_config, text, previous_text, timeout)
+            if key:
+                cache.put(key, audio)
+        return audio
+
+    return synthesize
+
+
+class SentenceChunker:
+    """Turns text deltas into speakable segments cut at sentence or line ends
+
+    The first segment is kept short so speech can start early; later ones
+    gather a few sentences each so TTS requests aren't too small to sound natural.
+    """
+
+    def __init__(self, first_min_chars=40, min_chars=200, max_chars=1000):
+        self.first_min_chars = first_min_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+        self.emitted = 0
+
+    def is_boundary(self, match):
+        if match.group() == '\n' or not match.group().startswith('.'):
+            return True
+        words = self.buffer[:match.start()].split()
+        return not words or words[-1].lower().strip('("“') not in ABBREVIATIONS
+
+    def cut(self):
+        target = self.first_min_chars if self.emitted == 0 else self.min_chars
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.end() >= target and self.is_boundary(match) and self.buffer[:match.end()].strip():
+                return match.end()
+        if len(self.buffer) > self.max_chars:
+            space = self.buffer.rfind(' ', 0, self.max_chars)
+            return space if space > 0 else self.max_chars
+        return None
+
+    def feed(self, delta):
+        """Add a delta; returns the segments it completed"""
+        self.buffer += delta
+        segments = []
+        while True:
+            end = self.cut()
+            if end is None:
+                return segments
+            segment, self.buffer = self.buffer[:end].strip(), self.buffer[end:]
+            if segment:
+                segments.append(segment)
+                self.emitted += 1
+
+    def flush(self):
+        segment, self.buffer = self.buffer.strip(), ""
+        if segment:
+            self.emitted += 1
+            return [segment]
+        return []
+
+
+def narrate(deltas, synthesize, output_path, max_workers=3, on_segment=None, chunker=None, sounds=None):
+    """Voice a stream of text deltas into one MP3 file as they arrive
+
+    Segments are synthesized concurrently and appended in script order as
+    soon as each is ready; on_segment(index, audio) fires for each append.
+    Stage directions are held out of TTS and, given a SoundLibrary, their
+    clips are appended at the cue points. Returns the full script and a
+    timing report.
+    """
+    chunker = chunker or SentenceChunker()
+    cue_filter = CueFilter()
+    start = time.monotonic()
+    script, texts, futures = [], [], []
+    report = {'segments': 0, 'cues': 0, 'first_text_seconds': None, 'first_audio_seconds': None,
+              'script_seconds': None, 'total_seconds': None, 'bytes': 0}
+
+    # Pauses are silence in the voice's own format, so they wait for the first voiced segment
+    first_voiced = Future()
+
+    def voiced(future):
+        if not first_voiced.done():
+            first_voiced.set_result(b'' if future.exception() else future.result())
+
+    def clip_later(cue):
+        ready = Future()
+
+        def fill(first):
+            try:
+                ready.set_result(sounds.clip(cue, like=first.result()))
+            except Exception as e:
+                ready.set_exception(e)
+        first_voiced.add_done_callback(fill)
+        return ready
+
+    with open(output_path, 'wb') as out, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(segment):
+            previous = texts[-1] if texts else None
+            texts.append(segment)
+            futures.append(executor.submit(synthesize, segment, previous))
+            if len(texts) == 1:
+                futures[-1].add_done_callback(voiced)
+
+        def submit_pieces(pieces):
+            for piece in pieces:
+                if not isinstance(piece, dict):
+                    for segment in chunker.feed(piece):
+                        submit(segment)
+                    continue
+                # A cue ends the sentence in progress so the clip lands in place
+                report['cues'] += 1
+                for segment in chunker.flush():
+                    submit(segment)
+                if sounds is None:
+                    continue
+                if piece['kind'] == 'pause':
+                    futures.append(clip_later(piece))
+                    continue
+                clip = sounds.clip(piece)
+                if clip:
+                    ready = Future()
+                    ready.set_result(clip)
+                    futures.append(ready)
+
+        def append_ready(block=False):
+            while report['segments'] < len(futures):
+                future = futures[report['segments']]
+                if not block and not future.done():
+                    return
+                audio = future.result()
+                audio = audio if report['segments'] == 0 else strip_id3(audio)
+                out.write(audio)
+                out.flush()
+                if report['first_audio_seconds'] is None:
+                    report['first_audio_seconds'] = round(time.monotonic() - start, 2)
+                if on_segment:
+                    on_segment(report['segments'], audio)
+                report['segments'] += 1
+                report['bytes'] += len(audio)
+
+        for delta in deltas:
+            if report['first_text_seconds'] is None:
+                report['first_text_seconds'] = round(time.monotonic() - start, 2)
+            script.append(delta)
+            submit_pieces(cue_filter.feed(delta))
+            append_ready()
+        report['script_seconds'] = round(time.monotonic() - start, 2)
+        submit_pieces(cue_filter.flush())
+        for segment in chunker.flush():
+            submit(segment)
+        if not texts:
+            first_voiced.set_result(b'')  # nothing voiced: default-format silence
+        append_ready(block=True)
+
+    report['total_seconds'] = round(time.monotonic() - start, 2)
+    logging.info(f"🔊 Streamed {report['segments']} segments: first audio after "
+                 f"{report['first_audio_seconds']}s, script done at {report['script_seconds']}s, "
+                 f"audio done at {report['total_seconds']}s")
+    return ''.join(script).strip(), report
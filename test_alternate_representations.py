@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test discovery and learning of lighter article representations
+"""
+
+import json
+import os
+import tempfile
+
+import requests
+
+from alternate_representations import (RepresentationChooser, head_links, jsonld_article,
+                                       parse_feed)
+from disk_cache import DiskCache
+from domain_outcomes import DomainOutcomes
+from paywall_detector import read_article_page
+
+STORY = ' '.join(f"Sentence {i} about bitcoin markets, flows and prices." for i in range(40))
+ARTICLE_URL = 'https://news.example.com/2024/06/01/bitcoin-story'
+
+
+def page(head_extra='', body_extra=''):
+    return (f'<html><head><title>Bitcoin story</title>{head_extra}</head><body>'
+            f'<article><p>{STORY}</p></article>{body_extra}</body></html>')
+
+
+JSON_LD = ('<script type="application/ld+json">'
+           + json.dumps({'@context': 'https://schema.org', '@graph': [
+               {'@type': 'WebPage'},
+               {'@type': 'NewsArticle', 'headline': 'Bitcoin story', 'articleBody': STORY}]})
+           + '</script>')
+
+FEED = f'''<?xml version="1.0"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>
+<item><title>Bitcoin story</title><link>{ARTICLE_URL}?utm_source=rss</link>
+<content:encoded><![CDATA[<p>{STORY}</p>]]></content:encoded></item>
+</channel></rss>'''
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+        self.encoding = 'utf-8'
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+    def iter_content(self, chunk_size=8192):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class FakeGet:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def __call__(self, url, timeout=10, **kwargs):
+        self.calls.append(url)
+        if isinstance(self.pages[url], int):
+            return FakeResponse('', status_code=self.pages[url])
+        return FakeResponse(self.pages[url])
+
+
+def chooser_for(directory, pages):
+    outcomes = DomainOutcomes(os.path.join(directory, 'outcomes.json'))
+    get = FakeGet(pages)
+    return RepresentationChooser(get, outcomes, DiskCache(os.path.join(directory, 'feeds'))), get
+
+
+def test_head_links_and_jsonld():
+    markup = page('<link rel="amphtml" href="/amp/story"><link rel="canonical" href="https://news.example.com/story">'
+                  '<link rel="alternate" type="application/rss+xml" href="https://news.example.com/feed">')
+    links = head_links(markup, 'https://news.example.com/story?x=1')
+    assert links['amp'] == 'https://news.example.com/amp/story'
+    assert links['canonical'] == 'https://news.example.com/story'
+    assert links['feeds'] == ['https://news.example.com/feed']
+
+    found = jsonld_article(page(JSON_LD))
+    assert found['title'] == 'Bitcoin story' and found['content'] == STORY
+    assert jsonld_article(page()) is None
+
+
+def test_feed_parsing_keys_by_canonical_url():
+    entries = parse_feed(FEED)
+    assert list(entries) == ['https://news.example.com/2024/06/01/bitcoin-story']
+    assert entries['https://news.example.com/2024/06/01/bitcoin-story']['content'] == STORY
+
+
+def test_learns_feed_then_skips_the_page():
+    with tempfile.TemporaryDirectory() as directory:
+        feed_url = 'https://news.example.com/feed'
+        markup = page(f'<link rel="alternate" type="application/rss+xml" href="{feed_url}">')
+        chooser, get = chooser_for(directory, {feed_url: FEED})
+
+        first = chooser.choose(ARTICLE_URL, 'news.example.com', markup, ARTICLE_URL, complete=True)
+        assert first['representation'] == 'html'
+        assert chooser.preference('news.example.com') == 'feed'
+
+        second = chooser.from_feed(ARTICLE_URL, 'news.example.com', timeout=5)
+        assert second['representation'] == 'feed' and second['content'] == STORY
+        assert get.calls == [feed_url]  # feed fetched once, then served from cache
+
+
+def test_failing_feed_is_forgotten():
+    with tempfile.TemporaryDirectory() as directory:
+        feed_url = 'https://news.example.com/feed'
+        markup = page(f'<link rel="alternate" type="application/rss+xml" href="{feed_url}">')
+        chooser, get = chooser_for(directory, {feed_url: FEED})
+        chooser.choose(ARTICLE_URL, 'news.example.com', markup, ARTICLE_URL, complete=True)
+        assert chooser.preference('news.example.com') == 'feed'
+
+        # The feed starts failing: no article from it, the page is read instead
+        chooser.feed_cache = DiskCache(os.path.join(directory, 'feeds-later'))
+        get.pages[feed_url] = 404
+        assert chooser.from_feed(ARTICLE_URL, 'news.example.com', timeout=5) is None
+        assert chooser.preference('news.example.com') is None
+        assert chooser.choose(ARTICLE_URL, 'news.example.com', markup, ARTICLE_URL,
+                              complete=True)['representation'] == 'html'
+
+
+def test_learns_jsonld_and_stops_after_head():
+    with tempfile.TemporaryDirectory() as directory:
+        chooser, _ = chooser_for(directory, {})
+        heavy = page(JSON_LD, body_extra='<div>' + 'x' * 300_000 + '</div>')
+        chooser.choose(ARTICLE_URL, 'news.example.com', heavy, ARTICLE_URL, complete=True)
+        assert chooser.preference('news.example.com') == 'jsonld'
+
+        markup, verdict = read_article_page(FakeResponse(heavy),
+                                            enough=chooser.head_is_enough('news.example.com'))
+        assert verdict == 'partial'
+        assert len(markup) < 40_000
+        found = chooser.choose(ARTICLE_URL, 'news.example.com', markup, ARTICLE_URL, complete=False)
+        assert found['representation'] == 'jsonld' and found['content'] == STORY
+
+
+def test_learns_amp_for_heavy_pages_and_forgets_it_when_gone():
+    with tempfile.TemporaryDirectory() as directory:
+        amp_url = 'https://news.example.com/amp/bitcoin-story'
+        chooser, _ = chooser_for(directory, {amp_url: page()})
+        heavy = page(f'<link rel="amphtml" href="{amp_url}">',
+                     body_extra='<script>' + 'x' * 500_000 + '</script>')
+        chooser.choose(ARTICLE_URL, 'news.example.com', heavy, ARTICLE_URL, complete=True)
+        assert chooser.preference('news.example.com') == 'amp'
+
+        found = chooser.choose(ARTICLE_URL, 'news.example.com', heavy[:300], ARTICLE_URL, complete=False)
+        assert found['representation'] == 'amp'
+
+        # No AMP link any more: caller must read the full page, preference resets
+        assert chooser.choose(ARTICLE_URL, 'news.example.com', page(), ARTICLE_URL, complete=False) is None
+        assert chooser.preference('news.example.com') is None
+
+
+def test_light_pages_stay_html():
+    with tempfile.TemporaryDirectory() as directory:
+        chooser, get = chooser_for(directory, {})
+        result = chooser.choose(ARTICLE_URL, 'plain.com', page('<link rel="amphtml" href="/amp">'),
+                                ARTICLE_URL, complete=True)
+        assert result['representation'] == 'html'
+        assert chooser.preference('plain.com') == 'html'
+        assert get.calls == []  # small page: no AMP probe
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
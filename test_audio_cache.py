@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the segment-level TTS audio cache
+"""
+
+import tempfile
+
+from audio_cache import AudioCache, normalize_text, voice_identity
+from speech_stream import elevenlabs_payload
+from tts_engine import TTSEngine, split_paragraphs
+
+VOICE = {'voice_id': 'adam', 'model_id': 'eleven_multilingual_v2',
+         'voice_settings': {'stability': 0.5, 'similarity_boost': 0.8}}
+
+INTRO = "Good morning! I'm Mark, and this is your Mando Minutes market briefing."
+OUTRO = "And that's your Mando Minutes market briefing. Stay sharp, stay profitable."
+
+
+def script(*stories):
+    return '\n\n'.join([INTRO, *stories, OUTRO])
+
+
+class CountingVoice:
+    def __init__(self):
+        self.voiced = []
+
+    def __call__(self, text, previous_text=None, next_text=None):
+        self.voiced.append(text)
+        return f"<{text}>".encode()
+
+
+def test_keys_ignore_spacing_and_typography_but_not_voice():
+    assert normalize_text("Stay  sharp,\n stay “profitable” — today’s close…") == \
+        "Stay sharp, stay \"profitable\" - today's close..."
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AudioCache(directory)
+        key = cache.key("Stay sharp.", VOICE)
+        assert key == cache.key("  Stay   sharp. ", VOICE)
+        assert key != cache.key("Stay sharp!", VOICE)
+        calmer = dict(VOICE, voice_settings={'stability': 0.9, 'similarity_boost': 0.8})
+        assert key != cache.key("Stay sharp.", calmer)
+        assert key != cache.key("Stay sharp.", dict(VOICE, voice_id='bella'))
+
+    payload = elevenlabs_payload({'voice_id': 'adam', 'model': 'eleven_turbo_v2_5'}, '')
+    assert voice_identity({'voice_id': 'adam'}, payload)['model_id'] == 'eleven_turbo_v2_5'
+
+
+def test_only_new_paragraphs_are_voiced_on_rerun():
+    with tempfile.TemporaryDirectory() as directory:
+        voice = CountingVoice()
+        engine = TTSEngine(voice, cache=AudioCache(directory), voice=VOICE)
+
+        first = engine.render(script("Bitcoin rose 3% overnight.", "ETF inflows hit $602mn."))
+        assert len(voice.voiced) == 4 and engine.last_stats['cached'] == 0
+
+        voice.voiced.clear()
+        again = engine.render(script("Bitcoin rose 3% overnight.", "ETF inflows hit $602mn."))
+        assert again == first and voice.voiced == []
+        assert engine.last_stats['billed_characters'] == 0
+
+        # A new day's issue pays only for its new stories
+        engine.render(script("Solana upgrade goes live.", "ETF inflows hit $602mn."))
+        assert voice.voiced == ["Solana upgrade goes live."]
+        assert engine.last_stats['cached'] == 3
+
+
+def test_cache_is_size_bounded():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AudioCache(directory, max_mb=1)
+        for n in range(6):
+            cache.put(cache.key(f"story {n}", VOICE), bytes(300 * 1024))
+        stats = cache.stats()
+        assert stats['bytes'] <= 1024 * 1024 and stats['entries'] < 6
+        assert cache.get(cache.key("story 5", VOICE)) is not None
+
+
+def test_long_paragraphs_still_respect_the_limit():
+    long_story = ' '.join(f"Sentence {i} of a very long story." for i in range(200))
+    segments = split_paragraphs(script(long_story), max_chars=1000)
+    assert segments[0] == INTRO and segments[-1] == OUTRO
+    assert all(len(segment) <= 1000 for segment in segments)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
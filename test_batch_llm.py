@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Test batch submission, polling and cache filling against a local stand-in
+of the Files and Batches endpoints
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch_backfill import weekly_recap_jobs
+from batch_llm import BatchRunner
+from dual_newsletter_automation import DualNewsletterAutomation
+from llm_cache import LLMCache
+from llm_client import LLMClient
+from resilience import ProviderError, QuotaLedger
+from token_budget import UsageLog
+
+
+class FakeBatchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, processing_seconds=0.3):
+        super().__init__(('127.0.0.1', 0), FakeBatchHandler)
+        self.processing_seconds = processing_seconds
+        self.files = {}
+        self.batches = {}
+        self.polls = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def add_file(self, content, purpose):
+        with self.lock:
+            file_id = f"file-{len(self.files) + 1}"
+            self.files[file_id] = content
+        return {'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': 0,
+                'filename': f"{file_id}.jsonl", 'purpose': purpose, 'status': 'processed'}
+
+    def process(self, batch_id):
+        """Answer every request after a delay; a prompt of 'fail' goes to the error file"""
+        time.sleep(self.processing_seconds)
+        batch = self.batches[batch_id]
+        output, errors = [], []
+        for line in self.files[batch['input_file_id']].decode().splitlines():
+            request = json.loads(line)
+            prompt = request['body']['messages'][-1]['content']
+            if prompt == 'fail':
+                errors.append({'id': 'req', 'custom_id': request['custom_id'], 'response': {
+                    'status_code': 400, 'body': {'error': {'message': 'bad request'}}}, 'error': None})
+                continue
+            output.append({'id': 'req', 'custom_id': request['custom_id'], 'error': None, 'response': {
+                'status_code': 200, 'request_id': 'req',
+                'body': {'id': 'chatcmpl-batch', 'object': 'chat.completion', 'model': request['body']['model'],
+                         'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+                             'role': 'assistant', 'content': f" batch script for {prompt} "}}],
+                         'usage': {'prompt_tokens': 100, 'completion_tokens': 50, 'total_tokens': 150}}}})
+        batch['output_file_id'] = self.add_file(
+            '\n'.join(json.dumps(entry) for entry in output).encode(), 'batch_output')['id'] if output else None
+        batch['error_file_id'] = self.add_file(
+            '\n'.join(json.dumps(entry) for entry in errors).encode(), 'batch_output')['id'] if errors else None
+        batch['request_counts'] = {'total': len(output) + len(errors), 'completed': len(output),
+                                   'failed': len(errors)}
+        batch['status'] = 'completed'
+
+
+class FakeBatchHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        raw = self.rfile.read(int(self.headers['Content-Length']))
+        if self.path == '/v1/files':
+            form = BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw)
+            fields = {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                      for part in form.get_payload()}
+            return self.send_json(server.add_file(fields['file'], fields['purpose'].decode()))
+        body = json.loads(raw)
+        batch_id = f"batch_{len(server.batches) + 1}"
+        server.batches[batch_id] = {
+            'id': batch_id, 'object': 'batch', 'endpoint': body['endpoint'], 'errors': None,
+            'input_file_id': body['input_file_id'], 'completion_window': body['completion_window'],
+            'status': 'in_progress', 'output_file_id': None, 'error_file_id': None, 'created_at': 0,
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0}, 'metadata': body.get('metadata')
+        }
+        threading.Thread(target=server.process, args=(batch_id,), daemon=True).start()
+        self.send_json(server.batches[batch_id])
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith('/v1/batches/'):
+            server.polls += 1
+            return self.send_json(server.batches[self.path.rsplit('/', 1)[1]])
+        content = server.files[self.path.split('/')[3]]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def start_batch_server(processing_seconds=0.3):
+    server = FakeBatchServer(processing_seconds)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def script_job(prompt):
+    return {'model': 'gpt-test', 'messages': [{'role': 'user', 'content': prompt}],
+            'max_tokens': 500, 'temperature': 0.7, 'label': 'mando_minutes'}
+
+
+def test_batch_fills_the_cache_for_live_calls():
+    server = start_batch_server()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMCache(os.path.join(directory, 'llm'))
+        log = UsageLog(os.path.join(directory, 'usage.jsonl'))
+        ledger = QuotaLedger(None)
+        runner = BatchRunner('test-key', base_url=server.base_url, cache=cache, usage_log=log, ledger=ledger,
+                             poll_seconds=0.1, state_dir=os.path.join(directory, 'batches'))
+        jobs = [script_job(f"issue {day}") for day in range(1, 31)] + [script_job("issue 1")]
+        try:
+            answers = runner.run(jobs)
+        finally:
+            runner.close()
+
+        assert answers[:30] == [f"batch script for issue {day}" for day in range(1, 31)]
+        assert answers[30] == answers[0]  # duplicates are sent once
+        assert len(server.batches) == 1 and server.polls >= 2
+        with open(os.path.join(directory, 'batches', 'batch_1.json')) as f:
+            assert len(json.load(f)['requests']) == 30
+
+        # The live client now answers the same request from the cache
+        client = LLMClient('test-key', base_url='http://127.0.0.1:9/v1', max_retries=0, cache=cache)
+        try:
+            job = script_job("issue 7")
+            del job['label']
+            assert client.complete(**job) == "batch script for issue 7"
+            assert client.stats['cache_hits'] == 1 and client.stats['calls'] == 0
+        finally:
+            client.close()
+
+        summary = log.summary()['batch:mando_minutes']
+        assert summary['calls'] == 30 and summary['prompt_tokens'] == 3000
+        # Batch tokens count against the same monthly limit as live calls
+        assert ledger.spent('openai', 'tokens') == 30 * 150
+
+
+def test_cached_jobs_are_skipped_and_failures_reported():
+    server = start_batch_server(processing_seconds=0.05)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMCache(os.path.join(directory, 'llm'))
+        log = UsageLog(os.path.join(directory, 'usage.jsonl'))
+        runner = BatchRunner('test-key', base_url=server.base_url, cache=cache, usage_log=log,
+                             ledger=None, poll_seconds=0.05, state_dir=os.path.join(directory, 'batches'))
+        try:
+            runner.run([script_job("monday")])
+            answers = runner.run([script_job("monday"), script_job("fail"), script_job("tuesday")])
+            assert runner.submit([script_job("monday"), script_job("tuesday")]) is None
+        finally:
+            runner.close()
+
+    assert answers[0] == "batch script for monday" and answers[2] == "batch script for tuesday"
+    assert isinstance(answers[1], Exception) and 'bad request' in str(answers[1])
+    second = server.files[server.batches['batch_2']['input_file_id']].decode().splitlines()
+    assert len(second) == 2  # monday came from the cache
+
+
+def test_batch_over_the_monthly_limit_is_not_sent():
+    server = start_batch_server()
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = QuotaLedger(None, limits={('openai', 'tokens'): 1000})
+        runner = BatchRunner('test-key', base_url=server.base_url, usage_log=None, ledger=ledger,
+                             cache=LLMCache(os.path.join(directory, 'llm')),
+                             state_dir=os.path.join(directory, 'batches'))
+        try:
+            runner.submit([script_job("monday"), script_job("tuesday")])
+            assert False, "should have raised"
+        except ProviderError as e:
+            assert e.kind == 'quota'
+        finally:
+            runner.close()
+    assert server.batches == {} and server.files == {}
+
+
+def test_usage_logging_can_be_turned_off():
+    with tempfile.TemporaryDirectory() as directory:
+        runner = BatchRunner('test-key', base_url='http://127.0.0.1:9/v1', usage_log=None, ledger=None,
+                             cache=LLMCache(os.path.join(directory, 'llm')))
+        try:
+            assert runner.usage_log is None
+        finally:
+            runner.close()
+
+
+def test_weekly_recaps_group_scripts_by_iso_week():
+    scripts = [(datetime(2025, 7, day), f"script {day}") for day in (7, 8, 11, 14, 15)]
+    weeks, jobs = weekly_recap_jobs(scripts, {'name': 'mando_minutes'}, 'gpt-test')
+    assert weeks == ['2025-W28', '2025-W29']
+    prompt = jobs[0]['messages'][-1]['content']
+    assert 'script 7' in prompt and 'script 11' in prompt and 'script 14' not in prompt
+    assert jobs[1]['label'] == 'mando_minutes_recap'
+
+
+class NoLiveCalls:
+    def complete(self, *args, **kwargs):
+        raise AssertionError("building a batch job made a live LLM call")
+
+    complete_many = complete
+
+
+def test_backfill_jobs_condense_without_live_calls():
+    automation = DualNewsletterAutomation.__new__(DualNewsletterAutomation)
+    automation.config = {'ai_processing': {'model': 'gpt-test', 'content_budget_tokens': 300}}
+    automation.llm = NoLiveCalls()
+    corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'newsletter_corpus')
+    with open(os.path.join(corpus, 'mando_minutes_long.txt'), 'r', encoding='utf-8') as f:
+        body = f.read()
+
+    job = automation.ai_script_job("Mando Minutes", "hello@mandominutes.com", body,
+                                   {'name': 'mando_minutes'}, llm_condense=False)
+    prompt = job['messages'][-1]['content']
+    assert job['model'] == 'gpt-test' and len(prompt) < len(body)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test section splitting, extractive condensing and the map-reduce pipeline
+"""
+
+import json
+import os
+
+from chunked_summarizer import ChunkedSummarizer, extractive_summary, pack_chunks, split_sections
+from token_budget import compress_text, count_tokens
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'newsletter_corpus')
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, 'expected.json'), 'r') as f:
+        expected = json.load(f)
+    for filename, expectations in expected.items():
+        with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+            yield f.read(), expectations
+
+
+class FakeLLM:
+    """Answers each chunk with its first sentence; 'fail' chunks raise"""
+
+    def __init__(self, verbose=False):
+        self.batches = []
+        self.verbose = verbose
+
+    def complete_many(self, jobs):
+        self.batches.append(jobs)
+        results = []
+        for job in jobs:
+            part = job['messages'][-1]['content'].split(':\n\n', 1)[1]
+            if 'fail' in part:
+                results.append(RuntimeError("rate limited"))
+            elif self.verbose:
+                results.append(part)
+            else:
+                results.append(part.split('. ')[0] + '.')
+        return results
+
+
+def test_sections_follow_headings_and_separators():
+    for body, expectations in load_corpus():
+        sections = split_sections(compress_text(body))
+        assert len(sections) == expectations['sections']
+
+
+def test_chunks_respect_size_and_keep_order():
+    sections = [f"SECTION {i}\n\n" + "Words here. " * 60 for i in range(10)]
+    chunks = pack_chunks(sections, chunk_tokens=400)
+    assert all(count_tokens(chunk) <= 400 for chunk in chunks)
+    assert '\n\n'.join(chunks) == '\n\n'.join(sections)
+
+    giant = pack_chunks(["One long sentence. " * 500], chunk_tokens=300)
+    assert len(giant) > 1 and all(count_tokens(chunk) <= 300 for chunk in giant)
+
+
+def test_extractive_summary_covers_every_section_under_budget():
+    for body, expectations in load_corpus():
+        summary = extractive_summary(compress_text(body), budget_tokens=750)
+        assert count_tokens(summary) <= 750
+        for phrase in expectations['must_include']:
+            assert phrase in summary, phrase
+        for phrase in expectations['must_exclude']:
+            assert phrase not in summary, phrase
+
+
+def test_short_bodies_skip_the_llm():
+    llm = FakeLLM()
+    summarizer = ChunkedSummarizer(llm, 'gpt-test')
+    assert summarizer.condense("A short note.\n\nUnsubscribe") == "A short note."
+    assert llm.batches == [] and summarizer.last_stats['method'] == 'none'
+
+
+def test_map_step_runs_all_chunks_in_one_parallel_batch():
+    body, expectations = next(load_corpus())
+    llm = FakeLLM()
+    summarizer = ChunkedSummarizer(llm, 'gpt-test', chunk_tokens=400)
+    condensed = summarizer.condense(body, budget_tokens=750, subject='What I am hearing')
+
+    assert len(llm.batches) == 1
+    jobs = llm.batches[0]
+    assert len(jobs) == summarizer.last_stats['chunks'] > 1
+    assert all(job['max_tokens'] <= 750 // len(jobs) + 1 for job in jobs)
+    assert 'Newsletter: What I am hearing' in jobs[0]['messages'][-1]['content']
+    assert count_tokens(condensed) <= 750
+    assert summarizer.last_stats['method'] == 'map_reduce'
+
+
+def test_failed_chunk_falls_back_to_extract():
+    body = '\n\n'.join(f"STORY {i}\n\n" + f"Story {i} fail detail. " * 60 if i == 2
+                       else f"STORY {i}\n\n" + f"Story {i} detail. " * 60 for i in range(4))
+    summarizer = ChunkedSummarizer(FakeLLM(), 'gpt-test', chunk_tokens=400)
+    condensed = summarizer.condense(body, budget_tokens=600)
+    assert summarizer.last_stats['fallbacks'] == 1
+    assert 'Story 2 fail detail.' in condensed and 'Story 3 detail.' in condensed
+
+
+def test_reduce_rounds_until_within_budget():
+    # A model that ignores the word limit forces further reduce rounds
+    body = '\n\n'.join(f"STORY {i}\n\n" + f"Story {i} detail. " * 100 for i in range(6))
+    llm = FakeLLM(verbose=True)
+    summarizer = ChunkedSummarizer(llm, 'gpt-test', chunk_tokens=500, max_rounds=2)
+    condensed = summarizer.condense(body, budget_tokens=300)
+    assert len(llm.batches) == 2
+    assert count_tokens(condensed) <= 300
+    assert 'Story 5 detail.' in condensed
+
+
+def test_without_llm_condense_is_extractive():
+    body, expectations = next(load_corpus())
+    summarizer = ChunkedSummarizer()
+    condensed = summarizer.condense(body, budget_tokens=500)
+    assert summarizer.last_stats['method'] == 'extractive'
+    assert count_tokens(condensed) <= 500
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test the single-pass content extractor against the saved-HTML corpus
+"""
+
+import json
+import os
+
+from content_extractor import ContentExtractor, extract_article
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_corpus')
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, 'expected.json'), 'r') as f:
+        expected = json.load(f)
+    for filename, expectations in expected.items():
+        with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+            yield filename, f.read(), expectations
+
+
+def test_corpus_quality():
+    """Every key sentence is kept and no boilerplate leaks through"""
+    for filename, html, expectations in load_corpus():
+        article = extract_article(html)
+        assert article['title'] == expectations['title'], filename
+        for phrase in expectations['must_include']:
+            assert phrase in article['content'], f"{filename}: missing {phrase!r}"
+        for phrase in expectations['must_exclude']:
+            assert phrase not in article['content'], f"{filename}: leaked {phrase!r}"
+
+
+def test_deep_nesting():
+    """Deeply nested wrappers neither blow the stack nor hide the text"""
+    depth = 2000
+    html = ('<html><body>' + '<div class="wrap">' * depth +
+            '<p>A long enough paragraph, with commas, to be scored as prose.</p>' * 5 +
+            '</div>' * depth + '</body></html>')
+    article = ContentExtractor().extract(html)
+    assert article['content'].count('scored as prose') == 5
+
+
+def test_link_farm_is_not_content():
+    """A list of headlines loses to a shorter block of real prose"""
+    links = ''.join(f'<li><a href="/{i}">Headline number {i} about markets today</a></li>'
+                    for i in range(30))
+    html = f"""<html><body>
+    <div class="list"><ul>{links}</ul></div>
+    <div class="story"><p>Bitcoin slipped on Thursday, even as ETF inflows rose, traders said.</p>
+    <p>Analysts pointed to higher yields, a stronger dollar, and profit-taking after the rally.</p></div>
+    </body></html>"""
+    article = extract_article(html)
+    assert article['content'].startswith('Bitcoin slipped on Thursday')
+    assert 'Headline number' not in article['content']
+
+
+if __name__ == "__main__":
+    for test in (test_corpus_quality, test_deep_nesting, test_link_farm_is_not_content):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test deadline-bounded fetching with simulated slow and failing sites
+"""
+
+import threading
+import time
+
+import requests
+
+from deadline_fetcher import DeadlineFetcher
+from fetch_scheduler import FetchScheduler
+
+
+def make_fetch(delays, hedge_delays=None):
+    """Fake fetch_article_content: per-URL delay, optional faster second attempt"""
+    attempts = {}
+    lock = threading.Lock()
+
+    def fetch(url, timeout=10, coalesce=True):
+        with lock:
+            attempts[url] = attempts.get(url, 0) + 1
+            attempt = attempts[url]
+        delay = delays[url]
+        if attempt > 1 and hedge_delays and url in hedge_delays:
+            delay = hedge_delays[url]
+        if delay is None:
+            return None
+        # requests' timeout is per read, so a trickling server can outlive it
+        time.sleep(delay)
+        return {'url': url, 'content': f"article body for {url}"}
+
+    return fetch
+
+
+def test_returns_partial_results_on_time():
+    delays = {'https://fast.com/a': 0.05, 'https://stuck.com/b': 5.0, 'https://fast.com/c': 0.1}
+    fetcher = DeadlineFetcher(budget=0.6, hedge_after=10)
+    start = time.monotonic()
+    articles, outcomes = fetcher.run(make_fetch(delays), list(delays))
+    assert time.monotonic() - start < 0.9
+    assert [a['url'] for a in articles] == ['https://fast.com/a', 'https://fast.com/c']
+    assert [o['status'] for o in outcomes] == ['ok', 'deadline', 'ok']
+
+
+def test_hedge_rescues_slow_request():
+    delays = {'https://flaky.com/a': 3.0}
+    fetcher = DeadlineFetcher(budget=1.5, hedge_after=0.2, min_hedge_window=0.1)
+    articles, outcomes = fetcher.run(make_fetch(delays, hedge_delays={'https://flaky.com/a': 0.05}),
+                                     list(delays))
+    assert len(articles) == 1
+    assert outcomes[0]['hedged'] and outcomes[0]['won_by'] == 'hedge'
+    assert outcomes[0]['attempts'] == 2 and outcomes[0]['latency'] < 0.5
+
+
+def test_failures_are_reported():
+    delays = {'https://gone.com/a': None}
+    articles, outcomes = DeadlineFetcher(budget=1.0).run(make_fetch(delays), list(delays))
+    assert articles == [] and outcomes[0]['status'] == 'failed'
+
+
+class StallingSession:
+    """requests.Session stand-in whose first request to a site stalls"""
+
+    def __init__(self, stall=3.0):
+        self.stall = stall
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.timeouts = []
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            first = url not in self.seen
+            self.seen.add(url)
+            self.timeouts.append(kwargs.get('timeout'))
+        time.sleep(self.stall if first else 0.05)
+
+        class Response:
+            status_code = 200
+            headers = {}
+        return Response()
+
+
+def test_hedge_races_through_the_real_scheduler():
+    # A new site starts with one slot, which the stalled primary holds
+    scheduler = FetchScheduler(session=StallingSession(), per_domain_rate=100, per_domain_burst=5)
+
+    def fetch(url, timeout=10, coalesce=True):
+        scheduler.get(url, timeout=timeout, hedge=not coalesce)
+        return {'url': url, 'content': f"article body for {url}"}
+
+    fetcher = DeadlineFetcher(budget=1.5, hedge_after=0.2, min_hedge_window=0.1)
+    start = time.monotonic()
+    articles, outcomes = fetcher.run(fetch, ['https://slow.com/a'])
+    assert len(articles) == 1 and outcomes[0]['won_by'] == 'hedge'
+    assert time.monotonic() - start < 0.6
+
+
+def test_hedge_gives_up_waiting_at_its_timeout():
+    scheduler = FetchScheduler(session=StallingSession(stall=2.0), per_domain_rate=100, per_domain_burst=5)
+    # The slot and the hedge's extra one are both taken by stalled requests
+    for path in ('a', 'b'):
+        threading.Thread(target=scheduler.get, args=(f"https://slow.com/{path}",),
+                         kwargs={'hedge': True, 'timeout': 5}, daemon=True).start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    try:
+        scheduler.get("https://slow.com/c", hedge=True, timeout=0.3)
+        assert False, "hedge should not have found a slot"
+    except requests.exceptions.Timeout:
+        pass
+    assert 0.25 < time.monotonic() - start < 0.6
+
+
+def test_queued_primaries_end_at_the_deadline():
+    session = StallingSession(stall=2.0)
+    scheduler = FetchScheduler(session=session, per_domain_rate=100, per_domain_burst=5)
+    ended = {}
+
+    def fetch(url, timeout=10, coalesce=True):
+        try:
+            scheduler.get(url, timeout=timeout, hedge=not coalesce)
+            return {'url': url, 'content': f"article body for {url}"}
+        finally:
+            ended[url] = time.monotonic()
+
+    # No hedging: the second link waits behind the stalled first for the one slot
+    fetcher = DeadlineFetcher(budget=0.8, hedge_after=10)
+    start = time.monotonic()
+    articles, outcomes = fetcher.run(fetch, ['https://slow.com/a', 'https://slow.com/b'])
+    assert articles == [] and [o['status'] for o in outcomes] == ['deadline', 'deadline']
+    time.sleep(0.5)
+    assert ended['https://slow.com/b'] - start < 1.0  # gave up queueing, never sent
+    assert len(session.timeouts) == 1 and 0.6 < session.timeouts[0] <= 0.8
+
+
+if __name__ == "__main__":
+    for test in (test_returns_partial_results_on_time, test_hedge_rescues_slow_request,
+                 test_failures_are_reported, test_hedge_races_through_the_real_scheduler,
+                 test_hedge_gives_up_waiting_at_its_timeout, test_queued_primaries_end_at_the_deadline):
+        test()
+        print(f"✅ {test.__name__}")
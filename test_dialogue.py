@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test two-host dialogue: turns are voiced per host in parallel and
+interleaved back in script order
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from dialogue import DialogueRenderer, dialogue_hosts, dialogue_instructions, host_voices, split_turns
+from mp3_tools import iter_frames
+from script_cues import chapter_title
+from segment_store import SegmentStore
+from test_mp3_tools import chapters
+from tts_engine import TTSEngine, episode_tags
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz: 417-byte frames
+HEADER = b'\xff\xfb\x90\x44'
+FRAME_BYTES = 417
+
+SCRIPT = """[UPBEAT INTRO MUSIC FADES IN]
+
+Good morning, this is Mando Minutes.
+
+MARK: I'm Mark.
+
+**Sarah:** And I'm Sarah. Big night for Bitcoin.
+
+[TRANSITION SOUND: Whoosh]
+
+MARK: It rose 3% overnight.
+MARKET UPDATE 1: ETF inflows hit $602mn.
+
+SARAH: The most since March.
+
+[OUTRO MUSIC]"""
+
+
+class Voice:
+    """Stand-in synthesizer for one host: frames filled with the host's byte"""
+
+    def __init__(self, fill, delay=0.0):
+        self.fill = fill
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.voiced = []
+
+    def __call__(self, text, previous_text=None, next_text=None):
+        time.sleep(self.delay)
+        with self.lock:
+            self.voiced.append(text)
+        return (HEADER + bytes([self.fill]) * (FRAME_BYTES - 4)) * 2
+
+
+def fills(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data, [data[offset + 4] for offset, _ in iter_frames(data)]
+
+
+def test_turns_are_split_by_speaker():
+    parts = split_turns(SCRIPT, ['Mark', 'Sarah'])
+    turns = [(part['speaker'], part['text']) for part in parts if part['type'] == 'speech']
+    assert turns == [
+        ('Mark', "Good morning, this is Mando Minutes."),
+        ('Mark', "I'm Mark."),
+        ('Sarah', "And I'm Sarah. Big night for Bitcoin."),
+        ('Mark', "It rose 3% overnight.\nMARKET UPDATE 1: ETF inflows hit $602mn."),
+        ('Sarah', "The most since March.")
+    ]
+    assert [part['kind'] for part in parts if part['type'] == 'cue'] == ['intro', 'transition', 'outro']
+    assert chapter_title("SARAH: The most since March.") == "The most since March."
+    assert chapter_title("MARKET UPDATE 1:") == "MARKET UPDATE 1"
+
+
+def test_hosts_get_their_own_voice_settings():
+    config = {'api_key': 'key', 'model': 'eleven_turbo_v2_5', 'voice_id': 'narrator',
+              'voice_settings': {'stability': 0.5, 'style': 0.2},
+              'hosts': {'Mark': {'voice_id': 'mark'},
+                        'Sarah': {'voice_id': 'sarah', 'voice_settings': {'style': 0.6}}}}
+    voices = host_voices(config)
+    assert list(voices) == ['Mark', 'Sarah'] and dialogue_hosts(config) == ['Mark', 'Sarah']
+    assert voices['Sarah']['voice_id'] == 'sarah' and voices['Sarah']['model'] == 'eleven_turbo_v2_5'
+    assert voices['Sarah']['voice_settings'] == {'stability': 0.5, 'style': 0.6}
+    assert voices['Mark']['voice_settings'] == {'stability': 0.5, 'style': 0.2}
+    assert 'hosts' not in voices['Mark']
+    assert dialogue_hosts({'hosts': {'Mark': {}}}) == [] and dialogue_hosts({}) == []
+    assert '"MARK: ..."' in dialogue_instructions(['Mark', 'Sarah'])
+
+
+def test_dialogue_interleaves_each_hosts_turns_in_order():
+    mark, sarah = Voice(1), Voice(2)
+    renderer = DialogueRenderer({'Mark': TTSEngine(mark), 'Sarah': TTSEngine(sarah)})
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'dialogue.mp3')
+        stats = renderer.render_to(SCRIPT, path, tags=episode_tags("Mando Minutes", host="Mark & Sarah"))
+        data, order = fills(path)
+
+    assert sorted(mark.voiced) == sorted(["Good morning, this is Mando Minutes.", "I'm Mark.",
+                                          "It rose 3% overnight.\n\nMARKET UPDATE 1: ETF inflows hit $602mn."])
+    assert sorted(sarah.voiced) == ["And I'm Sarah. Big night for Bitcoin.", "The most since March."]
+    assert order == [1] * 4 + [2] * 2 + [1] * 2 + [2] * 2
+    assert stats['turns'] == 5 and stats['cues'] == 3
+    assert stats['speakers']['Sarah']['turns'] == 2
+    assert stats['billed_characters'] == sum(len(text) for text in mark.voiced + sarah.voiced)
+    assert [title for *_, title in chapters(data)] == ["Intro", "It rose 3% overnight."]
+
+
+def test_parallel_hosts_beat_sequential_turns():
+    script = '\n\n'.join(f"{'MARK' if n % 2 else 'SARAH'}: Point number {n}." for n in range(12))
+    timings = {}
+    for parallel in (False, True):
+        renderer = DialogueRenderer({'Mark': TTSEngine(Voice(1, 0.05)), 'Sarah': TTSEngine(Voice(2, 0.05))},
+                                    parallel=parallel)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dialogue.mp3')
+            start = time.monotonic()
+            renderer.render_to(script, path)
+            timings[parallel] = time.monotonic() - start
+            assert fills(path)[1] == [2, 2, 1, 1] * 6
+    assert timings[True] < timings[False] / 3
+
+
+def test_dialogue_reruns_reuse_stored_stories():
+    mark, sarah = Voice(1), Voice(2)
+    renderer = DialogueRenderer({'Mark': TTSEngine(mark), 'Sarah': TTSEngine(sarah)})
+    with tempfile.TemporaryDirectory() as directory:
+        store = SegmentStore(os.path.join(directory, 'segments'))
+        path = os.path.join(directory, 'episode.mp3')
+        first = store.render(renderer, 'mando-2026-10-19', SCRIPT, path)
+        assert first['revoiced'] == 2 and first['billed_characters'] > 0
+        assert [story['title'] for story in store.load('mando-2026-10-19')['stories']] == \
+            ["Intro", "It rose 3% overnight."]
+
+        mark.voiced.clear()
+        sarah.voiced.clear()
+        again = store.render(renderer, 'mando-2026-10-19', SCRIPT.replace("March.", "March!"), path)
+        assert again['revoiced'] == 1 and again['reused'] == 1
+        # Only the second story is voiced again, both hosts' turns of it
+        assert sarah.voiced == ["The most since March!"] and len(mark.voiced) == 1
+        assert fills(path)[1] == [1] * 4 + [2] * 2 + [1] * 2 + [2] * 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test the disk cache behind the article, LLM and audio caches: TTL, LRU
+eviction and the running byte total
+"""
+
+import os
+import tempfile
+import time
+
+import disk_cache
+from disk_cache import DiskCache, cache_key
+
+
+def test_disk_cache_ttl_and_lru_eviction():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskCache(os.path.join(directory, 'json'), ttl_seconds=60)
+        key = cache_key('model', 'prompt', 0.7)
+        assert key == cache_key('model', 'prompt', 0.7)
+        cache.set(key, {'text': 'hello'})
+        assert cache.get(key) == {'text': 'hello'}
+        assert cache.get('missing') is None
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+        # Expired entries disappear
+        path = cache._path(key, '.json')
+        os.utime(path, (time.time() - 120, time.time() - 120))
+        assert cache.get(key) is None
+
+        cache = DiskCache(os.path.join(directory, 'bin'), max_bytes=2500)
+        cache.set_bytes('a', b'a' * 1000)
+        cache.set_bytes('b', b'b' * 1000)
+        time.sleep(0.02)
+        cache.get_bytes('a')  # a is now more recently used than b
+        cache.set_bytes('c', b'c' * 1000)
+        assert cache.contains('a') and cache.contains('c')
+        assert not cache.contains('b')
+
+
+def test_disk_cache_only_walks_when_over_budget():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskCache(directory, max_bytes=10000)
+        walks = []
+        entries = cache.entries
+        cache.entries = lambda: walks.append(1) or entries()
+
+        for n in range(9):
+            cache.set_bytes(n, b'x' * 1000)
+        cache.set_bytes(0, b'y' * 1000)  # replacing an entry doesn't grow the total
+        assert len(walks) == 1 and cache.total_bytes == 9000
+
+        cache.set_bytes('big', b'z' * 2000)
+        assert len(walks) == 2 and cache.total_bytes <= 9000
+        assert cache.stats()['bytes'] == cache.total_bytes and cache.contains('big')
+
+
+def test_removals_come_off_the_running_total():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DiskCache(directory, ttl_seconds=60, max_bytes=10000)
+        for n in range(3):
+            cache.set_bytes(n, b'x' * 1000)
+        assert cache.total_bytes == 3000
+
+        cache.delete(0)
+        cache.delete(0)  # already gone: nothing more to take off
+        assert cache.total_bytes == 2000
+
+        # An entry found expired is dropped and uncounted too
+        path = cache._path(1, '.bin')
+        os.utime(path, (time.time() - 120, time.time() - 120))
+        assert cache.get_bytes(1) is None
+        assert cache.total_bytes == 1000 == cache.stats()['bytes']
+
+
+def test_running_total_is_recounted_for_other_writers():
+    with tempfile.TemporaryDirectory() as directory:
+        ours, theirs = DiskCache(directory, max_bytes=10000), DiskCache(directory, max_bytes=10000)
+        ours.set_bytes('a', b'a' * 1000)
+        theirs.set_bytes('b', b'b' * 4000)
+        ours.set_bytes('c', b'c' * 1000)
+        assert ours.total_bytes == 2000  # doesn't see the other process's write yet
+
+        ours.counted_at -= disk_cache.RECOUNT_SECONDS + 1
+        ours.set_bytes('d', b'd' * 1000)
+        assert ours.total_bytes == 7000
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
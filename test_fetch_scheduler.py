@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the polite fetch scheduler with a simulated set of news sites
+"""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from fetch_scheduler import (FetchScheduler, TokenBucket, AIMDLimiter,
+                             parse_retry_after, domain_of)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Stands in for requests.Session: sleeps per site and tracks overlap"""
+
+    def __init__(self, latency=0.05, throttle_first=None):
+        self.latency = latency
+        self.throttle_first = dict(throttle_first or {})
+        self.lock = threading.Lock()
+        self.active = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.calls = defaultdict(list)
+
+    def get(self, url, **kwargs):
+        domain = domain_of(url)
+        with self.lock:
+            self.active[domain] += 1
+            self.peak[domain] = max(self.peak[domain], self.active[domain])
+            self.calls[domain].append(time.monotonic())
+            retry_after = self.throttle_first.pop(domain, None)
+        try:
+            if retry_after is not None:
+                return FakeResponse(429, {'Retry-After': str(retry_after)})
+            time.sleep(self.latency)
+            return FakeResponse(200)
+        finally:
+            with self.lock:
+                self.active[domain] -= 1
+
+
+def test_retry_after_formats():
+    assert parse_retry_after("7") == 7.0
+    now = datetime(2025, 7, 7, 12, 0, tzinfo=timezone.utc)
+    http_date = format_datetime(now + timedelta(seconds=30), usegmt=True)
+    assert parse_retry_after(http_date, now=now) == 30.0
+    assert parse_retry_after("soon") is None
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.reserve() == 0.0
+    assert 0.05 < bucket.reserve() <= 0.1
+
+
+def test_aimd_grows_and_halves():
+    limiter = AIMDLimiter(initial=1, maximum=4, target_latency=1.0)
+    for _ in range(10):
+        limiter.on_success(0.2)
+    assert limiter.slots == 4
+    limiter.on_congestion()
+    assert limiter.slots == 2
+    limiter.on_success(5.0)  # far above target counts as congestion
+    assert limiter.slots == 1
+
+
+def test_per_site_pressure_is_bounded():
+    session = FakeSession(latency=0.05)
+    scheduler = FetchScheduler(session=session, per_domain_rate=50, per_domain_burst=10,
+                               max_per_domain=2, max_concurrency=12)
+    urls = [f"https://www.site{d}.com/story/{i}" for d in range(4) for i in range(6)]
+    results = scheduler.map(lambda url: scheduler.get(url).status_code, urls)
+    assert results == [200] * len(urls)
+    assert max(session.peak.values()) <= 2
+    # Several sites were in flight together, so total throughput stayed high
+    assert len(session.peak) == 4
+
+
+def test_retry_after_is_honored():
+    session = FakeSession(latency=0.0, throttle_first={'slow.com': 1})
+    scheduler = FetchScheduler(session=session, per_domain_rate=100, per_domain_burst=5)
+    response = scheduler.get("https://slow.com/a")
+    assert response.status_code == 200
+    first, second = session.calls['slow.com']
+    assert second - first >= 0.95
+    report = scheduler.domain_report()['slow.com']
+    assert report['throttled'] == 1 and report['requests'] == 2
+
+
+if __name__ == "__main__":
+    for test in (test_retry_after_formats, test_token_bucket_spaces_requests,
+                 test_aimd_grows_and_halves, test_per_site_pressure_is_bounded,
+                 test_retry_after_is_honored):
+        test()
+        print(f"✅ {test.__name__}")
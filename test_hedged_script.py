@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test racing the template script against the LLM under a deadline
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from hedged_script import ScriptHedge, script_problems
+
+GOOD = ' '.join(["Bitcoin held steady overnight as traders waited on the Fed."] * 20)
+TEMPLATE = "[INTRO MUSIC]\n\n" + ' '.join(["Here is today's template briefing."] * 30) + "\n\n[OUTRO MUSIC]"
+
+
+def slow(result, seconds):
+    def write():
+        time.sleep(seconds)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return write
+
+
+def hedge(tmp):
+    return ScriptHedge(deadline=0.3, log_path=os.path.join(tmp, 'hedges.jsonl'))
+
+
+def test_script_problems_flag_unusable_scripts():
+    assert script_problems(GOOD) == []
+    assert script_problems("") == ['empty']
+    assert script_problems("I'm sorry, but I can't help with that.") == ['only 8 words', 'refusal']
+    assert 'cut off mid-sentence' in script_problems(GOOD + " and then the")
+
+
+def test_llm_wins_when_it_answers_in_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        script, report = hedge(tmp).run(slow(GOOD, 0.05), slow(TEMPLATE, 0.0))
+    assert script == GOOD and report['winner'] == 'llm' and report['reason'] == 'in time'
+
+
+def test_template_wins_at_the_deadline():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = hedge(tmp)
+        start = time.monotonic()
+        script, report = runner.run(slow(GOOD, 2.0), slow(TEMPLATE, 0.0))
+        elapsed = time.monotonic() - start
+        with open(runner.log_path) as f:
+            logged = [json.loads(line) for line in f]
+
+    assert script == TEMPLATE and report['winner'] == 'template'
+    assert report['reason'] == 'no answer within 0.3s' and elapsed < 0.6
+    assert logged[0]['winner'] == 'template' and runner.wins == {'template': 1}
+
+
+def test_errors_and_bad_scripts_fall_back_without_waiting():
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.monotonic()
+        script, report = hedge(tmp).run(slow(RuntimeError("429 rate limited"), 0.02), slow(TEMPLATE, 0.0))
+        assert script == TEMPLATE and report['reason'] == 'error: 429 rate limited'
+        assert time.monotonic() - start < 0.2
+
+        script, report = hedge(tmp).run(slow("As an AI, I can't.", 0.02), slow(TEMPLATE, 0.0))
+        assert script == TEMPLATE and report['reason'].startswith('only')
+
+
+def test_broken_template_waits_for_the_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        script, report = hedge(tmp).run(slow(GOOD, 0.5), slow(RuntimeError("bad content"), 0.0))
+    assert script == GOOD and report['winner'] == 'llm' and report['llm_seconds'] >= 0.5
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test link ranking, fetch budgets and the article cache behind them
+"""
+
+import tempfile
+
+from article_cache import ArticleCache
+from link_ranker import LinkRanker
+
+
+def candidates(*pairs):
+    ranked = [{'url': url, 'anchor': anchor, 'position': i} for i, (url, anchor) in enumerate(pairs)]
+    for candidate in ranked:
+        candidate['total'] = len(ranked)
+    return ranked
+
+
+def test_anchor_and_trust_beat_plumbing_links():
+    ranker = LinkRanker(trusted_domains={'coindesk.com'})
+    ranked = ranker.rank(candidates(
+        ('https://example.com/subscribe-now', 'Subscribe'),
+        ('https://blog.example.com/', 'Our website'),
+        ('https://www.coindesk.com/markets/2024/06/01/bitcoin-etf-flows', 'Bitcoin ETFs pull in $1.2B as price tops $70,000'),
+        ('https://news.example.org/story-about-rates-and-banks', 'Fed holds rates steady for a sixth meeting'),
+    ))
+    assert ranked[0]['url'].startswith('https://www.coindesk.com')
+    assert ranked[1]['url'].startswith('https://news.example.org')
+    assert ranked[-1]['anchor'] == 'Subscribe'
+
+
+def test_position_breaks_ties():
+    ranker = LinkRanker()
+    ranked = ranker.rank(candidates(
+        ('https://a.com/first-story-here', 'Same length anchor text'),
+        ('https://b.com/second-story-here', 'Same length anchor text'),
+    ))
+    assert [c['url'] for c in ranked] == ['https://a.com/first-story-here',
+                                          'https://b.com/second-story-here']
+
+
+def test_budgets_limit_selection_and_cache_hits_are_free():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ArticleCache(directory=directory)
+        cache.put({'url': 'https://c.com/cached-story-one', 'content': 'x'})
+        ranker = LinkRanker(cache=cache, avg_page_bytes=1000, avg_fetch_seconds=1.0, concurrency=1)
+        ranked = ranker.rank(candidates(
+            ('https://a.com/story-one-here', 'Headline number one today'),
+            ('https://b.com/story-two-here', 'Headline number two today'),
+            ('https://c.com/cached-story-one', 'Headline number three today'),
+        ))
+        assert ranked[0]['cached']
+
+        selected = ranker.select(ranked, max_links=10, byte_budget=1500)
+        assert [c['url'] for c in selected] == ['https://c.com/cached-story-one',
+                                                'https://a.com/story-one-here']
+
+        selected = ranker.select(ranked, max_links=10, time_budget=2.0)
+        assert len(selected) == 3
+
+        assert len(ranker.select(ranked, max_links=1)) == 1
+
+
+def test_domain_stats_steer_time_budget():
+    ranker = LinkRanker(domain_stats={'slow.com': {'avg_latency': 9.0}},
+                        avg_fetch_seconds=1.0, concurrency=1)
+    ranked = ranker.rank(candidates(
+        ('https://slow.com/big-story-today', 'Big story that loads slowly'),
+        ('https://fast.com/other-story-today', 'Other story that loads fast'),
+    ))
+    selected = ranker.select(ranked, time_budget=3.0)
+    assert [c['url'] for c in selected] == ['https://fast.com/other-story-today']
+
+
+def test_article_cache_keys_by_canonical_url():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ArticleCache(directory=directory)
+        cache.put({'url': 'https://www.example.com/story?utm_source=mail',
+                   'canonical_url': 'https://example.com/canonical-story',
+                   'content': 'body'})
+        assert cache.has('https://example.com/story')
+        assert cache.get('http://example.com/canonical-story')['content'] == 'body'
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Test the async LLM client against a local stand-in chat completions server
+"""
+
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import llm_client
+from llm_cache import LLMCache
+from llm_client import LLMClient, llm_configured, shared_llm_client
+from resilience import ProviderError
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay=0.2, token_delay=0.0):
+        super().__init__(('127.0.0.1', 0), FakeChatHandler)
+        self.delay = delay
+        self.token_delay = token_delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.rate_limited = 0  # answer this many requests with 429 first
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.active += 1
+            server.requests += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        prompt = body['messages'][-1]['content']
+        if server.rate_limited or prompt == 'quota':
+            return self.send_rate_limit(prompt == 'quota')
+        if body.get('stream'):
+            return self.stream_words(body['model'], f"script for {prompt}")
+        if prompt == 'fail':
+            payload = json.dumps({'error': {'message': 'bad request', 'type': 'invalid_request_error'}})
+            self.send_response(400)
+        elif prompt == 'refuse':
+            payload = json.dumps({
+                'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0,
+                'model': body['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': None,
+                                         'refusal': "I can't help with that."}}],
+                'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+            })
+            self.send_response(200)
+        else:
+            payload = json.dumps({
+                'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0,
+                'model': body['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': f"  script for {prompt}  "}}],
+                'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+            })
+            self.send_response(200)
+        data = payload.encode()
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_rate_limit(self, quota):
+        if quota:
+            error = {'message': 'You exceeded your current quota', 'code': 'insufficient_quota'}
+        else:
+            with self.server.lock:
+                self.server.rate_limited -= 1
+            error = {'message': 'Rate limit reached for requests', 'code': 'rate_limit_exceeded'}
+        data = json.dumps({'error': dict(error, type='requests')}).encode()
+        self.send_response(429)
+        self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def stream_words(self, model, text):
+        """Server-sent events, one word per chunk, like the streaming API"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            delta = word if i == 0 else ' ' + word
+            event = {'id': 'chatcmpl-test', 'object': 'chat.completion.chunk', 'created': 0,
+                     'model': model,
+                     'choices': [{'index': 0, 'delta': {'content': delta}, 'finish_reason': None}]}
+            self.write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(self.server.token_delay)
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_server(delay=0.2, token_delay=0.0):
+    server = FakeChatServer(delay, token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_complete_and_parallel_batch_respects_concurrency():
+    server = start_server(delay=0.2)
+    client = LLMClient('test-key', max_concurrency=3, base_url=server.base_url, max_retries=0)
+    try:
+        assert client.complete([{'role': 'user', 'content': 'mando'}], 'gpt-test') == 'script for mando'
+
+        jobs = [{'messages': [{'role': 'user', 'content': f"section {i}"}], 'model': 'gpt-test'}
+                for i in range(6)]
+        start = time.monotonic()
+        results = client.complete_many(jobs)
+        elapsed = time.monotonic() - start
+
+        assert results == [f"script for section {i}" for i in range(6)]
+        assert server.peak == 3
+        assert elapsed < 0.2 * 6 * 0.75  # clearly parallel, not sequential
+        assert client.stats['calls'] == 7
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_failures_stay_with_their_job():
+    server = start_server(delay=0.01)
+    client = LLMClient('test-key', max_concurrency=2, base_url=server.base_url, max_retries=0)
+    try:
+        results = client.complete_many([
+            {'messages': [{'role': 'user', 'content': 'puck'}], 'model': 'gpt-test'},
+            {'messages': [{'role': 'user', 'content': 'fail'}], 'model': 'gpt-test'},
+        ])
+        assert results[0] == 'script for puck'
+        assert isinstance(results[1], Exception)
+        assert client.stats['errors'] == 1
+        client.warm()  # HEAD on the API base just opens a connection
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_reply_without_text_is_a_clear_error():
+    server = start_server(delay=0.01)
+    client = LLMClient('test-key', base_url=server.base_url, max_retries=0)
+    try:
+        client.complete([{'role': 'user', 'content': 'refuse'}], 'gpt-test')
+        assert False, "should have raised"
+    except ProviderError as e:
+        assert e.kind == 'client' and "I can't help with that." in str(e)
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_shared_clients_keep_each_callers_settings():
+    quiet = {'cache': None, 'usage_log': None, 'ledger': None}
+    scheduled = shared_llm_client('shared-key', paced=True, wait_open=300, **quiet)
+    dashboard = shared_llm_client('shared-key', **quiet)
+    try:
+        assert shared_llm_client('shared-key', wait_open=300, paced=True, **quiet) is scheduled
+        assert dashboard is not scheduled
+        assert scheduled.paced and scheduled.wait_open == 300
+        assert not dashboard.paced and dashboard.wait_open == 0.0
+    finally:
+        for key in [key for key in llm_client._shared_clients if key[0] == 'shared-key']:
+            llm_client._shared_clients.pop(key).close()
+
+
+def test_cache_serves_repeats_until_forced():
+    server = start_server(delay=0.2)
+    with tempfile.TemporaryDirectory() as directory:
+        client = LLMClient('test-key', base_url=server.base_url, max_retries=0,
+                           cache=LLMCache(directory))
+        messages = [{'role': 'user', 'content': 'puck'}]
+        try:
+            assert client.complete(messages, 'gpt-test') == 'script for puck'
+            start = time.monotonic()
+            assert client.complete(messages, 'gpt-test') == 'script for puck'
+            assert time.monotonic() - start < 0.1
+            assert server.requests == 1 and client.stats['cache_hits'] == 1
+
+            # Any change in model, messages or parameters is a different entry
+            client.complete(messages, 'gpt-test', temperature=0.2)
+            client.complete(messages, 'gpt-test', max_tokens=50)
+            assert server.requests == 3
+
+            client.complete(messages, 'gpt-test', force_refresh=True)
+            assert server.requests == 4
+        finally:
+            client.close()
+            server.shutdown()
+
+
+def test_stream_yields_deltas_and_fills_cache():
+    server = start_server(delay=0.01)
+    with tempfile.TemporaryDirectory() as directory:
+        client = LLMClient('test-key', base_url=server.base_url, max_retries=0,
+                           cache=LLMCache(directory))
+        messages = [{'role': 'user', 'content': 'mando minutes today'}]
+        try:
+            deltas = list(client.stream(messages, 'gpt-test'))
+            assert deltas == ['script', ' for', ' mando', ' minutes', ' today']
+            # The streamed answer is cached like a complete() one
+            assert client.complete(messages, 'gpt-test') == 'script for mando minutes today'
+            assert list(client.stream(messages, 'gpt-test')) == ['script for mando minutes today']
+            assert server.requests == 1
+        finally:
+            client.close()
+            server.shutdown()
+
+
+def test_placeholder_keys_are_not_configured():
+    assert not llm_configured({'api_key': 'YOUR_OPENAI_API_KEY'})
+    assert not llm_configured({})
+    assert llm_configured({'api_key': 'sk-real'})
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test per-item complexity routing between templates, a small and a large model
+"""
+
+from comprehensive_mando_processor import ComprehensiveMandoProcessor
+from model_router import ModelRouter, item_complexity
+
+PRICE_LINE = "BTC: 108.6k (-1%), ETH: 2.5k (+2%)"
+FLOW_LINE = "BTC ETFs: +$602mn, ETH ETFs: +$148mn"
+ORDINARY = "Fed signals hawkish stance as inflation stays sticky"
+GENERIC = "Circle files for IPO"
+DENSE = ("Senate Banking Committee advances stablecoin bill after Democrats win concessions on "
+         "consumer protections, while the SEC and CFTC spar over jurisdiction ahead of a floor "
+         "vote that Coinbase and Circle have lobbied on for months")
+
+
+class FakeLLM:
+    def __init__(self, fail=()):
+        self.batches = []
+        self.fail = fail
+
+    def complete_many(self, jobs):
+        self.batches.append(jobs)
+        return [RuntimeError("rate limited")
+                if any(word in job['messages'][-1]['content'].split('\n')[0] for word in self.fail)
+                else f"analysis by {job['model']}" for job in jobs]
+
+
+def test_complexity_orders_routine_to_dense():
+    assert item_complexity(PRICE_LINE) == item_complexity(FLOW_LINE) == 0.0
+    assert item_complexity("") == 0.0
+    assert 0.0 < item_complexity(ORDINARY) < item_complexity(DENSE) <= 1.0
+
+
+def test_items_route_to_cheapest_engine():
+    router = ModelRouter(FakeLLM(), 'mini', 'big')
+    assert router.route(PRICE_LINE) == 'template'
+    assert router.route(ORDINARY) == 'small'
+    assert router.route(DENSE) == 'large'
+    # A routine item with no specific template goes to the model, not the generic text
+    assert router.route(GENERIC, has_template=False) == 'small'
+    assert ModelRouter(None).route(DENSE) == 'template'
+
+
+def test_expand_all_sends_one_concurrent_batch_in_order():
+    llm = FakeLLM()
+    router = ModelRouter(llm, 'mini', 'big')
+    items = [FLOW_LINE, DENSE, ORDINARY]
+    expansions = router.expand_all(items, lambda item: f"template {item}")
+
+    assert len(llm.batches) == 1
+    assert [job['model'] for job in llm.batches[0]] == ['big', 'mini']
+    assert "Other headlines" in llm.batches[0][0]['messages'][-1]['content']
+    assert "Other headlines" not in llm.batches[0][1]['messages'][-1]['content']
+    assert expansions == [f"template {FLOW_LINE}", f"{DENSE}\n\nanalysis by big\n",
+                          f"{ORDINARY}\n\nanalysis by mini\n"]
+    assert router.last_stats['template'] == 1 and router.last_stats['llm_calls'] == 2
+
+
+def test_failed_calls_fall_back_to_templates():
+    router = ModelRouter(FakeLLM(fail=['Fed']), 'mini', 'big')
+    expansions = router.expand_all([ORDINARY, DENSE], lambda item: f"template {item}")
+    assert expansions == [f"template {ORDINARY}", f"{DENSE}\n\nanalysis by big\n"]
+    assert router.last_stats['fallbacks'] == 1
+
+
+def test_processor_routes_generic_items_and_keeps_order():
+    items = [FLOW_LINE, GENERIC, "Whale wallet moves 10k BTC", DENSE]
+    plain = ComprehensiveMandoProcessor()
+    assert plain.news_category(FLOW_LINE) == 'etf_flows'
+    assert plain.news_category(GENERIC) is None
+    assert plain.expand_items(items)[0] == plain.expand_news_item(FLOW_LINE)
+
+    llm = FakeLLM()
+    routed = ComprehensiveMandoProcessor(router=ModelRouter(llm, 'mini', 'big'))
+    expansions = routed.expand_items(items)
+    assert [job['model'] for job in llm.batches[0]] == ['mini', 'big']
+    assert expansions[1] == f"{GENERIC}\n\nanalysis by mini\n"
+    assert expansions[3] == f"{DENSE}\n\nanalysis by big\n"
+    assert "Whale wallet" in expansions[2] and "analysis by" not in expansions[2]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test exact MP3 durations, ID3v2 tags with chapters and in-place tag writes
+"""
+
+import os
+import struct
+import tempfile
+
+from mp3_tools import file_duration, frame_header, id3_declared_size, id3_tag, mp3_duration, write_id3
+from tts_engine import TTSEngine, episode_tags
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz: 417-byte frames of 1152 samples
+HEADER = b'\xff\xfb\x90\x44'
+FRAME_BYTES = 417
+FRAME_SECONDS = 1152 / 44100
+# MPEG-2 Layer III, 64 kbps, 22.05 kHz: 576 samples, 208 bytes
+HEADER_22K = b'\xff\xf3\x80\x44'
+
+
+def frames(count, header=HEADER, fill=1):
+    return (header + bytes([fill]) * (frame_header(header)['length'] - 4)) * count
+
+
+def info_frame():
+    return HEADER + bytes(32) + b'Info' + bytes(FRAME_BYTES - 4 - 32 - 4)
+
+
+def read_frames(data, offset=10, end=None):
+    """{frame id: [body, ...]} of an ID3v2.3 tag, or of the sub-frames
+    between offset and end"""
+    found, end = {}, id3_declared_size(data) if end is None else end
+    while offset + 10 <= end and data[offset:offset + 4].strip(b'\x00'):
+        frame_id = data[offset:offset + 4].decode('ascii')
+        size = struct.unpack('>I', data[offset + 4:offset + 8])[0]
+        found.setdefault(frame_id, []).append(data[offset + 10:offset + 10 + size])
+        offset += 10 + size
+    return found
+
+
+def chapters(tag):
+    """(element id, start ms, end ms, title) for each CHAP frame"""
+    found = []
+    for body in read_frames(tag).get('CHAP', []):
+        element, rest = body.split(b'\x00', 1)
+        start, end = struct.unpack('>II', rest[:8])
+        title = text(read_frames(rest, 16, len(rest))['TIT2'][0])
+        found.append((element.decode('ascii'), start, end, title))
+    return found
+
+
+def text(body):
+    return body[1:].decode('utf-16')
+
+
+def test_duration_counts_frames_not_bytes():
+    data = b'ID3\x03\x00\x00\x00\x00\x00\x0a' + bytes(10) + info_frame() + frames(100)
+    assert abs(mp3_duration(data) - 100 * FRAME_SECONDS) < 1e-9
+    # A bitrate guess would be off for anything but 128 kbps
+    low = frames(100, HEADER_22K)
+    assert abs(mp3_duration(low) - 100 * 576 / 22050) < 1e-9
+    assert mp3_duration(b'') == 0
+
+
+def test_tag_has_text_length_and_chapters():
+    tag = id3_tag({'title': 'Mando Minutes - October 19, 2026', 'artist': 'Mark', 'genre': 'Podcast'},
+                  chapters=[("Intro", 0.0), ("Bitcoin rose 3%", 12.5), ("ETF inflows", 40.0)],
+                  duration=61.25)
+    found = read_frames(tag)
+    assert text(found['TIT2'][0]) == 'Mando Minutes - October 19, 2026'
+    assert text(found['TPE1'][0]) == 'Mark' and text(found['TLEN'][0]) == '61250'
+
+    toc = found['CTOC'][0]
+    assert toc.startswith(b'toc\x00\x03\x03') and toc.endswith(b'chp0\x00chp1\x00chp2\x00')
+    assert chapters(tag) == [('chp0', 0, 12500, "Intro"), ('chp1', 12500, 40000, "Bitcoin rose 3%"),
+                             ('chp2', 40000, 61250, "ETF inflows")]
+
+
+def test_rendered_episode_is_tagged_with_a_chapter_per_story():
+    script = """[INTRO MUSIC]
+
+Good morning! I'm Mark, and this is your Mando Minutes briefing.
+
+[TRANSITION SOUND: Whoosh]
+
+**MARKET UPDATE 1:**
+
+Bitcoin rose 3% overnight.
+
+[TRANSITION SOUND: Ding]
+
+ETF inflows hit $602mn, the most since March, led by the biggest issuers in the market today.
+
+That's your briefing."""
+    lengths = {}
+
+    def synthesize(chunk, previous_text=None, next_text=None):
+        lengths[chunk] = len(chunk)  # one frame per character
+        return info_frame() + frames(lengths[chunk])
+
+    engine = TTSEngine(synthesize, max_chars=2000)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'episode.mp3')
+        stats = engine.render_to(script, path, tags=episode_tags("Mando Minutes"))
+        with open(path, 'rb') as f:
+            data = f.read()
+
+    total = sum(lengths.values()) * FRAME_SECONDS
+    assert abs(stats['duration_seconds'] - total) < 0.001 and abs(mp3_duration(data) - total) < 1e-6
+    found = read_frames(data)
+    assert text(found['TALB'][0]) == "Mando Minutes" and text(found['TCON'][0]) == "Podcast"
+    assert text(found['TLEN'][0]) == str(round(total * 1000))
+
+    marks = chapters(data)
+    assert [title for *_, title in marks] == [
+        "Intro", "MARKET UPDATE 1", "ETF inflows hit $602mn, the most since March, led by the…"]
+    first, second, _ = [count for prefix in ("Good", "MARKET", "ETF")
+                        for chunk, count in lengths.items() if chunk.startswith(prefix)]
+    assert marks[1][1] == round(first * FRAME_SECONDS * 1000)
+    assert marks[2][1] == round((first + second) * FRAME_SECONDS * 1000)
+    assert marks[-1][2] == round(total * 1000)
+
+
+def test_write_id3_in_place_and_by_rewrite():
+    audio = frames(50)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'episode.mp3')
+        with open(path, 'wb') as f:
+            f.write(id3_tag({}))
+            f.write(audio)
+
+        # No room in a bare tag: the file is rewritten with the audio intact
+        write_id3(path, id3_tag({'title': 'First'}))
+        with open(path, 'rb') as f:
+            data = f.read()
+        assert data.endswith(audio) and text(read_frames(data)['TIT2'][0]) == 'First'
+
+        # A shorter tag fits the old space and is padded in place
+        inode = os.stat(path).st_ino
+        write_id3(path, id3_tag({'title': 'Two'}))
+        with open(path, 'rb') as f:
+            again = f.read()
+        assert os.stat(path).st_ino == inode and len(again) == len(data)
+        assert again.endswith(audio) and text(read_frames(again)['TIT2'][0]) == 'Two'
+        assert abs(file_duration(path) - 50 * FRAME_SECONDS) < 1e-9
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test paywall / non-article detection and remembered per-domain outcomes
+"""
+
+import os
+import tempfile
+
+from paywall_detector import (classify_url, classify_response, classify_head,
+                              looks_paywalled, read_article_page, HEAD_BYTES)
+from domain_outcomes import DomainOutcomes
+from link_ranker import LinkRanker
+
+
+class StreamedResponse:
+    """Minimal streamed response that counts how much body was pulled"""
+
+    def __init__(self, body, content_type='text/html; charset=utf-8'):
+        self.body = body.encode('utf-8')
+        self.headers = {'Content-Type': content_type}
+        self.encoding = 'utf-8'
+        self.bytes_read = 0
+
+    def iter_content(self, chunk_size=8192):
+        for start in range(0, len(self.body), chunk_size):
+            chunk = self.body[start:start + chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+def test_url_and_header_classification():
+    assert classify_url('https://sec.gov/filings/10-K.PDF') == 'binary'
+    assert classify_url('https://example.com/news/story') is None
+    assert classify_response(200, {'Content-Type': 'application/pdf'}) == 'binary'
+    assert classify_response(200, {'Content-Type': 'video/mp4'}) == 'binary'
+    assert classify_response(200, {'Content-Type': 'text/html; charset=utf-8'}) is None
+    assert classify_response(200, {}) is None
+    assert classify_response(402, {'Content-Type': 'text/html'}) == 'paywall'
+
+
+def test_hard_markers_stop_the_download_early():
+    head = '<html><head><script type="application/ld+json">{"isAccessibleForFree": false}</script>'
+    body = head + '<p>' + 'x' * 200_000 + '</p></html>'
+    response = StreamedResponse(body)
+    markup, verdict = read_article_page(response)
+    assert verdict == 'paywall'
+    assert response.bytes_read < HEAD_BYTES * 2
+    assert classify_head('<div class="wsj-snippet-login">') == 'paywall'
+
+
+def test_free_pages_are_read_in_full():
+    body = '<html><body>' + '<p>Plain free article text here.</p>' * 2000 + '</body></html>'
+    response = StreamedResponse(body)
+    markup, verdict = read_article_page(response)
+    assert verdict is None
+    assert markup == body
+
+
+def test_soft_markers_need_short_text():
+    markup = '<div class="paywall">Subscribe to continue reading</div>'
+    assert looks_paywalled(markup, text_length=40)
+    assert not looks_paywalled(markup, text_length=3000)
+    assert not looks_paywalled('<p>ordinary page</p>', text_length=40)
+
+
+def test_outcomes_persist_and_demote_links():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'outcomes.json')
+        outcomes = DomainOutcomes(path)
+        for _ in range(3):
+            outcomes.record('wsj.com', 'paywall')
+        outcomes.record('reuters.com', 'ok', size=400_000)
+        outcomes.save()
+
+        reloaded = DomainOutcomes(path)
+        assert reloaded.get('wsj.com')['paywall_rate'] > 0.6
+        assert reloaded.get('reuters.com')['avg_bytes'] == 400_000
+
+        ranker = LinkRanker(trusted_domains={'wsj.com', 'reuters.com'},
+                            domain_stats=reloaded.snapshot())
+        ranked = ranker.rank([
+            {'url': 'https://www.wsj.com/articles/fed-holds-rates-steady-123', 'anchor': 'Fed holds rates steady again', 'position': 0, 'total': 2},
+            {'url': 'https://www.reuters.com/markets/fed-holds-rates-steady', 'anchor': 'Fed holds rates steady again', 'position': 1, 'total': 2},
+        ])
+        assert ranked[0]['url'].startswith('https://www.reuters.com')
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
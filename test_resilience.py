@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Test backoff, Retry-After handling, circuit breakers and the quota ledger
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+import requests
+
+from llm_client import LLMClient
+from resilience import (CircuitBreaker, CircuitOpenError, ProviderError, QuotaLedger, Resilience,
+                        backoff_delay, classify, raise_for_provider)
+from test_llm_client import start_server
+
+
+def fake_response(status, text='', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = text.encode()
+    response.headers.update(headers or {})
+    return response
+
+
+def flaky(*outcomes):
+    """fn() that raises or returns each outcome in turn"""
+    calls = []
+
+    def fn():
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return fn, calls
+
+
+def http_error(status, text='', headers=None):
+    try:
+        raise_for_provider('elevenlabs', fake_response(status, text, headers))
+    except ProviderError as e:
+        return e
+
+
+def test_errors_are_classified_by_status_and_body():
+    assert classify(http_error(429, 'busy', {'Retry-After': '7'})) == ('rate_limit', 429, 7.0)
+    assert classify(http_error(401, '{"detail": {"status": "quota_exceeded"}}'))[0] == 'quota'
+    assert classify(http_error(503))[0] == 'server'
+    assert classify(http_error(401, 'invalid api key'))[0] == 'auth'
+    assert classify(http_error(422))[0] == 'client'
+    assert classify(requests.ConnectionError("reset"))[0] == 'network'
+    assert classify(ValueError("bad"))[0] == 'client'
+    assert raise_for_provider('elevenlabs', fake_response(200)).status_code == 200
+
+
+def test_backoff_grows_with_jitter_and_honors_retry_after():
+    for attempt in range(5):
+        assert 0 <= backoff_delay(attempt, 0.5, 4.0) <= min(4.0, 0.5 * 2 ** attempt)
+    assert 10.0 <= backoff_delay(0, 0.5, 4.0, retry_after=10.0) <= 10.5
+
+
+def test_transient_errors_retry_and_bad_requests_do_not():
+    resilience = Resilience('elevenlabs', retries=3, base_delay=0.01)
+    fn, calls = flaky(http_error(503), http_error(429, '', {'Retry-After': '0'}), b'audio')
+    assert resilience.call(fn) == b'audio' and len(calls) == 3
+    assert resilience.stats['retries'] == 2 and resilience.breaker.state == 'closed'
+
+    fn, calls = flaky(http_error(422, 'text too long'))
+    try:
+        resilience.call(fn)
+        assert False, "should have raised"
+    except ProviderError as e:
+        assert e.kind == 'client' and len(calls) == 1
+
+    # A Retry-After longer than we're willing to wait ends the run now
+    fn, calls = flaky(http_error(429, '', {'Retry-After': '600'}), b'audio')
+    try:
+        resilience.call(fn)
+        assert False, "should have raised"
+    except ProviderError as e:
+        assert e.kind == 'rate_limit' and e.retry_after == 600.0 and len(calls) == 1
+
+
+def test_breaker_opens_rejects_and_half_opens():
+    breaker = CircuitBreaker('openai', failure_threshold=2, reset_after=0.2)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    time.sleep(0.25)
+    assert breaker.state == 'half_open'
+    assert breaker.allow() and not breaker.allow()  # a single trial call
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    time.sleep(0.25)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_open_circuit_fails_fast_or_is_waited_out():
+    resilience = Resilience('elevenlabs', retries=1, base_delay=0.01, failure_threshold=2, reset_after=0.3)
+    fn, calls = flaky(requests.ConnectionError("reset"))
+    try:
+        resilience.call(fn)
+    except ProviderError as e:
+        assert e.kind == 'network'
+    assert resilience.breaker.state == 'open'
+
+    try:
+        resilience.call(lambda: b'audio')
+        assert False, "should have raised"
+    except CircuitOpenError as e:
+        assert e.kind == 'circuit_open' and 0 < e.retry_after <= 0.3
+
+    # A scheduled run willing to wait gets through once the trial is allowed
+    start = time.monotonic()
+    assert resilience.call(lambda: b'audio', wait_open=1.0) == b'audio'
+    assert 0.1 < time.monotonic() - start < 0.6 and resilience.breaker.state == 'closed'
+
+
+def test_quota_errors_trip_the_breaker_at_once():
+    resilience = Resilience('openai', retries=3, base_delay=0.01, quota_cooldown=60)
+    fn, calls = flaky(http_error(429, 'You exceeded your current quota'))
+    try:
+        resilience.call(fn)
+    except ProviderError as e:
+        assert e.kind == 'quota'
+    assert len(calls) == 1 and resilience.breaker.seconds_until_retry() > 50
+
+
+def test_ledger_tracks_plan_limits_and_persists():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.json')
+        today = lambda: date(2026, 10, 19)
+        ledger = QuotaLedger(path, limits={('elevenlabs', 'characters'): 10000}, clock=today)
+        ledger.record('elevenlabs', 'characters', 4000)
+        ledger.record('openai', 'tokens', 1500)
+        assert ledger.remaining('elevenlabs', 'characters') == 6000
+        assert ledger.remaining('openai', 'tokens') is None
+        assert ledger.can_spend('elevenlabs', 'characters', 6000)
+        assert not ledger.can_spend('elevenlabs', 'characters', 6001)
+        assert ledger.daily_allowance('elevenlabs', 'characters', date(2026, 10, 31)) == 6000
+        assert ledger.daily_allowance('elevenlabs', 'characters', date(2026, 10, 1)) == 6000 // 31
+
+        reloaded = QuotaLedger(path, clock=today)
+        assert reloaded.spent('elevenlabs', 'characters') == 4000
+        assert reloaded.spent_today('elevenlabs', 'characters') == 4000
+
+        # Last month's usage doesn't count against this month
+        with open(path, 'w') as f:
+            json.dump({'period': '1999-01', 'used': {'openai': {'tokens': 99}}}, f)
+        assert QuotaLedger(path, clock=today).spent('openai', 'tokens') == 0
+
+
+def test_ledgers_in_two_processes_add_up():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ledger.json')
+        limits = {('elevenlabs', 'characters'): 10000}
+        dashboard, scheduler = QuotaLedger(path, limits=limits), QuotaLedger(path, limits=limits)
+        dashboard.record('elevenlabs', 'characters', 3000)
+        scheduler.record('elevenlabs', 'characters', 4000)
+        dashboard.record('elevenlabs', 'characters', 1000)
+        assert scheduler.spent('elevenlabs', 'characters') == 8000
+        assert not dashboard.can_spend('elevenlabs', 'characters', 2001)
+        assert sorted(os.listdir(directory)) == ['ledger.json', 'ledger.json.lock']
+
+        # A damaged file doesn't wipe out the month's counts
+        with open(path, 'w') as f:
+            f.write('{"period": ')
+        assert dashboard.spent('elevenlabs', 'characters') == 8000
+
+
+def test_ledger_paces_spending_by_day():
+    days = [date(2026, 10, 1)]
+    ledger = QuotaLedger(None, limits={('openai', 'tokens'): 31000}, clock=lambda: days[0])
+    assert ledger.daily_allowance('openai', 'tokens') == 1000
+    ledger.record('openai', 'tokens', 600)
+    # Today's share is fixed at the start of the day, not shrunk by today's spending
+    assert ledger.daily_allowance('openai', 'tokens') == 1000
+    assert ledger.within_daily_allowance('openai', 'tokens', 400)
+    assert not ledger.within_daily_allowance('openai', 'tokens', 401)
+    assert ledger.within_daily_allowance('elevenlabs', 'characters', 10 ** 9)  # no limit set
+
+    days[0] = date(2026, 10, 2)
+    assert ledger.spent_today('openai', 'tokens') == 0
+    assert ledger.daily_allowance('openai', 'tokens') == (31000 - 600) // 30
+
+
+def test_llm_client_retries_rate_limits_and_records_tokens():
+    server = start_server(delay=0.01)
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = QuotaLedger(os.path.join(directory, 'ledger.json'))
+        client = LLMClient('test-key', base_url=server.base_url, ledger=ledger,
+                           resilience=Resilience('openai', retries=3, base_delay=0.01))
+        try:
+            server.rate_limited = 2
+            assert client.complete([{'role': 'user', 'content': 'mando'}], 'gpt-test') == 'script for mando'
+            assert server.requests == 3 and client.resilience.stats['retries'] == 2
+            assert ledger.spent('openai', 'tokens') == 2
+
+            try:
+                client.complete([{'role': 'user', 'content': 'quota'}], 'gpt-test')
+                assert False, "should have raised"
+            except ProviderError as e:
+                assert e.kind == 'quota' and e.status == 429
+            assert server.requests == 4
+        finally:
+            client.close()
+            server.shutdown()
+
+
+def test_llm_client_keeps_to_the_ledger():
+    server = start_server(delay=0.01)
+    messages = [{'role': 'user', 'content': 'mando'}]
+    days = [date(2026, 10, 1)]
+    ledger = QuotaLedger(None, limits={('openai', 'tokens'): 31 * 120}, clock=lambda: days[0])
+    client = LLMClient('test-key', base_url=server.base_url, ledger=ledger, paced=True,
+                       resilience=Resilience('openai', retries=0))
+    try:
+        assert client.complete(messages, 'gpt-test', max_tokens=50) == 'script for mando'
+        ledger.record('openai', 'tokens', 70)  # an earlier run today
+        # A paced client stops at today's share of the month before calling the API
+        try:
+            client.complete(messages, 'gpt-test', max_tokens=50)
+            assert False, "should have raised"
+        except ProviderError as e:
+            assert e.kind == 'quota' and "today's share" in str(e)
+        assert server.requests == 1
+
+        # Unpaced callers may use the rest of the month, but not more
+        client.paced = False
+        assert client.complete(messages, 'gpt-test', max_tokens=100) == 'script for mando'
+        try:
+            list(client.stream(messages, 'gpt-test', max_tokens=31 * 120))
+            assert False, "should have raised"
+        except ProviderError as e:
+            assert e.kind == 'quota' and 'left this month' in str(e)
+        assert server.requests == 2
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test that stage directions stay out of TTS and are rendered from local clips
+"""
+
+import os
+import tempfile
+
+from mp3_tools import frame_header, iter_frames, silence, trim_mp3
+from script_cues import CueFilter, SoundLibrary, narration, split_cues
+from speech_stream import narrate
+from tts_engine import TTSEngine
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, joint stereo: 417-byte frames
+HEADER = b'\xff\xfb\x90\x44'
+FRAME_BYTES = 417
+FRAME_SECONDS = 1152 / 44100
+
+
+def frames(count, fill):
+    return (HEADER + bytes([fill]) * (FRAME_BYTES - 4)) * count
+
+
+SCRIPT = """[UPBEAT INTRO MUSIC FADES IN - 3 seconds]
+
+[SOUND EFFECT: Digital beep]
+
+Good morning! I'm Mark, and this is your Mando Minutes briefing.
+
+[INTRO MUSIC FADES OUT]
+
+**MARKET UPDATE 1:**
+
+Bitcoin rose 3% [sic] overnight.
+
+[PAUSE FOR EMPHASIS - 1 second]
+
+[TRANSITION SOUND: Whoosh effect]
+
+Stay sharp, stay profitable.
+
+[OUTRO MUSIC BUILDS AND FADES OUT - 3 seconds]
+
+[END]"""
+
+
+def sound_folder(directory):
+    for name, fill in [('intro', 1), ('effect', 2), ('effect_digital_beep', 3),
+                       ('transition', 4), ('outro', 5)]:
+        with open(os.path.join(directory, f"{name}.mp3"), 'wb') as f:
+            f.write(frames(2, fill))
+    return SoundLibrary(directory)
+
+
+def test_cues_are_parsed_out_of_the_narration():
+    parts = split_cues(SCRIPT)
+    kinds = [part['kind'] if part['type'] == 'cue' else 'speech' for part in parts]
+    assert kinds == ['intro', 'effect', 'speech', 'fade', 'speech', 'pause', 'transition',
+                     'speech', 'outro', 'end']
+    assert parts[0]['seconds'] == 3 and parts[1]['description'] == 'Digital beep'
+    assert parts[5]['seconds'] == 1
+
+    spoken = narration(SCRIPT)
+    assert '[' not in spoken.replace('[sic]', '') and '*' not in spoken
+    assert spoken.startswith("Good morning!") and "MARKET UPDATE 1:" in spoken
+    assert len(spoken) < len(SCRIPT) * 0.6
+
+
+def test_stream_filter_holds_back_a_cue_split_across_deltas():
+    text = "Hello there. [SOUND EFFECT: Market bell]\n**Next** up [sic]."
+    cue_filter = CueFilter()
+    pieces = []
+    for i in range(0, len(text), 4):
+        pieces.extend(cue_filter.feed(text[i:i + 4]))
+    pieces.extend(cue_filter.flush())
+    cues = [piece for piece in pieces if isinstance(piece, dict)]
+    spoken = ''.join(piece for piece in pieces if isinstance(piece, str))
+    assert [cue['label'] for cue in cues] == ['SOUND EFFECT']
+    assert spoken == "Hello there. \nNext up [sic]."
+
+
+def test_render_voices_only_narration_and_splices_clips():
+    voiced = []
+
+    def synthesize(text, previous_text=None, next_text=None):
+        voiced.append(text)
+        return frames(3, 9)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = TTSEngine(synthesize, sounds=sound_folder(directory))
+        audio = engine.render(SCRIPT)
+
+    assert voiced and not any('[' in text.replace('[sic]', '') for text in voiced)
+    assert engine.last_stats['cues'] == 7
+    assert engine.last_stats['billed_characters'] == sum(len(text) for text in voiced)
+
+    fills = [audio[offset + 4] for offset, _ in iter_frames(audio)]
+    # intro, the description-specific beep, speech, (silent fade) speech,
+    # a second of silence, whoosh, speech, outro
+    pause = round(1 / FRAME_SECONDS)
+    assert fills == [1, 1, 3, 3] + [9] * 6 + [0] * pause + [4, 4] + [9] * 3 + [5, 5]
+
+
+def test_pauses_are_silent_frames_and_beds_are_trimmed():
+    quiet = silence(0.5, like=frames(1, 7))
+    headers = [header for _, header in iter_frames(quiet)]
+    assert len(headers) == round(0.5 / FRAME_SECONDS) and headers[0]['bitrate'] == 128000
+    assert set(quiet[4:FRAME_BYTES]) == {0}
+    assert frame_header(silence(1)[:4])['sample_rate'] == 44100
+
+    assert len(trim_mp3(frames(100, 1), 0.1)) == 4 * FRAME_BYTES
+
+
+def test_streaming_narration_never_voices_cues():
+    voiced = []
+
+    def synthesize(text, previous_text=None):
+        voiced.append(text)
+        return frames(1, 9)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sounds = sound_folder(directory)
+        path = os.path.join(directory, 'out.mp3')
+        deltas = [SCRIPT[i:i + 7] for i in range(0, len(SCRIPT), 7)]
+        script, report = narrate(deltas, synthesize, path, sounds=sounds)
+        with open(path, 'rb') as f:
+            audio = f.read()
+
+    assert script == SCRIPT and report['cues'] == 7
+    assert voiced and not any('[' in text.replace('[sic]', '') for text in voiced)
+    fills = [audio[offset + 4] for offset, _ in iter_frames(audio)]
+    assert fills[:4] == [1, 1, 3, 3] and fills[-2:] == [5, 5]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
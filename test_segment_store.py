@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Test per-story segments: a corrected rerun re-voices only the changed story
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from mp3_tools import iter_frames
+from segment_store import SegmentStore, episode_id
+from script_cues import split_stories
+from tts_engine import TTSEngine
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz: 417-byte frames
+HEADER = b'\xff\xfb\x90\x44'
+FRAME_BYTES = 417
+
+
+def frame(fill):
+    return HEADER + bytes([fill]) * (FRAME_BYTES - 4)
+
+
+def script(*stories):
+    body = "\n\n[TRANSITION SOUND: Whoosh]\n\n".join(stories)
+    return f"[INTRO MUSIC]\n\nGood morning! I'm Mark with your briefing.\n\n[TRANSITION SOUND: Whoosh]\n\n{body}"
+
+
+STORIES = [f"Story {n} headline.\n\nStory {n} has three sentences of detail. It matters. Here is why."
+           for n in range(1, 6)]
+
+
+class CountingVoice:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.voiced = []
+
+    def __call__(self, text, previous_text=None, next_text=None):
+        with self.lock:
+            self.voiced.append(text)
+        # Tag each chunk's frames with its story number (0 for the intro)
+        number = int(text.split()[1]) if text.startswith("Story") else 0
+        return frame(number) * 3
+
+
+def fills(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [data[offset + 4] for offset, _ in iter_frames(data)]
+
+
+def test_stories_split_at_transitions():
+    stories = split_stories(script(*STORIES[:2]))
+    assert [story['title'] for story in stories] == ["Intro", "Story 1 headline.", "Story 2 headline."]
+    assert stories[0]['script'].startswith("[INTRO MUSIC]")
+    assert episode_id("Mando Minutes", datetime(2026, 10, 19)) == "mando_minutes-2026-10-19"
+
+
+def test_rerun_revoices_only_the_changed_story():
+    voice = CountingVoice()
+    engine = TTSEngine(voice, max_chars=2000)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SegmentStore(os.path.join(directory, 'segments'))
+        path = os.path.join(directory, 'episode.mp3')
+
+        first = store.render(engine, 'mando-2026-10-19', script(*STORIES), path, tags={'title': 'Mando'})
+        assert first['revoiced'] == 6 and first['reused'] == 0
+        full_bill = first['billed_characters']
+        before = fills(path)
+
+        voice.voiced.clear()
+        corrected = list(STORIES)
+        corrected[2] = corrected[2].replace("It matters.", "It matters a lot.")
+        again = store.render(engine, 'mando-2026-10-19', script(*corrected), path, tags={'title': 'Mando'})
+
+        assert again['revoiced'] == 1 and again['reused'] == 5
+        assert voice.voiced and all(text.startswith("Story 3") for text in voice.voiced)
+        assert again['billed_characters'] < full_bill / 4
+        assert fills(path) == before  # same story order, re-stitched
+
+        # The old version of story 3 is dropped; one segment per story remains
+        segments = [name for name in os.listdir(store.episode_dir('mando-2026-10-19')) if name.endswith('.mp3')]
+        assert len(segments) == 6
+        assert [story['title'] for story in store.load('mando-2026-10-19')['stories']][:2] == \
+            ["Intro", "Story 1 headline."]
+
+        # An unchanged rerun voices nothing at all
+        voice.voiced.clear()
+        assert store.render(engine, 'mando-2026-10-19', script(*corrected), path)['revoiced'] == 0
+        assert voice.voiced == []
+
+
+def mando_script(second_story):
+    """A cue-free script in the shape create_mando_script writes"""
+    return f"""Good morning! This is your Mando Minutes podcast for Monday, October 19, 2026.
+
+I'm your AI assistant with today's crypto and market updates.
+
+Let's start with crypto news.
+
+Bitcoin tops $70,000 as ETF demand returns
+
+Bitcoin rose 3% overnight after the largest one-day ETF inflow since March...
+
+Ethereum staking yields slip
+
+{second_story}
+
+That's all for today's Mando Minutes.
+
+Check your email for all the links. Have a great day!"""
+
+
+def test_cue_free_scripts_split_at_headings_and_paragraphs():
+    stories = split_stories(mando_script("Yields fell to 2.9% as more validators joined..."))
+    assert [story['title'] for story in stories] == [
+        "Intro", "Bitcoin tops $70,000 as ETF demand returns", "Ethereum staking yields slip"]
+    assert all(story['chapter'] for story in stories)
+    assert stories[2]['script'].endswith("Have a great day!")
+
+    # No headings at all: one story per paragraph, one chapter for the lot
+    plain = split_stories("Welcome to the show.\n\nFirst point here.\n\nSecond point here.")
+    assert [story['script'] for story in plain] == ["Welcome to the show.", "First point here.",
+                                                    "Second point here."]
+    assert [story['chapter'] for story in plain] == [True, False, False]
+
+
+def test_cue_free_correction_revoices_one_story():
+    voice = CountingVoice()
+    engine = TTSEngine(voice, max_chars=2000)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SegmentStore(os.path.join(directory, 'segments'))
+        path = os.path.join(directory, 'episode.mp3')
+        assert store.render(engine, 'mando', mando_script("Yields fell to 2.9%..."), path)['revoiced'] == 3
+
+        voice.voiced.clear()
+        again = store.render(engine, 'mando', mando_script("Yields fell to 2.8%..."), path)
+        assert again['revoiced'] == 1 and again['reused'] == 2
+        assert voice.voiced and all(text.startswith("Ethereum staking") for text in voice.voiced)
+
+
+def test_different_episodes_render_side_by_side():
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def slow_voice(text, previous_text=None, next_text=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return frame(1) * 3
+
+    engine = TTSEngine(slow_voice, max_workers=1, max_chars=2000)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SegmentStore(os.path.join(directory, 'segments'))
+        threads = [threading.Thread(target=store.render,
+                                    args=(engine, show, script(STORIES[0]), os.path.join(directory, f"{show}.mp3")))
+                   for show in ('mando', 'puck')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak[0] == 2
+        assert os.path.exists(os.path.join(directory, 'mando.mp3'))
+        assert os.path.exists(os.path.join(directory, 'puck.mp3'))
+
+
+def test_episodes_are_kept_apart_and_pruned():
+    voice = CountingVoice()
+    engine = TTSEngine(voice, max_chars=2000)
+    with tempfile.TemporaryDirectory() as directory:
+        store = SegmentStore(os.path.join(directory, 'segments'), keep_days=1)
+        path = os.path.join(directory, 'episode.mp3')
+        store.render(engine, 'old', script(STORIES[0]), path)
+        store.render(engine, 'new', script(STORIES[0]), path)
+        assert store.load('new')['stories'] and store.load('old')['stories']
+
+        stale = os.path.join(store.episode_dir('old'), 'manifest.json')
+        os.utime(stale, (0, 0))
+        store.prune()
+        assert not os.path.exists(store.episode_dir('old')) and os.path.exists(store.episode_dir('new'))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test in-flight request coalescing across concurrent pipelines
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import article_cache
+import domain_outcomes
+import fetch_scheduler
+import singleflight
+from link_following_agent import LinkFollowingNewsletterAgent
+from singleflight import SingleFlight
+
+STORY = '<p>' + ' '.join(f"Sentence {i} about markets, flows and prices." for i in range(30)) + '</p>'
+
+
+def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(5)
+    results = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return 'article'
+
+    def caller():
+        barrier.wait()
+        results.append(flight.do('https://example.com/story', work))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == 'article' for result, _ in results)
+    assert flight.stats() == {'leaders': 1, 'followers': 4}
+    assert flight.in_flight() == 0
+
+
+def test_errors_and_timeouts_reach_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    leader = threading.Thread(target=lambda: _swallow(flight.do, 'k', failing))
+    leader.start()
+    started.wait()
+    try:
+        flight.do('k', lambda: 'never')
+        assert False, "follower should see the leader's error"
+    except ValueError:
+        pass
+    leader.join()
+
+    slow = threading.Thread(target=lambda: flight.do('slow', lambda: time.sleep(0.3)))
+    slow.start()
+    time.sleep(0.05)
+    try:
+        flight.do('slow', lambda: None, timeout=0.05)
+        assert False, "follower should time out"
+    except TimeoutError:
+        pass
+    slow.join()
+
+    # Once finished, the key runs fresh again
+    assert flight.do('k', lambda: 'again') == ('again', False)
+
+
+def test_processes_take_turns_through_lock_files():
+    with tempfile.TemporaryDirectory() as directory:
+        # Separate instances stand in for the scheduler's and a manual run's process
+        scheduler, manual = SingleFlight(directory), SingleFlight(directory)
+        cache, downloads = {}, []
+
+        def fetch():
+            if 'story' in cache:
+                return 'cached ' + cache['story']
+            downloads.append(1)
+            time.sleep(0.2)
+            cache['story'] = 'article'
+            return 'article'
+
+        results = {}
+        first = threading.Thread(target=lambda: results.setdefault('scheduler', scheduler.do('story', fetch)))
+        first.start()
+        time.sleep(0.05)
+        results['manual'] = manual.do('story', fetch)
+        first.join()
+
+        assert len(downloads) == 1
+        assert results == {'scheduler': ('article', False), 'manual': ('cached article', False)}
+        assert os.listdir(directory) == []  # lock files are cleaned up
+
+        # A lock held past the timeout is a TimeoutError, like a slow leader
+        started = threading.Event()
+        slow = threading.Thread(target=lambda: scheduler.do('slow', lambda: started.set() or time.sleep(0.3)))
+        slow.start()
+        started.wait()
+        try:
+            manual.do('slow', lambda: None, timeout=0.05)
+            assert False, "should have timed out"
+        except TimeoutError:
+            pass
+        slow.join()
+
+
+def _swallow(func, *args):
+    try:
+        func(*args)
+    except ValueError:
+        pass
+
+
+class SlowResponse:
+    def __init__(self, url):
+        self.url = url
+        self.status_code = 200
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'}
+        self.encoding = 'utf-8'
+        self.content = f'<html><head></head><body><article>{STORY}</article></body></html>'.encode()
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=8192):
+        yield self.content
+
+    def close(self):
+        pass
+
+
+class CountingSession:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        time.sleep(0.2)
+        return SlowResponse(url)
+
+
+def test_two_pipelines_share_a_download():
+    with tempfile.TemporaryDirectory() as directory:
+        session = CountingSession()
+        saved = (fetch_scheduler._shared_scheduler, article_cache._shared_cache,
+                 domain_outcomes._shared_outcomes, singleflight._shared_flight)
+        fetch_scheduler._shared_scheduler = fetch_scheduler.FetchScheduler(
+            session=session, per_domain_rate=100, per_domain_burst=10)
+        article_cache._shared_cache = article_cache.ArticleCache(directory + '/articles')
+        domain_outcomes._shared_outcomes = domain_outcomes.DomainOutcomes(directory + '/outcomes.json')
+        singleflight._shared_flight = SingleFlight()
+        try:
+            mando = LinkFollowingNewsletterAgent.__new__(LinkFollowingNewsletterAgent)
+            puck = LinkFollowingNewsletterAgent.__new__(LinkFollowingNewsletterAgent)
+            mando.headers = puck.headers = {}
+            # Domain already learned as plain HTML so no representation probing
+            domain_outcomes._shared_outcomes.set_preference('news.com', 'representation', 'html')
+
+            outputs = {}
+            threads = [
+                threading.Thread(target=lambda: outputs.setdefault('mando', mando.fetch_articles_within(
+                    ['https://news.com/story?utm_source=mando'], budget=2.0, hedge_after=5))),
+                threading.Thread(target=lambda: outputs.setdefault('puck', puck.fetch_articles_within(
+                    ['https://www.news.com/story'], budget=2.0, hedge_after=5))),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert len(session.calls) == 1
+            outcomes = outputs['mando'][1] + outputs['puck'][1]
+            assert [o['status'] for o in outcomes] == ['ok', 'ok']
+            assert sorted(o['shared'] for o in outcomes) == [False, True]
+            assert all('shared' not in a for a in outputs['mando'][0] + outputs['puck'][0])
+        finally:
+            (fetch_scheduler._shared_scheduler, article_cache._shared_cache,
+             domain_outcomes._shared_outcomes, singleflight._shared_flight) = saved
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test sentence chunking of token streams and ordered incremental narration
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from llm_client import LLMClient
+from mp3_tools import frame_header, iter_frames
+from script_cues import SoundLibrary
+from speech_stream import SentenceChunker, narrate, strip_id3
+from test_llm_client import start_server
+
+
+def feed_all(chunker, deltas):
+    segments = []
+    for delta in deltas:
+        segments.extend(chunker.feed(delta))
+    return segments + chunker.flush()
+
+
+def test_chunker_cuts_at_sentence_ends_only():
+    text = ("Good morning from Washington. Bitcoin is at 71.4 thousand dollars today. "
+            "Mr. Powell spoke at 2 p.m. and markets moved! What comes next? We'll see.")
+    chunker = SentenceChunker(first_min_chars=20, min_chars=60)
+    segments = feed_all(chunker, [text[i:i + 3] for i in range(0, len(text), 3)])
+    assert segments[0] == "Good morning from Washington."
+    assert ' '.join(segments) == text
+    assert "71.4" in segments[1] and not segments[1].endswith("71.")
+    assert not any(segment.endswith(("Mr.", "p.m.")) for segment in segments)
+
+
+def test_chunker_keeps_cue_lines_and_caps_run_ons():
+    chunker = SentenceChunker(first_min_chars=5, min_chars=5, max_chars=50)
+    segments = feed_all(chunker, ["[INTRO MUSIC FADES IN]\n", "Good morning", "!\n",
+                                  "word " * 30])
+    assert segments[:2] == ["[INTRO MUSIC FADES IN]", "Good morning!"]
+    assert all(len(segment) <= 50 for segment in segments)
+
+
+def test_strip_id3_removes_only_the_tag():
+    tag = b'ID3\x04\x00\x00\x00\x00\x00\x05' + b'12345'
+    assert strip_id3(tag + b'\xff\xfbframes') == b'\xff\xfbframes'
+    assert strip_id3(b'\xff\xfbframes') == b'\xff\xfbframes'
+
+
+def test_narrate_appends_segments_in_order_while_text_arrives():
+    def deltas():
+        for sentence in ["First sentence is here. ", "Second one follows. ",
+                         "Third is the longest of them all. ", "Done."]:
+            time.sleep(0.05)
+            yield sentence
+
+    def synthesize(text, previous_text=None):
+        # Later segments finish sooner, so ordering has to be enforced
+        time.sleep(0.2 if text.startswith('First') else 0.02)
+        return f"<{text}|{previous_text}>".encode()
+
+    appended = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'out.mp3')
+        script, report = narrate(deltas(), synthesize, path, on_segment=lambda i, audio: appended.append(i),
+                                 chunker=SentenceChunker(first_min_chars=10, min_chars=10))
+        with open(path, 'rb') as f:
+            audio = f.read().decode()
+
+    assert script == "First sentence is here. Second one follows. Third is the longest of them all. Done."
+    assert appended == [0, 1, 2, 3] and report['segments'] == 4
+    assert audio.startswith("<First sentence is here.|None><Second one follows.|First sentence is here.>")
+    assert audio.endswith("<Done.|Third is the longest of them all.>")
+
+
+def test_pauses_match_the_voice_format():
+    # MPEG-1 Layer III, 128 kbps, 48 kHz: not the default 44.1 kHz
+    voice_frame = b'\xff\xfb\x94\x44' + bytes(380)
+
+    def synthesize(text, previous_text=None):
+        time.sleep(0.05)
+        return voice_frame * 3
+
+    deltas = ["[PAUSE]\n", "Good morning, here is the news.\n", "[PAUSE: 2 seconds]\n", "Back after the break."]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'out.mp3')
+        _, report = narrate(iter(deltas), synthesize, path, sounds=SoundLibrary(directory),
+                            chunker=SentenceChunker(first_min_chars=10, min_chars=10))
+        with open(path, 'rb') as f:
+            audio = f.read()
+
+    assert report['cues'] == 2 and report['segments'] == 4
+    rates = {frame_header(audio, offset)['sample_rate'] for offset, _ in iter_frames(audio)}
+    assert rates == {48000}
+
+
+def test_first_audio_arrives_long_before_the_script_ends():
+    server = start_server(delay=0.01, token_delay=0.02)
+    client = LLMClient('test-key', base_url=server.base_url, max_retries=0)
+    prompt = ' '.join(f"Sentence {i} has a few words." for i in range(15))
+    lock = threading.Lock()
+    calls = []
+
+    def synthesize(text, previous_text=None):
+        with lock:
+            calls.append(text)
+        time.sleep(0.05)
+        return b'\xff\xfb' + text.encode()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            script, report = narrate(client.stream([{'role': 'user', 'content': prompt}], 'gpt-test'),
+                                     synthesize, os.path.join(directory, 'out.mp3'))
+        assert script == f"script for {prompt}"
+        assert report['segments'] == len(calls) > 1
+        assert report['first_audio_seconds'] < report['script_seconds'] / 2
+        assert report['total_seconds'] - report['script_seconds'] < 0.5
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
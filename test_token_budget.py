@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test token counting, prompt compression, duration-based budgets and usage logging
+"""
+
+import json
+import os
+import tempfile
+
+from llm_client import LLMClient
+from test_llm_client import start_server
+from token_budget import (UsageLog, call_cost, compress_text, count_message_tokens, count_tokens,
+                          max_tokens_for_duration)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'newsletter_corpus')
+
+
+def test_count_tokens_tracks_real_tokenizer_scale():
+    assert count_tokens("") == 0
+    assert count_tokens("Bitcoin rose 3% today.") in range(5, 9)
+    with open(os.path.join(CORPUS_DIR, 'puck_long_issue.txt'), 'r', encoding='utf-8') as f:
+        text = f.read()
+    # English prose runs about 1.3 tokens per word under cl100k/o200k
+    words = len(text.split())
+    assert 1.1 * words < count_tokens(text) < 1.6 * words
+    messages = [{'role': 'system', 'content': 'Be brief.'}, {'role': 'user', 'content': text}]
+    assert count_message_tokens(messages) > count_tokens(text)
+
+
+def test_compress_text_drops_links_footers_and_repeats():
+    body = ("View in browser: https://example.com/p?utm=1\r\n\r\n"
+            "Read [the full story](https://example.com/story) today.\r\n\r\n\r\n"
+            "Second paragraph.\r\nUnsubscribe | Manage your preferences")
+    assert compress_text(body) == "Read the full story today.\n\nSecond paragraph."
+
+    sponsor = "This issue is brought to you by Acme Ledger, the books your CFO will love."
+    body = '\n\n'.join([sponsor, "Story one.", "Read more", "---", "Story two.", "Read more",
+                        sponsor, "Story three.", "Share", "Story four.", "Read More"])
+    compressed = compress_text(body)
+    assert compressed.count(sponsor) == 1
+    assert "Read more" not in compressed and "Share" not in compressed
+    assert "---" in compressed and "Story four." in compressed
+
+
+def test_compress_text_shrinks_real_newsletters():
+    for filename in ('puck_long_issue.txt', 'mando_minutes_long.txt', 'business_briefing_long.txt'):
+        with open(os.path.join(CORPUS_DIR, filename), 'r', encoding='utf-8') as f:
+            text = f.read()
+        compressed = compress_text(text)
+        assert count_tokens(compressed) < count_tokens(text)
+        assert 'https://' not in compressed and 'Unsubscribe' not in compressed
+
+
+def test_max_tokens_scale_with_duration():
+    assert max_tokens_for_duration(5) == 1300
+    assert max_tokens_for_duration(8) == 2050
+    assert max_tokens_for_duration(1) < max_tokens_for_duration(3) < max_tokens_for_duration(5)
+
+
+def test_usage_log_records_each_call_and_totals():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'usage.jsonl')
+        log = UsageLog(path)
+        log.record('puck_news', 'gpt-4o-mini', 2000, 1000, 4.2)
+        log.record('puck_news', 'gpt-4o-mini', 2000, 1000, 0.0, cached=True)
+        log.record('condense', 'local-model', 500, 100, 1.0)
+        with open(path) as f:
+            entries = [json.loads(line) for line in f]
+
+    assert [entry['label'] for entry in entries] == ['puck_news', 'puck_news', 'condense']
+    assert entries[0]['cost_usd'] == call_cost('gpt-4o-mini', 2000, 1000) == 0.0009
+    assert entries[1]['cost_usd'] == 0.0 and entries[2]['cost_usd'] is None
+    summary = log.summary()
+    assert summary['puck_news']['calls'] == 2 and summary['puck_news']['prompt_tokens'] == 4000
+    assert call_cost('gpt-4o-2024-08-06', 1_000_000, 0) == 2.5
+
+
+def test_client_reports_tokens_per_call():
+    server = start_server(delay=0.01)
+    with tempfile.TemporaryDirectory() as directory:
+        log = UsageLog(os.path.join(directory, 'usage.jsonl'))
+        client = LLMClient('test-key', base_url=server.base_url, max_retries=0, usage_log=log)
+        try:
+            client.complete([{'role': 'user', 'content': 'mando'}], 'gpt-4o-mini', label='mando_minutes')
+            list(client.stream([{'role': 'user', 'content': 'puck news'}], 'gpt-4o-mini', label='puck_news'))
+        finally:
+            client.close()
+            server.shutdown()
+
+    summary = log.summary()
+    # The API's own usage block when present, local counts when the stream has none
+    assert summary['mando_minutes']['prompt_tokens'] == 1
+    assert summary['puck_news']['completion_tokens'] == count_tokens('script for puck news')
+    assert client.stats['completion_tokens'] == 1 + count_tokens('script for puck news')
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
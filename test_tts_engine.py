@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test sentence-aware script chunking, parallel synthesis and gapless MP3 joins
+"""
+
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from mp3_tools import MP3Writer, audio_frames, frame_header, iter_frames, join_mp3, strip_id3v1
+from tts_engine import TTSEngine, char_limit, split_script
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, joint stereo: 417-byte frames
+HEADER = b'\xff\xfb\x90\x44'
+FRAME_BYTES = 417
+
+
+def frame(fill=0):
+    return HEADER + bytes([fill]) * (FRAME_BYTES - 4)
+
+
+def info_frame():
+    # Xing/Info tag sits after the 32 bytes of stereo MPEG-1 side info
+    body = bytes(32) + b'Info' + bytes(FRAME_BYTES - 4 - 32 - 4)
+    return HEADER + body
+
+
+def fake_mp3(frames, fill=1, tagged=True):
+    id3 = b'ID3\x04\x00\x00\x00\x00\x00\x0a' + b'x' * 10
+    data = (id3 if tagged else b'') + info_frame() + b''.join(frame(fill) for _ in range(frames))
+    return data + (b'TAG' + bytes(125) if tagged else b'')
+
+
+SCRIPT = "\n\n".join(
+    f"Story {n}. " + " ".join(f"Sentence {n}.{i} explains what happened and why it matters to markets."
+                              for i in range(8))
+    for n in range(1, 9)
+)
+
+
+def test_frame_header_decodes_size_and_format():
+    header = frame_header(HEADER)
+    assert header['bitrate'] == 128000 and header['sample_rate'] == 44100
+    assert header['length'] == FRAME_BYTES and header['samples'] == 1152 and header['channels'] == 2
+    assert frame_header(b'\xff\xfb\xf0\x44') is None  # bad bitrate index
+    assert frame_header(b'ID3\x04') is None
+
+
+def test_frames_are_found_past_tags_and_junk():
+    data = b'junk\xff\xfbjunk' + frame() + frame() + frame()[:100]
+    offsets = [offset for offset, _ in iter_frames(data)]
+    assert offsets == [10, 10 + FRAME_BYTES]
+    assert strip_id3v1(b'audio' + b'TAG' + bytes(125)) == b'audio'
+
+
+def test_join_drops_tags_and_info_frames():
+    first, second = fake_mp3(3, fill=1), fake_mp3(2, fill=2)
+    joined = join_mp3([first, second])
+    assert len(joined) == 5 * FRAME_BYTES
+    assert joined == b''.join([frame(1)] * 3 + [frame(2)] * 2)
+    assert audio_frames(joined) == joined
+    assert b'Info' not in joined and b'ID3' not in joined and b'TAG' not in joined
+    # Non-MP3 bytes still come through in order
+    assert join_mp3([b'abc', b'def']) == b'abcdef'
+
+
+def test_split_script_respects_limits_and_boundaries():
+    chunks = split_script(SCRIPT, max_chars=1000)
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert ' '.join(' '.join(chunks).split()) == ' '.join(SCRIPT.split())
+    assert all(chunk.rstrip().endswith('.') for chunk in chunks)
+
+    run_on = "word " * 1000
+    assert all(len(chunk) <= 300 for chunk in split_script(run_on, max_chars=300))
+    assert char_limit('eleven_multilingual_v2') == 10000 and char_limit('unknown') == 5000
+
+
+def test_chunks_keep_every_worker_busy():
+    engine = TTSEngine(lambda *a, **k: b'', max_workers=4, max_chars=5000, min_chunk_chars=400)
+    chunks = engine.chunks(SCRIPT)
+    assert len(chunks) >= 4 and max(len(chunk) for chunk in chunks) < 5000
+    assert len(engine.chunks("Short line.")) == 1
+
+
+def test_render_runs_chunks_in_parallel_in_order():
+    lock = threading.Lock()
+    active, calls = [0, 0], []
+
+    def synthesize(text, previous_text=None, next_text=None):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+            calls.append((text, previous_text, next_text))
+        # Like TTS: a fixed overhead plus time per character
+        time.sleep(0.05 + len(text) * 0.0001)
+        with lock:
+            active[0] -= 1
+        return fake_mp3(2, fill=int(text.split()[1].split('.')[0]), tagged=False)
+
+    engine = TTSEngine(synthesize, max_workers=4, max_chars=1200)
+    audio = engine.render(SCRIPT)
+    parallel = engine.last_stats['seconds']
+    chunks = engine.chunks(SCRIPT)
+
+    assert active[1] == 4 and engine.last_stats['chunks'] == len(chunks)
+    assert len(audio) == 2 * len(chunks) * FRAME_BYTES
+    fills = [audio[i * FRAME_BYTES + 10] for i in range(0, 2 * len(chunks), 2)]
+    assert fills == sorted(fills)  # segments stitched in script order
+    by_text = {text: (previous, following) for text, previous, following in calls}
+    assert by_text[chunks[0]][0] is None and chunks[1].startswith(by_text[chunks[0]][1])
+    assert chunks[-2].endswith(by_text[chunks[-1]][0])
+
+    start = time.monotonic()
+    for chunk in chunks:
+        synthesize(chunk)
+    sequential = time.monotonic() - start
+    assert parallel < sequential * 0.6
+
+
+def test_render_to_streams_segments_to_disk_with_bounded_memory():
+    def stream(text, out, previous_text=None, next_text=None):
+        # A long chunk downloaded in small pieces, as from the streaming endpoint
+        out.write(fake_mp3(0, tagged=True)[:-128])
+        for _ in range(500):
+            out.write(frame(7))
+
+    engine = TTSEngine(stream=stream, max_workers=4, max_chars=400)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'podcast.mp3')
+        tracemalloc.start()
+        try:
+            stats = engine.render_to(SCRIPT, path)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            audio = f.read()
+
+    assert stats['bytes'] == size == stats['chunks'] * 500 * FRAME_BYTES
+    assert audio == frame(7) * (size // FRAME_BYTES)
+    assert size > 2 * 1024 * 1024 and peak < size / 10
+
+
+def test_failed_render_leaves_no_file_behind():
+    def stream(text, out, previous_text=None, next_text=None):
+        out.write(frame(1))
+        if 'Story 5' in text:
+            raise ConnectionError("reset mid-download")
+
+    engine = TTSEngine(stream=stream, max_chars=1200)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'podcast.mp3')
+        try:
+            engine.render_to(SCRIPT, path)
+            assert False, "expected the failed chunk to raise"
+        except ConnectionError:
+            pass
+        assert os.listdir(directory) == []
+
+
+def test_writer_copies_frames_from_a_memory_map():
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'segment.mp3')
+        with open(source, 'wb') as f:
+            f.write(fake_mp3(3, fill=4))
+        target = os.path.join(directory, 'joined.mp3')
+        with open(target, 'wb') as out:
+            writer = MP3Writer(out)
+            writer.append_file(source)
+            writer.append(fake_mp3(1, fill=5))
+            assert writer.finish() == 4 * FRAME_BYTES
+        with open(target, 'rb') as f:
+            assert f.read() == frame(4) * 3 + frame(5)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
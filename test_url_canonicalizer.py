@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test URL canonicalization and near-duplicate article collapsing
+"""
+
+from url_canonicalizer import (canonicalize_url, resolve_canonical, dedupe_urls,
+                               NearDuplicateDetector, collapse_duplicate_articles)
+
+STORY = (
+    "U.S.-listed spot bitcoin exchange-traded funds pulled in $602 million on Thursday, "
+    "the largest single-day haul in three weeks, even as the largest cryptocurrency slipped "
+    "about 1% to trade near $108,600. BlackRock's iShares Bitcoin Trust accounted for the bulk "
+    "of the flows, according to data compiled by Farside Investors, with Fidelity's FBTC and "
+    "Ark's ARKB adding smaller amounts. Ether ETFs recorded $148 million of net inflows, their "
+    "fourth straight day of gains, while analysts said the strong jobs report pushed yields higher."
+)
+
+
+def test_tracking_and_host_variants_collapse():
+    variants = [
+        "https://www.coindesk.com/markets/2025/07/07/btc-etfs/?utm_source=mando&utm_medium=email",
+        "http://coindesk.com/markets/2025/07/07/btc-etfs",
+        "https://coindesk.com/markets/2025/07/07/btc-etfs/amp/",
+        "https://amp.coindesk.com/markets/2025/07/07/btc-etfs#comments",
+        "https://www.coindesk.com//markets/2025/07/07/btc-etfs/?fbclid=abc&mc_cid=1",
+    ]
+    canonical = {canonicalize_url(url) for url in variants}
+    assert canonical == {"https://coindesk.com/markets/2025/07/07/btc-etfs"}
+    assert dedupe_urls(variants) == variants[:1]
+
+
+def test_meaningful_query_is_kept_and_sorted():
+    url = "https://example.com/article?b=2&utm_campaign=x&a=1"
+    assert canonicalize_url(url) == "https://example.com/article?a=1&b=2"
+
+
+def test_bad_ports_fall_back_to_the_raw_url():
+    assert canonicalize_url("http://a.com:99999/") == "http://a.com:99999/"
+    assert canonicalize_url("http://a.com:port/story") == "http://a.com:port/story"
+    assert canonicalize_url("http://www.a.com:8080/story/") == "https://a.com:8080/story"
+
+
+def test_rel_canonical_wins():
+    page = "https://finance.yahoo.com/news/bitcoin-etfs-602m-123.html?guccounter=1"
+    assert resolve_canonical(page, "/news/bitcoin-etfs-602m-123.html") == \
+        "https://finance.yahoo.com/news/bitcoin-etfs-602m-123.html"
+    assert resolve_canonical(page, "") == \
+        "https://finance.yahoo.com/news/bitcoin-etfs-602m-123.html"
+
+
+def test_syndicated_copy_is_near_duplicate():
+    detector = NearDuplicateDetector()
+    assert detector.add('reuters', STORY) is None
+    syndicated = "(Reuters) - " + STORY.replace("analysts said", "analysts noted")
+    assert detector.find_duplicate(syndicated) == 'reuters'
+    unrelated = (
+        "Senator Cynthia Lummis on Thursday introduced legislation that would exempt "
+        "cryptocurrency transactions under $300 from federal capital gains tax, a long-sought "
+        "change that supporters say would make it practical to use digital assets for everyday "
+        "purchases, while capping the exemption at five thousand dollars per year overall."
+    )
+    assert detector.find_duplicate(unrelated) is None
+
+
+def test_collapse_keeps_first_and_credits_duplicates():
+    articles = [
+        {'url': 'https://www.reuters.com/markets/btc-etfs/', 'content': STORY},
+        {'url': 'https://finance.yahoo.com/news/btc-etfs.html', 'content': "Reuters - " + STORY},
+        {'url': 'https://reuters.com/markets/btc-etfs?utm_source=x', 'content': "short"},
+        {'url': 'https://www.theblock.co/post/1', 'content': "Different story entirely."},
+    ]
+    kept = collapse_duplicate_articles(articles)
+    assert [a['url'] for a in kept] == [articles[0]['url'], articles[3]['url']]
+    assert kept[0]['duplicate_urls'] == [articles[1]['url'], articles[2]['url']]
+
+
+if __name__ == "__main__":
+    for test in (test_tracking_and_host_variants_collapse, test_meaningful_query_is_kept_and_sorted,
+                 test_bad_ports_fall_back_to_the_raw_url,
+                 test_rel_canonical_wins, test_syndicated_copy_is_near_duplicate,
+                 test_collapse_keeps_first_and_credits_duplicates):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test warm-up scheduling, warm mail connections and feed prefetching
+"""
+
+import tempfile
+
+import alternate_representations
+import article_cache
+import domain_outcomes
+import fetch_scheduler
+import warmup as warmup_module
+from disk_cache import DiskCache
+from mail_pool import MailPool
+from warmup import Warmup, warmup_times
+
+STORY = ' '.join(f"word{i}" for i in range(600))
+
+
+def test_warmup_times_precede_window_and_check():
+    mando = {'arrival_time': {'start_hour': 7, 'end_hour': 8}, 'check_time': '07:45'}
+    assert warmup_times(mando, lead_minutes=5) == ['06:55', '07:40']
+    assert warmup_times({'check_time': '00:02'}, lead_minutes=5) == ['23:57']
+    assert warmup_times({}) == []
+
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+        self.noops = 0
+
+    def noop(self):
+        self.noops += 1
+        if not self.alive:
+            raise OSError("connection reset")
+
+    def logout(self):
+        self.closed = True
+
+    quit = logout
+
+
+def test_mail_pool_hands_out_only_live_connections():
+    pool = MailPool(max_idle=60)
+    dead, live = FakeConnection(alive=False), FakeConnection()
+    pool.put('imap', live)
+    pool.put('imap', dead)
+    assert pool.take('imap') is live
+    assert dead.closed
+    assert pool.take('imap') is None
+
+    stale = MailPool(max_idle=0)
+    old = FakeConnection()
+    stale.put('smtp', old)
+    assert stale.take('smtp') is None and old.closed
+
+
+def test_mail_pool_keeps_only_the_newest_sessions():
+    pool = MailPool(max_connections=2)
+    first, second, third = FakeConnection(), FakeConnection(), FakeConnection()
+    for connection in (first, second, third):
+        pool.put('imap', connection)
+    assert first.closed and not second.closed and not third.closed
+    assert len(pool.idle['imap']) == 2
+    assert pool.take('imap') is third and pool.take('imap') is second
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_warmed_connection_survives_the_lead_time():
+    lead_minutes = 5
+    clock = FakeClock()
+    pool = MailPool(clock=clock)
+    connection = FakeConnection()
+    saved = (warmup_module.shared_mail_pool, warmup_module.open_imap)
+    warmup_module.shared_mail_pool = lambda: pool
+    warmup_module.open_imap = lambda email_config: connection
+    try:
+        Warmup({'email': {'imap_server': 'imap.aol.com'}}).warm_imap()
+    finally:
+        warmup_module.shared_mail_pool, warmup_module.open_imap = saved
+
+    # The keep-alive NOOPs the session while the pool waits for the check
+    for _ in range(lead_minutes * 60 // 30):
+        clock.now += 30
+        pool.keep_alive()
+    assert connection.noops >= 2
+    assert pool.take('imap') is connection and not connection.closed
+
+    # Past the age cap a session is closed instead of kept alive
+    pool.put('smtp', connection)
+    clock.now += pool.max_age + 1
+    pool.keep_alive()
+    assert pool.take('smtp') is None and connection.closed
+
+
+class FakeResponse:
+    def __init__(self, url, body, content_type):
+        self.url = url
+        self.content = body.encode('utf-8')
+        self.text = body
+        self.headers = {'Content-Type': content_type}
+        self.encoding = 'utf-8'
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=8192):
+        yield self.content
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        if url == 'https://coindesk.com/':
+            return FakeResponse(url, '<html><head><link rel="alternate" type="application/rss+xml" '
+                                     'href="https://coindesk.com/rss"></head><body>big page</body></html>',
+                                'text/html')
+        return FakeResponse(url, f'''<rss><channel>
+<item><title>Full story</title><link>https://www.coindesk.com/markets/full-story?utm_source=rss</link>
+<description>{STORY}</description></item>
+<item><title>Teaser</title><link>https://www.coindesk.com/markets/teaser</link>
+<description>Short teaser only.</description></item>
+</channel></rss>''', 'application/rss+xml')
+
+
+def test_prefetch_feed_fills_article_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        session = FakeSession()
+        saved = (fetch_scheduler._shared_scheduler, article_cache._shared_cache,
+                 domain_outcomes._shared_outcomes, alternate_representations._shared_feed_cache)
+        fetch_scheduler._shared_scheduler = fetch_scheduler.FetchScheduler(
+            session=session, per_domain_rate=100, per_domain_burst=10)
+        article_cache._shared_cache = article_cache.ArticleCache(directory + '/articles')
+        domain_outcomes._shared_outcomes = domain_outcomes.DomainOutcomes(directory + '/outcomes.json')
+        alternate_representations._shared_feed_cache = DiskCache(directory + '/feeds')
+        try:
+            warmup = Warmup({}, trusted_domains={'coindesk.com'})
+            assert warmup.prefetch_feed('coindesk.com') == 1
+            cached = article_cache._shared_cache.get('https://coindesk.com/markets/full-story')
+            assert cached['title'] == 'Full story'
+            assert cached['content'].endswith('...')
+            assert not article_cache._shared_cache.has('https://coindesk.com/markets/teaser')
+
+            # Second run knows the feed URL and the feed is cached: no requests
+            calls = len(session.calls)
+            assert warmup.prefetch_feed('coindesk.com') == 0
+            assert len(session.calls) == calls
+
+            report = warmup.run()
+            assert report['feeds'] == {'coindesk.com': 0}
+            assert report['imap'] == {} and report['https'] == {}
+        finally:
+            (fetch_scheduler._shared_scheduler, article_cache._shared_cache,
+             domain_outcomes._shared_outcomes, alternate_representations._shared_feed_cache) = saved
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
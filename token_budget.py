@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Token Budget
+Local token counting, prompt compression (links, footers and repeated
+lines removed before sending), max_tokens sized from a target duration,
+and a per-call log of token use, latency and cost
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+try:
+    import tiktoken
+except ImportError:  # counts fall back to a close local approximation
+    tiktoken = None
+
+USAGE_LOG = "cache/token_usage.jsonl"
+
+# Spoken script pace and how many tokens a spoken word costs
+WORDS_PER_MINUTE = 150
+TOKENS_PER_WORD = 1.35
+
+# USD per million (prompt, completion) tokens
+PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4.1': (2.00, 8.00),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-4': (30.00, 60.00),
+    'gpt-3.5-turbo': (0.50, 1.50),
+}
+
+BOILERPLATE = re.compile(
+    r'^\s*(view (this )?(email )?in (your )?browser|unsubscribe|manage (your )?preferences|'
+    r'update your preferences|forward(ed)? to a friend|was this (email )?forwarded|'
+    r'sign up (here|for)|subscribe (here|now|today)|follow us on|'
+    r'you are receiving this|you received this|thanks for reading|©|copyright)\b.*$',
+    re.IGNORECASE | re.MULTILINE
+)
+CHROME_LINE = re.compile(r'^(advertisement|sponsored|read more|share( this)?|click here|learn more|'
+                         r'continue reading|tweet|share on \w+)\W*$', re.IGNORECASE)
+SEPARATOR = re.compile(r'^\s*([-=_*~•·]\s*){3,}$')
+WORD_PIECE = re.compile(r"\w+|[^\w\s]")
+
+_encodings = {}
+
+
+def encoding_for(model):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding('o200k_base')
+    return _encodings[model]
+
+
+def count_tokens(text, model='gpt-4o-mini'):
+    """Tokens the model will see: exact with tiktoken, otherwise word-piece estimate"""
+    if not text:
+        return 0
+    encoding = encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # BPE keeps common words whole and splits long ones roughly every 6 characters
+    return sum(1 + (len(piece) - 1) // 6 for piece in WORD_PIECE.findall(text))
+
+
+def count_message_tokens(messages, model='gpt-4o-mini'):
+    """Prompt tokens for a chat request, including per-message framing"""
+    return sum(count_tokens(message['content'], model) + 4 for message in messages) + 3
+
+
+def compress_text(text):
+    """Strip links, tracking URLs, footers and repeated lines, keeping paragraph breaks
+
+    Long lines repeated anywhere keep their first copy; short lines that show
+    up three or more times ("Read more", "Advertisement") are page chrome and go.
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = re.sub(r'[\u200b-\u200f\u2060\ufeff\xad\u034f]', '', text)
+    text = re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', text)  # markdown links -> anchor text
+    text = re.sub(r'<?https?://\S+>?', '', text)
+    text = BOILERPLATE.sub('', text)
+    text = re.sub(r'[ \t\xa0]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+
+    lines = text.split('\n')
+    normalized = [' '.join(line.casefold().split()) for line in lines]
+    counts = Counter(normalized)
+    seen, kept = set(), []
+    for line, key in zip(lines, normalized):
+        if key and not SEPARATOR.match(line):
+            if CHROME_LINE.match(key) or (len(key) < 40 and counts[key] >= 3):
+                continue
+            if len(key) >= 40:
+                if key in seen:
+                    continue
+                seen.add(key)
+        kept.append(line)
+    text = re.sub(r'\n{3,}', '\n\n', '\n'.join(kept))
+    return text.strip()
+
+
+def max_tokens_for_duration(minutes, words_per_minute=WORDS_PER_MINUTE, headroom=1.25):
+    """Completion budget for a script of about this many spoken minutes
+
+    The headroom covers sound cues and the model running a little long.
+    """
+    return int(math.ceil(minutes * words_per_minute * TOKENS_PER_WORD * headroom / 50.0) * 50)
+
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    prices = next((PRICES[name] for name in sorted(PRICES, key=len, reverse=True)
+                   if model.startswith(name)), None)
+    if prices is None:
+        return None
+    return round((prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000, 6)
+
+
+class UsageLog:
+    """Appends one JSON line per LLM call and keeps running totals per label"""
+
+    def __init__(self, path=USAGE_LOG):
+        self.path = path
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    def record(self, label, model, prompt_tokens, completion_tokens, seconds, cached=False,
+               price_factor=1.0):
+        cost = call_cost(model, prompt_tokens, completion_tokens)
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'label': label or 'unlabelled',
+            'model': model,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'seconds': round(seconds, 2),
+            'cached': cached,
+            'cost_usd': 0.0 if cached else cost if cost is None else round(cost * price_factor, 6)
+        }
+        with self.lock:
+            total = self.totals.setdefault(entry['label'], Counter())
+            total.update(calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                         cost_usd=entry['cost_usd'] or 0.0)
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+        logging.info(f"🧮 {entry['label']}: {prompt_tokens} prompt + {completion_tokens} completion "
+                     f"tokens, {entry['seconds']:.1f}s"
+                     + (" (cached)" if cached else
+                        f", ${entry['cost_usd']:.4f}" if entry['cost_usd'] is not None else ""))
+        return entry
+
+    def summary(self):
+        with self.lock:
+            return {label: dict(total) for label, total in self.totals.items()}
+
+
+_shared_log = None
+_shared_lock = threading.Lock()
+
+
+def shared_usage_log():
+    global _shared_log
+    if _shared_log is None:
+        with _shared_lock:
+            if _shared_log is None:
+                _shared_log = UsageLog()
+    return _shared_log
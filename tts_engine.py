@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Chunked TTS Engine
+Splits a script at paragraph and sentence boundaries under the voice
+model's character limit, synthesizes the chunks concurrently and joins
+the MP3 frames into one gapless file, so long scripts render faster than
+one monolithic request and never fail for length
+"""
+
+import logging
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+
+from audio_cache import normalize_text, shared_audio_cache, voice_identity
+from mp3_tools import MP3Writer, mapped
+from script_cues import SOUNDS_DIR, SoundLibrary, chapter_starts, split_cues
+from speech_stream import SentenceChunker, elevenlabs_payload, elevenlabs_tts_to
+
+# Characters ElevenLabs accepts per request, by model
+MODEL_CHAR_LIMITS = {
+    'eleven_monolingual_v1': 5000,
+    'eleven_multilingual_v1': 5000,
+    'eleven_multilingual_v2': 10000,
+    'eleven_turbo_v2': 30000,
+    'eleven_turbo_v2_5': 40000,
+    'eleven_flash_v2': 30000,
+    'eleven_flash_v2_5': 40000,
+}
+CONTEXT_CHARS = 500  # neighbouring text sent for continuous intonation
+TAG_BYTES = 2048  # ID3 space reserved up front, plus room per chapter
+
+
+def char_limit(model_id):
+    return MODEL_CHAR_LIMITS.get(model_id, 5000)
+
+
+def split_sentences(paragraph, max_chars):
+    """Sentences of a paragraph, any single run-on cut at a word boundary"""
+    chunker = SentenceChunker(first_min_chars=1, min_chars=1, max_chars=max_chars)
+    return chunker.feed(paragraph) + chunker.flush()
+
+
+def split_script(script, max_chars=2500, target_chars=None):
+    """Chunks of at most max_chars, cut between paragraphs where possible and
+    between sentences otherwise, each close to target_chars"""
+    target = min(target_chars or max_chars, max_chars)
+    paragraphs = [' '.join(line.split()) for line in script.replace('\r\n', '\n').split('\n')]
+    pieces = []  # (text, starts_a_paragraph)
+    for paragraph in paragraphs:
+        if not paragraph:
+            continue
+        if len(paragraph) <= target:
+            pieces.append((paragraph, True))
+        else:
+            sentences = split_sentences(paragraph, max_chars)
+            pieces.extend((sentence, index == 0) for index, sentence in enumerate(sentences))
+
+    chunks, current = [], ""
+    for text, new_paragraph in pieces:
+        joiner = "\n\n" if new_paragraph else " "
+        if current and len(current) + len(joiner) + len(text) > target:
+            chunks.append(current)
+            current = ""
+        current = f"{current}{joiner}{text}" if current else text
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_paragraphs(script, max_chars=2500):
+    """One segment per paragraph (split by sentences only past max_chars), so
+    text that recurs between scripts lands in a segment of its own"""
+    return [chunk for line in script.replace('\r\n', '\n').split('\n') if line.strip()
+            for chunk in split_script(line, max_chars)]
+
+
+class TTSEngine:
+    def __init__(self, synthesize=None, max_workers=4, max_chars=2500, min_chunk_chars=400,
+                 cache=None, voice=None, sounds=None, stream=None):
+        """synthesize(text, previous_text=None, next_text=None) -> MP3 bytes, or
+        stream(text, out, previous_text=None, next_text=None) writing the MP3
+        to the binary file out as it arrives
+
+        Stage directions like [INTRO MUSIC] are never voiced; with a
+        SoundLibrary their clips are spliced in at the cue points. With an
+        AudioCache the script is voiced paragraph by paragraph and only
+        paragraphs not already cached for this voice are synthesized.
+        """
+        if stream is None:
+            def stream(text, out, previous_text=None, next_text=None):
+                out.write(synthesize(text, previous_text=previous_text, next_text=next_text))
+        self.stream = stream
+        self.max_workers = max_workers
+        self.max_chars = max_chars
+        self.min_chunk_chars = min_chunk_chars
+        self.cache = cache
+        self.voice = voice
+        self.sounds = sounds
+        self.last_stats = {}
+
+    def target_chars(self, length):
+        """Chunk size that respects the limit and keeps every worker busy"""
+        count = max(math.ceil(length / self.max_chars),
+                    min(self.max_workers, length // self.min_chunk_chars), 1)
+        # A single chunk needn't be balanced; its exact length would leave no
+        # room for the paragraph breaks split_script joins lines with
+        return math.ceil(length / count) if count > 1 else self.max_chars
+
+    def chunks(self, script):
+        return split_script(script, self.max_chars, self.target_chars(len(script)))
+
+    def plan(self, texts):
+        """Chunks for each run of narration"""
+        if self.cache is not None:
+            return [[normalize_text(chunk) for chunk in split_paragraphs(text, self.max_chars)]
+                    for text in texts]
+        target = self.target_chars(sum(len(text) for text in texts))
+        return [split_script(text, self.max_chars, target) for text in texts]
+
+    def render(self, script):
+        """One MP3 for the whole script as bytes; see render_to"""
+        with tempfile.TemporaryDirectory(prefix="tts-") as workdir:
+            path = os.path.join(workdir, "podcast.mp3")
+            self.render_to(script, path)
+            with open(path, 'rb') as f:
+                return f.read()
+
+    def render_to(self, script, path, tags=None):
+        """Write one MP3 for the whole script to path and return its stats
+
+        Each chunk streams to its own file and the output is stitched from
+        memory-mapped segments, so memory use doesn't grow with the length of
+        the podcast. With tags (see mp3_tools.id3_tag) the file gets an ID3v2
+        tag with its exact length and a chapter per story. path only appears
+        once complete; raises if any chunk ultimately fails.
+        """
+        return self.render_many([script], [path], tags)
+
+    def render_many(self, scripts, paths, tags=None):
+        """render_to for several scripts at once, their chunks sharing one pool
+        of workers; returns the combined stats"""
+        start = time.monotonic()
+        parts_by_script = [split_cues(script) for script in scripts]
+        speech = [part for parts in parts_by_script for part in parts if part['type'] == 'speech']
+        cues = [part for parts in parts_by_script for part in parts if part['type'] == 'cue']
+        planned = self.plan([part['text'] for part in speech])
+        chunks = [chunk for part_chunks in planned for chunk in part_chunks]
+        # Which script each chunk belongs to, so context never crosses between them
+        runs = [number for number, parts in enumerate(parts_by_script)
+                    for part in parts if part['type'] == 'speech']
+        owners = [number for number, part_chunks in zip(runs, planned) for _ in part_chunks]
+
+        with tempfile.TemporaryDirectory(prefix="tts-") as workdir, ExitStack() as stack:
+            # Open cache hits right away so eviction can't pull them out from under us
+            sources = [None] * len(chunks)
+            keys = [None] * len(chunks)
+            if self.cache is not None:
+                for index, chunk in enumerate(chunks):
+                    keys[index] = self.cache.key(chunk, self.voice)
+                    cached = self.cache.path(keys[index])
+                    try:
+                        sources[index] = stack.enter_context(open(cached, 'rb')) if cached else None
+                    except OSError:
+                        sources[index] = None
+            pending = [index for index, source in enumerate(sources) if source is None]
+
+            def context(index, other):
+                return 0 <= other < len(chunks) and owners[other] == owners[index]
+
+            def voice(index):
+                previous_text = chunks[index - 1][-CONTEXT_CHARS:] if context(index, index - 1) else None
+                next_text = chunks[index + 1][:CONTEXT_CHARS] if context(index, index + 1) else None
+                segment = os.path.join(workdir, f"{index}.mp3")
+                with open(segment, 'wb') as out:
+                    self.stream(chunks[index], out, previous_text=previous_text, next_text=next_text)
+                return segment
+
+            if pending:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending)),
+                                        thread_name_prefix="tts") as pool:
+                    for index, segment in zip(pending, pool.map(voice, pending)):
+                        sources[index] = segment
+
+            # Lay the voiced chunks and cue clips back out in script order
+            like = b''
+            if sources:
+                with mapped(sources[0]) as first:
+                    like = bytes(first[:8192])
+            voiced, part_chunks = iter(sources), iter(planned)
+            size = duration = chapter_count = 0
+            for parts, path in zip(parts_by_script, paths):
+                writer = self.write(parts, path, tags, like,
+                                    lambda: [next(voiced) for _ in next(part_chunks)])
+                size += writer.bytes
+                duration += writer.seconds
+                chapter_count += len(writer.chapters)
+
+            # Cached last: adding entries can evict, and the stitch is done now
+            for index in pending:
+                if keys[index] is not None:
+                    self.cache.put_file(keys[index], sources[index])
+
+        billed = sum(len(chunks[index]) for index in pending)
+        self.last_stats = {
+            'chunks': len(chunks),
+            'cached': len(chunks) - len(pending),
+            'cues': len(cues),
+            'cue_characters': sum(len(cue['text']) for cue in cues),
+            'characters': sum(len(chunk) for chunk in chunks),
+            'billed_characters': billed,
+            'largest_chunk': max((len(chunk) for chunk in chunks), default=0),
+            'bytes': size,
+            'duration_seconds': round(duration, 3),
+            'chapters': chapter_count,
+            'seconds': round(time.monotonic() - start, 2)
+        }
+        logging.info(f"🎙️ Voiced {billed:,} of {self.last_stats['characters']:,} characters in "
+                     f"{len(pending)} chunks ({self.last_stats['cached']} from cache, "
+                     f"{min(self.max_workers, len(pending) or 1)} at once, "
+                     f"{len(cues)} cues kept out of TTS) in {self.last_stats['seconds']:.1f}s")
+        return self.last_stats
+
+    def write(self, parts, path, tags, like, next_sources):
+        """Stitch one script's voiced chunks (next_sources() gives those of the
+        next run of narration) and cue clips into path via path.part"""
+        return stitch(parts, path, next_sources, sounds=self.sounds, tags=tags, like=like)
+
+
+def stitch(parts, path, next_sources, sounds=None, tags=None, like=b''):
+    """Write a script's parts to path via path.part: the voiced files
+    next_sources() gives for each run of narration, and cue clips from
+    sounds in between; returns the MP3Writer"""
+    partial = f"{path}.part"
+    try:
+        chapters = chapter_starts(parts) if tags is not None else {}
+        with open(partial, 'wb') as out:
+            writer = MP3Writer(out)
+            if tags is not None:
+                writer.reserve_tag(TAG_BYTES + 256 * len(chapters))
+            for index, part in enumerate(parts):
+                if index in chapters:
+                    writer.mark(chapters[index])
+                if part['type'] == 'speech':
+                    for source in next_sources():
+                        writer.append_file(source)
+                elif sounds is not None:
+                    writer.append(sounds.clip(part, like=like))
+            writer.finish()
+            if tags is not None and not writer.write_tag(tags):
+                logging.warning("ID3 tag didn't fit the space reserved for it; file left untagged")
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return writer
+
+
+def episode_tags(show, when=None, host="Mark"):
+    """ID3 tags for one episode of a show"""
+    when = when or datetime.now()
+    return {
+        'title': f"{show} - {when.strftime('%B %d, %Y')}",
+        'artist': host,
+        'album': show,
+        'genre': 'Podcast',
+        'year': when.strftime('%Y')
+    }
+
+
+def elevenlabs_engine(voice_config, timeout=120, wait_open=0.0):
+    """TTSEngine over ElevenLabs, chunked under the configured model's limit
+
+    voice_generation may set chunk_chars, max_concurrency (the plan's
+    concurrent request allowance), cache_audio (default on) and sounds_dir,
+    the folder of cue clips (default sounds/).
+    """
+    model_id = voice_config.get('model', 'eleven_multilingual_v2')
+    cache = shared_audio_cache() if voice_config.get('cache_audio', True) else None
+
+    def stream(text, out, previous_text=None, next_text=None):
+        elevenlabs_tts_to(voice_config, text, out, previous_text, timeout=timeout,
+                          wait_open=wait_open, next_text=next_text)
+
+    return TTSEngine(stream=stream, max_workers=voice_config.get('max_concurrency', 4),
+                     max_chars=min(voice_config.get('chunk_chars', 2500), char_limit(model_id)),
+                     cache=cache, voice=voice_identity(voice_config, elevenlabs_payload(voice_config, '')),
+                     sounds=SoundLibrary(voice_config.get('sounds_dir', SOUNDS_DIR)))
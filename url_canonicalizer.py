@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+URL Canonicalization and Near-Duplicate Detection
+Collapses tracking variants, AMP pages and syndicated wire copies
+so the same story is only fetched and narrated once
+"""
+
+import hashlib
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin
+
+# Query parameters that never change which article is served
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    'cmpid', 'ref', 'ref_src', 'referrer', 'src', 'sref', 'smid', 'smtyp',
+    'mod', 'ito', 'guccounter', 'guce_referrer', 'guce_referrer_sig',
+    'ncid', 'ocid', 'taid', 'tpcc', 'outputtype', 'amp', '_ga', '_gl',
+    'yptr', 'leadsource', 'ftag'
+}
+TRACKING_PREFIXES = ('utm_', 'mc_', 'pk_', 'hsa_', 'oly_', 'vero_', '__s')
+
+# Host prefixes that serve the same content as the bare domain
+HOST_PREFIXES = ('www.', 'amp.', 'm.', 'mobile.')
+
+AMP_PATH = re.compile(r'(/amp/?$|/amp(?=/)|\.amp(?=\.html?$|$))', re.I)
+
+
+def canonicalize_url(url):
+    """Normalize a URL so trivially different links compare equal"""
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port  # raises for a port out of range or not a number
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path or '/')
+    path = AMP_PATH.sub('', path) or '/'
+    if path != '/' and path.endswith('/'):
+        path = path.rstrip('/')
+    if path.endswith(('/index.html', '/index.htm')):
+        path = path.rsplit('/', 1)[0] or '/'
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def resolve_canonical(page_url, declared_url):
+    """Canonical form of a page, preferring its <link rel=canonical>"""
+    if declared_url:
+        absolute = urljoin(page_url, declared_url.strip())
+        if absolute.startswith('http'):
+            return canonicalize_url(absolute)
+    return canonicalize_url(page_url)
+
+
+def dedupe_urls(urls):
+    """Drop URLs whose canonical form was already seen, keeping order"""
+    seen = set()
+    unique = []
+    for url in urls:
+        canonical = canonicalize_url(url)
+        if canonical not in seen:
+            seen.add(canonical)
+            unique.append(url)
+    return unique
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash over word shingles of the text"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)] if words else []
+    else:
+        shingles = [' '.join(words[i:i + shingle_size])
+                    for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        digest = int.from_bytes(
+            hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'
+        )
+        for bit in range(64):
+            if digest >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateDetector:
+    """Finds near-duplicate texts by SimHash, indexed in four 16-bit bands
+
+    With max_distance <= 3 two matching fingerprints must share at least
+    one band exactly, so lookups only compare against a handful of
+    candidates instead of every text seen so far.
+    """
+
+    def __init__(self, max_distance=3, min_words=40):
+        self.max_distance = max_distance
+        self.min_words = min_words
+        self.fingerprints = {}
+        self.bands = [{} for _ in range(4)]
+
+    def _band_keys(self, fingerprint):
+        return [(fingerprint >> (16 * i)) & 0xFFFF for i in range(4)]
+
+    def _lookup(self, fingerprint):
+        if self.max_distance > 3:
+            candidates = self.fingerprints
+        else:
+            candidates = (candidate
+                          for band, key in zip(self.bands, self._band_keys(fingerprint))
+                          for candidate in band.get(key, ()))
+        for candidate in candidates:
+            if hamming_distance(fingerprint, self.fingerprints[candidate]) <= self.max_distance:
+                return candidate
+        return None
+
+    def find_duplicate(self, text):
+        """Key of a previously added near-duplicate of text, or None"""
+        if len(text.split()) < self.min_words:
+            return None
+        return self._lookup(simhash(text))
+
+    def add(self, key, text):
+        """Remember text under key; returns the key of an existing duplicate instead"""
+        if len(text.split()) < self.min_words:
+            return None
+        fingerprint = simhash(text)
+        duplicate = self._lookup(fingerprint)
+        if duplicate is not None:
+            return duplicate
+        self.fingerprints[key] = fingerprint
+        for band, band_key in zip(self.bands, self._band_keys(fingerprint)):
+            band.setdefault(band_key, []).append(key)
+        return None
+
+
+def collapse_duplicate_articles(articles, max_distance=3):
+    """Drop articles that share a canonical URL or near-identical text
+
+    Keeps the first (highest priority) copy and records the dropped
+    URLs under 'duplicate_urls' so sources can still be credited.
+    """
+    detector = NearDuplicateDetector(max_distance=max_distance)
+    kept = []
+    by_canonical = {}
+
+    for article in articles:
+        canonical = article.get('canonical_url') or canonicalize_url(article['url'])
+        original = by_canonical.get(canonical)
+        if original is None:
+            duplicate_key = detector.add(len(kept), article.get('content', ''))
+            if duplicate_key is not None:
+                original = kept[duplicate_key]
+
+        if original is not None:
+            original.setdefault('duplicate_urls', []).append(article['url'])
+            continue
+
+        by_canonical[canonical] = article
+        kept.append(article)
+
+    return kept
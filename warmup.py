@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Pre-Arrival Warm-Up
+Runs shortly before a newsletter's arrival window: resolves and connects
+to the mail, LLM and TTS hosts, and pulls trusted sites' feeds into the
+article cache so most linked stories are already local when the email lands
+"""
+
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from alternate_representations import RepresentationChooser, head_links
+from article_cache import shared_article_cache
+from domain_outcomes import shared_domain_outcomes
+from fetch_scheduler import shared_scheduler
+from http_pool import get_session
+from llm_client import scheduled_llm_client, llm_configured
+from mail_pool import shared_mail_pool, open_imap, open_smtp
+from paywall_detector import read_article_page
+
+API_HOSTS = {
+    'openai': 'api.openai.com',
+    'elevenlabs': 'api.elevenlabs.io'
+}
+
+# Feed items shorter than this are teasers, not articles worth caching
+MIN_FEED_WORDS = 150
+
+
+def warmup_times(newsletter_config, lead_minutes=5):
+    """'HH:MM' times to warm up: before the arrival window and before the check"""
+    moments = []
+    window = newsletter_config.get('arrival_time') or {}
+    if 'start_hour' in window:
+        moments.append(window['start_hour'] * 60)
+    if newsletter_config.get('check_time'):
+        hour, minute = newsletter_config['check_time'].split(':')
+        moments.append(int(hour) * 60 + int(minute))
+    times = {(moment - lead_minutes) % (24 * 60) for moment in moments}
+    return [f"{moment // 60:02d}:{moment % 60:02d}" for moment in sorted(times)]
+
+
+class Warmup:
+    def __init__(self, config, trusted_domains=(), smtp_password=None, max_workers=8):
+        self.config = config
+        self.trusted_domains = sorted(set(trusted_domains))
+        self.smtp_password = smtp_password
+        self.max_workers = max_workers
+
+    def mail_endpoints(self):
+        endpoints = []
+        email_config = self.config.get('email') or {}
+        if email_config.get('imap_server'):
+            endpoints.append((email_config['imap_server'], email_config.get('imap_port', 993)))
+        delivery = self.config.get('email_delivery') or {}
+        if delivery.get('smtp_server'):
+            endpoints.append((delivery['smtp_server'], delivery.get('smtp_port', 587)))
+        return endpoints
+
+    def api_hosts(self):
+        hosts = []
+        for section in ('ai_processing', 'voice_generation'):
+            provider = (self.config.get(section) or {}).get('provider')
+            if provider in API_HOSTS:
+                hosts.append(API_HOSTS[provider])
+        return hosts
+
+    def resolve(self, host, port=443):
+        """Look the host up now so the OS resolver cache is hot later"""
+        start = time.monotonic()
+        socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return round((time.monotonic() - start) * 1000, 1)
+
+    def connect_https(self, host):
+        """Open a keep-alive connection in the pool that will talk to this host"""
+        start = time.monotonic()
+        ai_config = self.config.get('ai_processing') or {}
+        if host == API_HOSTS['openai'] and llm_configured(ai_config):
+            # The same client (and pool) the scheduled run will use
+            scheduled_llm_client(ai_config).warm()
+        else:
+            get_session().head(f"https://{host}/", timeout=5)
+        return round((time.monotonic() - start) * 1000, 1)
+
+    def warm_imap(self):
+        shared_mail_pool().put('imap', open_imap(self.config['email']))
+        return True
+
+    def warm_smtp(self):
+        delivery = self.config['email_delivery']
+        password = (self.smtp_password or delivery.get('sender_password')
+                    or self.config['email']['password'])
+        shared_mail_pool().put('smtp', open_smtp(delivery['smtp_server'], delivery['smtp_port'],
+                                                 delivery['sender_email'], password))
+        return True
+
+    def discover_feed(self, domain):
+        """Feed URL for a site: remembered from earlier runs, else from its home page head"""
+        outcomes = shared_domain_outcomes()
+        known = outcomes.get(domain).get('feed_url')
+        if known:
+            return known
+        response = shared_scheduler().get(f"https://{domain}/", timeout=10, stream=True)
+        try:
+            response.raise_for_status()
+            head, _ = read_article_page(response, enough=lambda head: True)
+        finally:
+            response.close()
+        feeds = head_links(head, response.url or f"https://{domain}/")['feeds']
+        if feeds:
+            outcomes.set_preference(domain, 'feed_url', feeds[0])
+            return feeds[0]
+        return None
+
+    def prefetch_feed(self, domain):
+        """Store every full-text item of a site's feed in the article cache"""
+        feed_url = self.discover_feed(domain)
+        if not feed_url:
+            return 0
+        chooser = RepresentationChooser(shared_scheduler().get, shared_domain_outcomes())
+        cache = shared_article_cache()
+        stored = 0
+        for url, entry in chooser.feed_entries(feed_url, timeout=10).items():
+            words = entry['content'].split()
+            if len(words) < MIN_FEED_WORDS or cache.has(url):
+                continue
+            if len(words) > 500:
+                entry['content'] = ' '.join(words[:500]) + "..."
+            cache.put({'url': url, 'canonical_url': url, 'title': entry['title'][:100],
+                       'content': entry['content'], 'domain': domain,
+                       'representation': 'feed'})
+            stored += 1
+        return stored
+
+    def run(self):
+        """Warm everything in parallel; returns a report of what succeeded"""
+        start = time.monotonic()
+        tasks = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for host, port in self.mail_endpoints():
+                tasks[executor.submit(self.resolve, host, port)] = ('dns', host)
+            for host in self.api_hosts():
+                tasks[executor.submit(self.connect_https, host)] = ('https', host)
+            if (self.config.get('email') or {}).get('imap_server'):
+                tasks[executor.submit(self.warm_imap)] = ('imap', 'imap')
+            if (self.config.get('email_delivery') or {}).get('smtp_server'):
+                tasks[executor.submit(self.warm_smtp)] = ('smtp', 'smtp')
+            for domain in self.trusted_domains:
+                tasks[executor.submit(self.prefetch_feed, domain)] = ('feeds', domain)
+
+            report = {'dns': {}, 'https': {}, 'imap': {}, 'smtp': {}, 'feeds': {}}
+            for future, (kind, name) in tasks.items():
+                try:
+                    report[kind][name] = future.result()
+                except Exception as e:
+                    logging.warning(f"Warm-up {kind} for {name} failed: {e}")
+                    report[kind][name] = None
+
+        shared_domain_outcomes().save()
+        report['articles_cached'] = sum(count or 0 for count in report['feeds'].values())
+        report['elapsed'] = round(time.monotonic() - start, 2)
+        logging.info(f"♨️ Warm-up done in {report['elapsed']:.1f}s: "
+                     f"{len([v for v in report['https'].values() if v is not None])} API hosts, "
+                     f"{report['articles_cached']} feed articles cached")
+        return report